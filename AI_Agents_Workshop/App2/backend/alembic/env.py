@@ -22,6 +22,8 @@ from backend.app.models.base import Base # Placeholder for actual model base
 from backend.app.models.file import File
 from backend.app.models.vector_embedding import VectorEmbedding
 from backend.app.models.chat import Conversation, ChatMessage
+from backend.app.models.embedding_space import EmbeddingSpace
+from backend.app.models.upload_session import UploadSession
 # --- End model imports --- 
 
 # this is the Alembic Config object, which provides
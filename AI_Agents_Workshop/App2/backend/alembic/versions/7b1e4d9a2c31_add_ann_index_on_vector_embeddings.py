@@ -0,0 +1,62 @@
+"""Add ANN index (HNSW or IVFFlat) on vector_embeddings.embedding
+
+Revision ID: 7b1e4d9a2c31
+Revises: 0faa9d9cfecf
+Create Date: 2025-04-22 10:12:03.418220
+
+The index type and build parameters are read from the environment (the same
+.env the application uses):
+
+    VECTOR_INDEX_TYPE        hnsw (default) or ivfflat
+    HNSW_M                   max connections per HNSW node (default 16)
+    HNSW_EF_CONSTRUCTION     HNSW build candidate list size (default 64)
+    IVFFLAT_LISTS            IVFFlat list count (default 100; ~rows/1000 is a
+                             good start, build IVFFlat only once data is loaded)
+
+The operator class is vector_cosine_ops because retrieval orders by
+cosine distance (`<=>`). The index is built CONCURRENTLY so uploads and
+retrieval keep working while it builds.
+"""
+import os
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7b1e4d9a2c31'
+down_revision: Union[str, None] = '0faa9d9cfecf'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+INDEX_NAME = "ix_vector_embeddings_embedding_ann"
+OPERATOR_CLASS = "vector_cosine_ops"
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    index_type = os.getenv("VECTOR_INDEX_TYPE", "hnsw").lower()
+    if index_type == "hnsw":
+        m = int(os.getenv("HNSW_M", "16"))
+        ef_construction = int(os.getenv("HNSW_EF_CONSTRUCTION", "64"))
+        options = f"m = {m}, ef_construction = {ef_construction}"
+    elif index_type == "ivfflat":
+        lists = int(os.getenv("IVFFLAT_LISTS", "100"))
+        options = f"lists = {lists}"
+    else:
+        raise ValueError(f"Unsupported VECTOR_INDEX_TYPE '{index_type}' (expected 'hnsw' or 'ivfflat').")
+
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction block
+    with op.get_context().autocommit_block():
+        op.execute(
+            f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {INDEX_NAME} "
+            f"ON vector_embeddings USING {index_type} (embedding {OPERATOR_CLASS}) "
+            f"WITH ({options})"
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {INDEX_NAME}")
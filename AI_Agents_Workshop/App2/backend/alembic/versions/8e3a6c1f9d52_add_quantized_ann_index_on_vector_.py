@@ -0,0 +1,75 @@
+"""Add quantized ANN index (halfvec or binary) on vector_embeddings.embedding
+
+Revision ID: 8e3a6c1f9d52
+Revises: 5d2f8e7a1b64
+Create Date: 2025-04-24 11:18:40.263517
+
+Reads VECTOR_QUANTIZATION from the environment (the same .env the
+application uses):
+
+    none      no change (default)
+    halfvec   HNSW over embedding::halfvec(1536), halfvec_cosine_ops (~half size)
+    binary    HNSW over binary_quantize(embedding)::bit(1536), bit_hamming_ops (~1/32 size)
+
+Building the expression index converts every existing row into the compact
+form; the full-precision ANN index from revision 7b1e4d9a2c31 is then
+dropped, so only the compact index needs to stay in memory. The embedding
+column itself keeps full precision: queries rescore their candidates against
+it. HNSW_M / HNSW_EF_CONSTRUCTION apply as in 7b1e4d9a2c31. Requires
+pgvector >= 0.7. Set VECTOR_QUANTIZATION to the same value for the
+application, which must match the index the migration built.
+"""
+import os
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8e3a6c1f9d52'
+down_revision: Union[str, None] = '5d2f8e7a1b64'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+FULL_INDEX_NAME = "ix_vector_embeddings_embedding_ann"
+QUANTIZED_INDEXES = {
+    "halfvec": ("ix_vector_embeddings_embedding_halfvec_ann", "(embedding::halfvec(1536)) halfvec_cosine_ops"),
+    "binary": ("ix_vector_embeddings_embedding_binary_ann", "(binary_quantize(embedding)::bit(1536)) bit_hamming_ops"),
+}
+
+
+def hnsw_options() -> str:
+    m = int(os.getenv("HNSW_M", "16"))
+    ef_construction = int(os.getenv("HNSW_EF_CONSTRUCTION", "64"))
+    return f"m = {m}, ef_construction = {ef_construction}"
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    quantization = os.getenv("VECTOR_QUANTIZATION", "none").lower()
+    if quantization == "none":
+        return
+    if quantization not in QUANTIZED_INDEXES:
+        raise ValueError(f"Unsupported VECTOR_QUANTIZATION '{quantization}' for pgvector (expected 'none', 'halfvec' or 'binary').")
+    index_name, expression = QUANTIZED_INDEXES[quantization]
+
+    # CREATE/DROP INDEX CONCURRENTLY cannot run inside a transaction block
+    with op.get_context().autocommit_block():
+        op.execute(
+            f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {index_name} "
+            f"ON vector_embeddings USING hnsw ({expression}) WITH ({hnsw_options()})"
+        )
+        op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {FULL_INDEX_NAME}")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Restore a full-precision HNSW index before dropping the compact ones
+    with op.get_context().autocommit_block():
+        op.execute(
+            f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {FULL_INDEX_NAME} "
+            f"ON vector_embeddings USING hnsw (embedding vector_cosine_ops) WITH ({hnsw_options()})"
+        )
+        for index_name, _ in QUANTIZED_INDEXES.values():
+            op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {index_name}")
@@ -0,0 +1,140 @@
+"""Add embedding_spaces table; per-space ANN indexes on a dimensionless embedding column
+
+Revision ID: a3f7c2d9e614
+Revises: 8e3a6c1f9d52
+Create Date: 2025-04-25 09:41:27.803145
+
+`vector_embeddings.embedding` loses its fixed size (vector(1536) -> vector),
+so vectors of different embedding spaces (model + dimensions, e.g.
+text-embedding-3-small@512) can live side by side while a re-embedding job
+moves the data from one to the other. Dropping the size limit is a catalog
+change only; the table is not rewritten.
+
+ANN indexes become partial expression indexes, one per space:
+
+    USING hnsw ((embedding::vector(1536)) vector_cosine_ops) WHERE embedding_model = 'text-embedding-3-small'
+
+(or the halfvec / binary_quantize expression with VECTOR_QUANTIZATION, as in
+8e3a6c1f9d52; VECTOR_INDEX_TYPE, HNSW_M, HNSW_EF_CONSTRUCTION and
+IVFFLAT_LISTS as in 7b1e4d9a2c31). The existing space with the most rows is
+recorded as active and gets its index here; the application builds indexes
+for later spaces itself. Between dropping the old index and finishing the new
+one, searches fall back to exact scans.
+
+Downgrading requires every stored vector to have 1536 dimensions.
+"""
+import os
+import re
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a3f7c2d9e614'
+down_revision: Union[str, None] = '8e3a6c1f9d52'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+LEGACY_DIMENSIONS = 1536
+LEGACY_INDEXES = (
+    "ix_vector_embeddings_embedding_ann",
+    "ix_vector_embeddings_embedding_halfvec_ann",
+    "ix_vector_embeddings_embedding_binary_ann",
+)
+ANN_EXPRESSIONS = {
+    "none": ("(embedding::vector({dimensions}))", "vector_cosine_ops"),
+    "halfvec": ("(embedding::halfvec({dimensions}))", "halfvec_cosine_ops"),
+    "binary": ("(binary_quantize(embedding)::bit({dimensions}))", "bit_hamming_ops"),
+}
+
+
+def index_options(index_type: str) -> str:
+    if index_type == "hnsw":
+        return f"m = {int(os.getenv('HNSW_M', '16'))}, ef_construction = {int(os.getenv('HNSW_EF_CONSTRUCTION', '64'))}"
+    if index_type == "ivfflat":
+        return f"lists = {int(os.getenv('IVFFLAT_LISTS', '100'))}"
+    raise ValueError(f"Unsupported VECTOR_INDEX_TYPE '{index_type}' (expected 'hnsw' or 'ivfflat').")
+
+
+def space_index_name(space: str, quantization: str) -> str:
+    # Same naming as app.services.vector_backends.pgvector.space_index_name
+    prefix = "ix_vector_embeddings_" + ("" if quantization == "none" else f"{quantization}_") + "ann_"
+    slug = re.sub(r"[^a-z0-9]+", "_", space.lower()).strip("_")
+    return (prefix + slug)[:63]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # ### commands auto generated by Alembic - please adjust! ###
+    op.create_table('embedding_spaces',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(), nullable=False),
+    sa.Column('status', sa.String(), nullable=False),
+    sa.Column('files_total', sa.Integer(), nullable=True),
+    sa.Column('files_done', sa.Integer(), nullable=False),
+    sa.Column('error', sa.String(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.Column('activated_at', sa.DateTime(timezone=True), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('name')
+    )
+    op.create_index(op.f('ix_embedding_spaces_id'), 'embedding_spaces', ['id'], unique=False)
+    op.create_index(op.f('ix_embedding_spaces_status'), 'embedding_spaces', ['status'], unique=False)
+    # ### end Alembic commands ###
+
+    # Record the spaces already in the table; the largest one serves retrieval
+    spaces = op.get_bind().execute(sa.text(
+        "SELECT embedding_model, count(*) FROM vector_embeddings WHERE embedding_model IS NOT NULL "
+        "GROUP BY embedding_model ORDER BY count(*) DESC"
+    )).all()
+    for position, (space, _) in enumerate(spaces):
+        op.execute(sa.text(
+            "INSERT INTO embedding_spaces (name, status, files_done, activated_at) "
+            "VALUES (:name, :status, 0, CASE WHEN :status = 'active' THEN now() END)"
+        ).bindparams(name=space, status="active" if position == 0 else "retired"))
+
+    index_type = os.getenv("VECTOR_INDEX_TYPE", "hnsw").lower()
+    quantization = os.getenv("VECTOR_QUANTIZATION", "none").lower()
+    if quantization not in ANN_EXPRESSIONS:
+        raise ValueError(f"Unsupported VECTOR_QUANTIZATION '{quantization}' for pgvector (expected 'none', 'halfvec' or 'binary').")
+    expression, operator_class = ANN_EXPRESSIONS[quantization]
+
+    # CREATE/DROP INDEX CONCURRENTLY cannot run inside a transaction block
+    with op.get_context().autocommit_block():
+        # Indexes on the sized column must go before the size does
+        for index_name in LEGACY_INDEXES:
+            op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {index_name}")
+        op.execute("ALTER TABLE vector_embeddings ALTER COLUMN embedding TYPE vector")
+        if spaces:
+            space = spaces[0][0]
+            space_literal = space.replace("'", "''")
+            op.execute(
+                f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {space_index_name(space, quantization)} "
+                f"ON vector_embeddings USING {index_type} "
+                f"({expression.format(dimensions=LEGACY_DIMENSIONS)} {operator_class}) WITH ({index_options(index_type)}) "
+                f"WHERE embedding_model = '{space_literal}'"
+            )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    index_type = os.getenv("VECTOR_INDEX_TYPE", "hnsw").lower()
+    index_names = op.get_bind().execute(sa.text(
+        "SELECT indexname FROM pg_indexes WHERE tablename = 'vector_embeddings' AND indexname LIKE 'ix\\_vector\\_embeddings\\_%ann\\_%'"
+    )).scalars().all()
+    with op.get_context().autocommit_block():
+        for index_name in index_names:
+            op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {index_name}")
+        op.execute(f"ALTER TABLE vector_embeddings ALTER COLUMN embedding TYPE vector({LEGACY_DIMENSIONS})")
+        # Back to the single full-precision index of 7b1e4d9a2c31
+        op.execute(
+            f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {LEGACY_INDEXES[0]} "
+            f"ON vector_embeddings USING {index_type} (embedding vector_cosine_ops) WITH ({index_options(index_type)})"
+        )
+    # ### commands auto generated by Alembic - please adjust! ###
+    op.drop_index(op.f('ix_embedding_spaces_status'), table_name='embedding_spaces')
+    op.drop_index(op.f('ix_embedding_spaces_id'), table_name='embedding_spaces')
+    op.drop_table('embedding_spaces')
+    # ### end Alembic commands ###
@@ -22,15 +22,21 @@ from app.schemas.chat_schemas import (
     ChatMessageOutput
 )
 from app.schemas.qa_schemas import QAInput
+from app.schemas.retrieval import ContextPassage, RetrievalFilters
 from app.agents.qa_agent import review_content
 from app.llm_clients import get_llm_client
-from app.services.vector_store import find_similar_embeddings
+from app.config import get_settings
+from app.services.answer_cache import get_answer_cache
+from app.services.context_packing import format_passages, pack_context
+from app.services.retrieval import search_knowledge_base
 from app.db.session import get_db # Use get_db for session management
 from app.crud import crud_chat # Import the new CRUD module
 from pydantic_ai import Agent
-from typing import Dict, List
+from typing import Dict, List, Optional
 from pydantic import BaseModel, Field
 
+settings = get_settings()
+
 # Define a Pydantic model for the LLM's expected chat response
 class ChatResponseModel(BaseModel):
     """Structure for the LLM's chat response."""
@@ -123,18 +129,43 @@ def get_or_create_conversation_db(conversation_id_str: str, db: Session) -> uuid
 
 
 # --- RAG Logic (Unchanged, but uses DB session now if needed) --- 
-def retrieve_rag_context(query: str, history: List[Dict[str, str]], db: Session) -> str:
-    """Retrieves relevant context from the vector store."""
-    search_query = query
+def retrieve_rag_passages(
+    query: str,
+    db: Session,
+    ef_search: Optional[int] = None,
+    probes: Optional[int] = None,
+    filters: Optional[RetrievalFilters] = None,
+) -> List[ContextPassage]:
+    """Retrieves relevant passages from the knowledge base (hybrid full-text + vector search).
+
+    `ef_search`/`probes` let callers trade ANN recall for latency per endpoint;
+    `filters` scope the search (files, media types, upload dates, tags).
+    RAG_CANDIDATES hits are packed into at most RAG_CONTEXT_TOKEN_BUDGET
+    tokens: overlapping chunks merged, near-duplicates dropped (see `context_packing`).
+    """
+    retrieval = search_knowledge_base(
+        db=db, query_text=query, limit=settings.RAG_CANDIDATES, ef_search=ef_search, probes=probes, filters=filters
+    )
+    return pack_context(db, retrieval.query_embedding, retrieval.chunks)
+
+def format_rag_context(passages: List[ContextPassage]) -> str:
+    """Renders retrieved passages for a prompt."""
+    if not passages:
+        return "No relevant context found in knowledge base for the query."
+    return format_passages(passages)
+
+def retrieve_rag_context(
+    query: str,
+    history: List[Dict[str, str]],
+    db: Session,
+    ef_search: Optional[int] = None,
+    probes: Optional[int] = None,
+    filters: Optional[RetrievalFilters] = None,
+) -> str:
+    """Retrieves relevant context from the knowledge base as prompt text (see `retrieve_rag_passages`)."""
     context_str = "No relevant context found in knowledge base."
     try:
-        # Assuming find_similar_embeddings handles its own DB session or accepts one
-        # If find_similar_embeddings needs a session, pass `db`
-        similar_embeddings = find_similar_embeddings(db=db, query_text=search_query, limit=3)
-        if similar_embeddings:
-            context_str = f"Found {len(similar_embeddings)} potentially relevant snippets in the knowledge base."
-        else:
-            context_str = "No relevant context found in knowledge base for the query."
+        context_str = format_rag_context(retrieve_rag_passages(query, db, ef_search=ef_search, probes=probes, filters=filters))
     except Exception as e:
         print(f"Error during RAG context retrieval: {e}")
     return context_str
@@ -144,8 +175,14 @@ def generate_chat_response(
     conversation_id_str: str, 
     user_prompt: str, 
     # mode: str = "cloud" # Removed mode parameter
+    filters: Optional[RetrievalFilters] = None,
 ) -> AssistantMessageOutput:
-    """Generates the chatbot response using DB history, RAG, and QA loop."""
+    """Generates the chatbot response using DB history, RAG (scoped by `filters`), and QA loop.
+
+    The first question of a conversation is answered from the semantic answer
+    cache when a near-identical question was answered (and QA-approved)
+    against the same knowledge base; see `answer_cache`.
+    """
     
     # with get_db() as db: # Incorrect usage
     db_gen = get_db()
@@ -159,7 +196,28 @@ def generate_chat_response(
         
         # 3. Get history & RAG context from DB
         history = get_recent_history_formatted_db(conversation_id, db)
-        rag_context = retrieve_rag_context(user_prompt, history, db) 
+
+        # Standalone questions (nothing before them in the conversation) may reuse an approved answer
+        answer_cache = get_answer_cache() if len(history) <= 1 else None
+        cache_key = None
+        if answer_cache is not None:
+            try:
+                cache_key = answer_cache.make_key(db, user_prompt, filters)
+                cached_answer = answer_cache.get(db, cache_key)
+            except Exception as e:
+                logger.warning(f"Answer cache lookup failed, generating: {e}")
+                cache_key, cached_answer = None, None
+            if cached_answer is not None:
+                add_message_to_db(conversation_id, "assistant", cached_answer, db)
+                return AssistantMessageOutput(content=cached_answer)
+
+        passages: List[ContextPassage] = []
+        rag_context = "No relevant context found in knowledge base."
+        try:
+            passages = retrieve_rag_passages(user_prompt, db, filters=filters)
+            rag_context = format_rag_context(passages)
+        except Exception as e:
+            print(f"Error during RAG context retrieval: {e}")
 
         # llm_client = get_llm_client(mode) # Incorrect call signature
         llm_client = get_llm_client() # Correct: Client determines mode internally
@@ -229,6 +287,8 @@ def generate_chat_response(
                 logger.debug(f"QA approved response on attempt {attempt + 1}")
                 final_response_content = current_response_content # Store approved content
                 feedback = None 
+                if cache_key is not None and passages: # Answers without knowledge-base context aren't reused
+                    answer_cache.put(cache_key, final_response_content, [passage.file_id for passage in passages])
                 break # Exit loop on approval
             else:
                 feedback = qa_result.feedback
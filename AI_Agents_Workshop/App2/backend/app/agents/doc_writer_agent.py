@@ -3,10 +3,11 @@ Implements the Document Writer Agent logic, orchestrating the use of
 document creation tools (Outline, Section Writer, Report Writer) and QA.
 """
 
-from typing import List
+from typing import List, Optional
 from pydantic import BaseModel
 
 from app.schemas.qa_schemas import QAInput
+from app.schemas.retrieval import RetrievalFilters
 from app.agents.qa_agent import review_content
 from app.agents.doc_writer_tools import (
     create_document_outline, 
@@ -18,12 +19,11 @@ from app.agents.doc_writer_tools import (
 # Placeholder imports for RAG and vectorization - replace with actual implementations
 from app.agents.chatbot_agent import retrieve_rag_context # Use chatbot's RAG for now
 # Need functions to handle vectorization based on file path/content
-# from app.services.vector_store import add_vector_embedding # Requires DB session and chunking
-from app.services.file_processor import extract_text, chunk_text # Corrected import
+from app.services.vector_store import add_vector_embeddings_bulk
+from app.services.chunking import chunk_text_with_offsets
 # from app.services.vector_store_service import add_embeddings_for_chunks # Assume a higher-level service # Removed import for non-existent module
 from app.crud import crud_file # Corrected import for file CRUD operations
 from app.db.session import get_db # For DB session
-from app.llm_clients import get_embedding_client # To get model name
 
 
 MAX_REVISIONS = 3 # Same as chatbot
@@ -33,8 +33,8 @@ class DocumentCreationResult(BaseModel):
     message: str
     file_path: str | None = None # Path to the final .docx file
 
-def create_document(prompt: str) -> DocumentCreationResult:
-    """Orchestrates the document creation process using OpenAI."""
+def create_document(prompt: str, filters: Optional[RetrievalFilters] = None) -> DocumentCreationResult:
+    """Orchestrates the document creation process using OpenAI; `filters` scope the RAG context."""
     print(f"--- Starting Document Creation for Prompt: '{prompt[:50]}...' ---")
     approved_sections: List[SectionContent] = []
     document_title = "Untitled Document"
@@ -44,7 +44,12 @@ def create_document(prompt: str) -> DocumentCreationResult:
     try:
         # 1. Retrieve RAG context (optional, based on prompt)
         # For simplicity, we use the chatbot's RAG logic here.
-        rag_context = retrieve_rag_context(prompt, []) # Pass empty history for now
+        rag_db_gen = get_db()
+        rag_db = next(rag_db_gen)
+        try:
+            rag_context = retrieve_rag_context(prompt, [], rag_db, filters=filters) # Pass empty history for now
+        finally:
+            next(rag_db_gen, None) # Consume generator to close session
         print(f"Retrieved RAG context: {rag_context[:100]}...")
 
         # 2. Create Outline
@@ -136,20 +141,14 @@ def create_document(prompt: str) -> DocumentCreationResult:
             full_doc_text = final_report.full_text 
             
             # Chunk the text (using existing service)
-            text_chunks = chunk_text(full_doc_text)
+            text_chunks = chunk_text_with_offsets(full_doc_text)
             print(f"Document chunked into {len(text_chunks)} chunks for vectorization.")
 
-            # Get embedding model based on mode (or config)
-            embedding_client = get_embedding_client() # Uses configured client
-            embedding_model_name = embedding_client.model
-
-            # Add embeddings (using a hypothetical higher-level service)
-            # This service would handle batching and DB interactions
-            add_embeddings_for_chunks(
+            # Add embeddings in bulk (batched requests, single transaction)
+            add_vector_embeddings_bulk(
                 db=db,
                 file_id=file_meta.id,
-                text_chunks=text_chunks,
-                embedding_model_name=embedding_model_name
+                text_chunks=[chunk for chunk in text_chunks if chunk.text.strip()],
             )
             print(f"Successfully added embeddings for {final_report.file_path}")
 
@@ -179,9 +178,3 @@ def create_document(prompt: str) -> DocumentCreationResult:
             message=f"Document creation failed: {e}",
             file_path=None
         )
-
-# Placeholder for vectorization service function
-# Replace with actual import from vector_store_service.py when implemented
-def add_embeddings_for_chunks(db, file_id, text_chunks, embedding_model_name):
-     print(f"Placeholder: Would add {len(text_chunks)} embeddings for file {file_id} using {embedding_model_name}")
-     pass 
\ No newline at end of file
@@ -3,7 +3,7 @@
 import os
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from functools import lru_cache
-from typing import Optional
+from typing import Dict, Optional, Tuple
 
 class Settings(BaseSettings):
     """Defines application settings loaded from environment variables."""
@@ -23,6 +23,114 @@ class Settings(BaseSettings):
     OPENAI_API_KEY: Optional[str] = None
     OPENAI_LLM_MODEL: str = "gpt-4.1"
     OPENAI_EMBEDDING_MODEL: str = "text-embedding-3-small"
+    EMBEDDING_DIMENSIONS: Optional[int] = None # Shortened vectors for text-embedding-3 models, e.g. 512 (None = model default)
+
+    # Embedding provider (see app/services/local_embeddings.py for the local ones)
+    EMBEDDING_PROVIDER: str = "openai" # "openai", or local on CPU "onnx" (needs onnxruntime) / "hashing" (deterministic, for tests)
+    LOCAL_EMBEDDING_MODEL_PATH: Optional[str] = None # Directory with model.onnx and tokenizer.json (onnx provider)
+    LOCAL_EMBEDDING_THREADS: Optional[int] = None # ONNX Runtime threads per request (None = CPU cores / EMBEDDING_MAX_CONCURRENCY)
+    LOCAL_EMBEDDING_BATCH_SIZE: int = 32 # Texts per forward pass; each request is split into passes of this size
+    LOCAL_EMBEDDING_MAX_TOKENS: int = 512 # Longer texts are truncated by the tokenizer
+    LOCAL_EMBEDDING_QUERY_PREFIX: str = "" # Task prefix some models expect, e.g. "search_query: " for nomic-embed-text
+    LOCAL_EMBEDDING_DOCUMENT_PREFIX: str = "" # e.g. "search_document: " for nomic-embed-text
+    HASHING_EMBEDDING_DIMENSIONS: int = 256 # Hashing provider vector size when EMBEDDING_DIMENSIONS is unset
+
+    # Embedding ingestion (bulk vectorization of uploaded files)
+    EMBEDDING_BATCH_SIZE: int = 128 # Max chunks sent in one embedding request
+    EMBEDDING_BATCH_MAX_TOKENS: int = 50000 # Approximate token cap per embedding request
+    EMBEDDING_MAX_CONCURRENCY: int = 4 # Embedding requests in flight at once per file
+
+    # Query embedding micro-batching across concurrent requests (see app/services/query_batcher.py)
+    QUERY_EMBED_BATCH_WINDOW_MS: float = 5.0 # How long the first query waits for others (0 = no batching)
+    QUERY_EMBED_MAX_BATCH: int = 64 # A batch is sent as soon as this many queries have joined
+
+    # Re-embedding into a new embedding space (model or dimensions changed; see app/services/reembedding.py)
+    REEMBED_AUTO_START: bool = True # Start or resume the job at startup when the configured space isn't active
+    REEMBED_SWITCH_COVERAGE: float = 1.0 # Fraction of files re-embedded before retrieval switches to the new space
+    REEMBED_MAX_CHUNKS_PER_SECOND: Optional[float] = None # Throttle for the background job (None = unthrottled)
+
+    # Chunking (token budgets per chunk; see app/services/chunking.py)
+    CHUNK_TOKENIZER: str = "tiktoken" # "tiktoken" (falls back to "chars" if its encoding can't load) or "chars"
+    CHUNK_SIZE_TOKENS: int = 400 # Target maximum tokens per chunk
+    CHUNK_OVERLAP_TOKENS: int = 40 # Tokens of trailing context repeated at the start of the next chunk
+    CHUNK_SIZE_OVERRIDES: Dict[str, Tuple[int, int]] = {} # (size, overlap) by media type or file kind, e.g. {"pdf": [512, 64]}
+
+    # Background ingestion jobs
+    INGESTION_MAX_CONCURRENT_JOBS: int = 2 # Files processed at once per worker process
+    INGESTION_EXTRACTION_WORKERS: Optional[int] = None # Text extraction processes (None = CPU count)
+    INGESTION_JOB_HISTORY: int = 1000 # Finished jobs kept for status queries
+
+    # Batch and archive uploads (POST /files/upload/batch)
+    BATCH_UPLOAD_MAX_FILES: int = 5000 # Files (incl. archive members) per request
+    BATCH_UPLOAD_MAX_BYTES: int = 10 * 1024 ** 3 # Total bytes written per request, after decompression
+
+    # Resumable uploads (/uploads; see app/services/resumable_uploads.py)
+    UPLOAD_SESSION_MAX_BYTES: int = 20 * 1024 ** 3 # Largest file accepted through an upload session
+    UPLOAD_SESSION_TTL_HOURS: int = 24 # Unfinished sessions (and their partial files) are removed after this
+
+    # Knowledge-base directory sync (files copied into KNOWLEDGE_BASE_PATH; see app/services/kb_sync.py)
+    KB_SYNC_INTERVAL_SECONDS: Optional[float] = 300 # Period of background full scans (None = sync on demand only)
+    KB_SYNC_USE_WATCHER: bool = True # Sync just the changed paths on filesystem events instead (needs watchdog; inotify on Linux)
+    KB_SYNC_SETTLE_SECONDS: float = 2.0 # Files modified more recently are left for the next sync (copies in progress)
+
+    # Parallel PDF extraction (page ranges run in the extraction process pool)
+    PDF_PAGES_PER_TASK: int = 16 # Pages extracted per worker task
+    PDF_EXTRACT_WORKERS: Optional[int] = None # Page ranges in flight per PDF (None = INGESTION_EXTRACTION_WORKERS)
+    PDF_EXTRACT_MAX_BUFFERED_MB: int = 64 # Ceiling on extracted text buffered ahead of the chunker
+
+    # Extracted-text cache (zstd-compressed PDF/DOCX text by content hash; see app/services/text_cache.py)
+    TEXT_CACHE_ENABLED: bool = True
+    TEXT_CACHE_PATH: str = "./.cache/extracted_text"
+    TEXT_CACHE_MAX_MB: int = 2048 # Least recently used documents are evicted beyond this (compressed size)
+    TEXT_CACHE_LEVEL: int = 3 # zstd compression level
+
+    # Near-duplicate chunks (boilerplate) reuse existing vectors (see app/services/near_duplicates.py)
+    NEAR_DUP_ENABLED: bool = True
+    NEAR_DUP_INDEX_PATH: str = "./.cache/chunk_signatures.sqlite3"
+    NEAR_DUP_MAX_HAMMING: int = 3 # Max differing SimHash bits out of 64 (at most 3)
+    NEAR_DUP_MIN_WORDS: int = 24 # Shorter chunks are always embedded (SimHash is unreliable on few words)
+
+    # Persistent embedding cache (shared SQLite file, used by all workers)
+    EMBEDDING_CACHE_ENABLED: bool = True
+    EMBEDDING_CACHE_PATH: str = "./.cache/embedding_cache.sqlite3"
+    EMBEDDING_CACHE_MAX_ENTRIES: int = 200000 # LRU bound (~6 KB per 1536-dim vector)
+
+    # Vector store backend (see app/services/vector_backends)
+    VECTOR_BACKEND: str = "pgvector" # "pgvector", or in-process "numpy" (exact) / "hnsw" (needs hnswlib)
+    VECTOR_STORE_PATH: str = "./.cache/vector_store" # On-disk location of the in-process backends
+
+    # Vector index (one per embedding space; see alembic revisions 7b1e4d9a2c31 and a3f7c2d9e614)
+    VECTOR_INDEX_TYPE: str = "hnsw" # "hnsw" or "ivfflat"; must match the index built by the migration
+    HNSW_M: int = 16 # HNSW graph degree (in-process hnsw backend; the migration reads the same variable)
+    HNSW_EF_CONSTRUCTION: int = 64 # HNSW build candidate list size (likewise)
+    HNSW_CHECKPOINT_SECONDS: float = 30.0 # In-process hnsw backend: changed graphs are saved at most this long after a commit
+    IVFFLAT_LISTS: int = 100 # IVFFlat list count for indexes of new embedding spaces (likewise)
+
+    # Quantized candidate search with exact rescoring (pgvector: alembic revision 8e3a6c1f9d52)
+    VECTOR_QUANTIZATION: str = "none" # "none", "halfvec", "binary", or "int8" (in-process backends only)
+    QUANTIZATION_RESCORE_FACTOR: int = 4 # Candidates per result rescored at full precision (binary needs ~10)
+    HNSW_EF_SEARCH: Optional[int] = None # Default hnsw.ef_search per query (None = server default, 40)
+    IVFFLAT_PROBES: Optional[int] = None # Default ivfflat.probes per query (None = server default, 1)
+    # Filtered ANN queries keep scanning the index until enough rows pass the filter (pgvector >= 0.8):
+    # "relaxed_order" (re-sorted afterwards), "strict_order" (HNSW only) or "off"
+    VECTOR_ITERATIVE_SCAN: str = "relaxed_order"
+    HNSW_MAX_SCAN_TUPLES: Optional[int] = None # Cap on tuples an iterative HNSW scan visits (None = server default, 20000)
+
+    # Retrieval (see app/services/retrieval.py)
+    RETRIEVAL_MODE: str = "hybrid" # "hybrid" (full-text + vector, rank-fused) or "vector"
+    HYBRID_CANDIDATES: int = 20 # Candidates taken from each source before fusion
+    RRF_K: int = 60 # Reciprocal rank fusion constant; higher flattens rank differences
+
+    # RAG context assembly (see app/services/context_packing.py)
+    RAG_CANDIDATES: int = 12 # Chunks retrieved as candidates for the prompt context
+    RAG_CONTEXT_TOKEN_BUDGET: int = 1500 # Tokens of retrieved text per prompt
+    RAG_MMR_LAMBDA: float = 0.7 # Relevance vs. diversity trade-off (1.0 = relevance only)
+
+    # Semantic answer cache for the chatbot (see app/services/answer_cache.py)
+    ANSWER_CACHE_ENABLED: bool = True
+    ANSWER_CACHE_MIN_SIMILARITY: float = 0.95 # Cosine similarity between questions needed to reuse an answer
+    ANSWER_CACHE_TTL_SECONDS: int = 86400 # Answers older than this are regenerated
+    ANSWER_CACHE_MAX_ENTRIES: int = 1000 # LRU bound per worker
 
     # Ollama settings removed
     # OLLAMA_BASE_URL: str = "http://localhost:11434"
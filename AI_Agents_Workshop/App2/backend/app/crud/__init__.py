@@ -3,27 +3,42 @@
 # Import specific functions if preferred, or the module
 from .crud_file import (
     create_file,
+    create_files,
     get_file,
     get_file_by_relative_path,
+    get_existing_relative_paths,
+    get_vectorized_file_by_content_hash,
     get_files,
+    get_all_files,
+    file_filter_conditions,
+    get_filtered_file_ids,
     update_file,
     delete_file,
 )
 
 # Import the module itself
 from . import crud_chat 
+from . import crud_embedding_space
 # Removed: from .crud_chat import conversation, message
 
 __all__ = [
     # File CRUD functions
     "create_file",
+    "create_files",
     "get_file",
     "get_file_by_relative_path",
+    "get_existing_relative_paths",
+    "get_vectorized_file_by_content_hash",
     "get_files",
+    "get_all_files",
+    "file_filter_conditions",
+    "get_filtered_file_ids",
     "update_file",
     "delete_file",
     # Chat CRUD module
     "crud_chat",
+    # Embedding space CRUD module
+    "crud_embedding_space",
     # Removed: "conversation",
     # Removed: "message",
 ]
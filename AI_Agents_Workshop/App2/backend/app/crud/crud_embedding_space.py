@@ -0,0 +1,95 @@
+"""CRUD operations for the EmbeddingSpace model."""
+
+import datetime
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from sqlalchemy import or_, select, update
+from typing import List, Optional
+
+from app.models import EmbeddingSpace
+
+ACTIVE = "active"
+BUILDING = "building"
+RETIRED = "retired"
+
+def get_space(db: Session, name: str) -> Optional[EmbeddingSpace]:
+    """Gets an embedding space by name."""
+    return db.execute(select(EmbeddingSpace).where(EmbeddingSpace.name == name)).scalar_one_or_none()
+
+def get_spaces(db: Session, status: Optional[str] = None) -> List[EmbeddingSpace]:
+    """Gets embedding spaces, newest first, optionally with one status."""
+    stmt = select(EmbeddingSpace).order_by(EmbeddingSpace.id.desc())
+    if status is not None:
+        stmt = stmt.where(EmbeddingSpace.status == status)
+    return db.execute(stmt).scalars().all()
+
+def get_or_create_active_space(db: Session, default_name: str) -> EmbeddingSpace:
+    """Gets the active space; on a fresh database, `default_name` becomes the active space."""
+    active = get_spaces(db, status=ACTIVE)
+    if active:
+        return active[0]
+    space = get_space(db, default_name) or EmbeddingSpace(name=default_name)
+    space.status = ACTIVE
+    space.activated_at = datetime.datetime.now(datetime.timezone.utc)
+    db.add(space)
+    try:
+        db.commit()
+    except IntegrityError: # Another worker bootstrapped it first
+        db.rollback()
+        return get_spaces(db, status=ACTIVE)[0]
+    db.refresh(space)
+    return space
+
+def get_unfinished_spaces(db: Session) -> List[EmbeddingSpace]:
+    """Gets spaces whose re-embedding has not completed: building, or active with the backfill still running."""
+    stmt = select(EmbeddingSpace).where(
+        EmbeddingSpace.completed_at.is_(None),
+        or_(
+            EmbeddingSpace.status == BUILDING,
+            (EmbeddingSpace.status == ACTIVE) & EmbeddingSpace.source_name.is_not(None),
+        ),
+    )
+    return db.execute(stmt.order_by(EmbeddingSpace.id)).scalars().all()
+
+def start_building_space(db: Session, name: str, source_name: str, files_total: int) -> EmbeddingSpace:
+    """Marks a space as building from `source_name`, keeping the checkpoint of an interrupted build."""
+    space = get_space(db, name) or EmbeddingSpace(name=name)
+    if space.status == BUILDING and space.source_name == source_name:
+        return space
+    space.status = BUILDING
+    space.source_name = source_name
+    space.files_total = files_total
+    space.files_done = 0
+    space.last_file_id = None
+    space.error = None
+    space.started_at = datetime.datetime.now(datetime.timezone.utc)
+    space.activated_at = None
+    space.completed_at = None
+    db.add(space)
+    db.commit()
+    db.refresh(space)
+    return space
+
+def update_space_progress(db: Session, space_id: int, **fields) -> None:
+    """Updates progress fields (files_done, last_file_id, error, completed_at) of a space."""
+    db.execute(update(EmbeddingSpace).where(EmbeddingSpace.id == space_id).values(**fields))
+    db.commit()
+
+def activate_space(db: Session, space_id: int) -> List[str]:
+    """Makes a space the active one and retires the previous one, in one transaction.
+
+    Returns the names of the retired spaces.
+    """
+    retired = db.execute(
+        update(EmbeddingSpace)
+        .where(EmbeddingSpace.status == ACTIVE, EmbeddingSpace.id != space_id)
+        .values(status=RETIRED)
+        .returning(EmbeddingSpace.name)
+    ).scalars().all()
+    db.execute(
+        update(EmbeddingSpace)
+        .where(EmbeddingSpace.id == space_id)
+        .values(status=ACTIVE, activated_at=datetime.datetime.now(datetime.timezone.utc), error=None)
+    )
+    db.commit()
+    return list(retired)
@@ -1,11 +1,11 @@
 """CRUD operations for the File model."""
 
 from sqlalchemy.orm import Session
-from sqlalchemy import select, delete
-from typing import List, Optional
+from sqlalchemy import select, delete, insert
+from typing import Iterable, List, Optional, Set, Tuple
 
 from app.models import File
-from app.schemas import FileCreate, FileUpdate
+from app.schemas import FileCreate, FileUpdate, RetrievalFilters
 
 def create_file(db: Session, file_in: FileCreate, relative_path: str) -> File:
     """Creates a new file record in the database."""
@@ -14,6 +14,9 @@ def create_file(db: Session, file_in: FileCreate, relative_path: str) -> File:
         relative_path=relative_path,
         media_type=file_in.media_type,
         file_size_bytes=file_in.file_size_bytes,
+        content_hash=file_in.content_hash,
+        mtime_ns=file_in.mtime_ns,
+        tags=file_in.tags,
         is_processing=False, # Default status
         is_vectorized=False
     )
@@ -22,6 +25,28 @@ def create_file(db: Session, file_in: FileCreate, relative_path: str) -> File:
     db.refresh(db_file)
     return db_file
 
+def create_files(db: Session, files_in: List[Tuple[FileCreate, str]]) -> List[int]:
+    """Creates file records for (schema, relative path) pairs in one INSERT; returns their IDs in order."""
+    if not files_in:
+        return []
+    rows = [
+        dict(
+            filename=file_in.filename,
+            relative_path=relative_path,
+            media_type=file_in.media_type,
+            file_size_bytes=file_in.file_size_bytes,
+            content_hash=file_in.content_hash,
+            mtime_ns=file_in.mtime_ns,
+            tags=file_in.tags,
+            is_processing=False,
+            is_vectorized=False,
+        )
+        for file_in, relative_path in files_in
+    ]
+    file_ids = db.execute(insert(File).returning(File.id, sort_by_parameter_order=True), rows).scalars().all()
+    db.commit()
+    return list(file_ids)
+
 def get_file(db: Session, file_id: int) -> Optional[File]:
     """Gets a file record by its ID."""
     return db.get(File, file_id)
@@ -31,11 +56,47 @@ def get_file_by_relative_path(db: Session, relative_path: str) -> Optional[File]
     stmt = select(File).where(File.relative_path == relative_path)
     return db.execute(stmt).scalar_one_or_none()
 
+def get_existing_relative_paths(db: Session, relative_paths: Iterable[str]) -> Set[str]:
+    """Returns which of the given relative paths already have a file record."""
+    stmt = select(File.relative_path).where(File.relative_path.in_(list(relative_paths)))
+    return set(db.execute(stmt).scalars().all())
+
+def get_vectorized_file_by_content_hash(db: Session, content_hash: str, exclude_file_id: Optional[int] = None) -> Optional[File]:
+    """Gets an already vectorized file record with the given content hash, if any."""
+    stmt = select(File).where(File.content_hash == content_hash, File.is_vectorized.is_(True))
+    if exclude_file_id is not None:
+        stmt = stmt.where(File.id != exclude_file_id)
+    return db.execute(stmt.order_by(File.id).limit(1)).scalar_one_or_none()
+
 def get_files(db: Session, skip: int = 0, limit: int = 100) -> List[File]:
     """Gets a list of file records."""
     stmt = select(File).offset(skip).limit(limit).order_by(File.created_at.desc())
     return db.execute(stmt).scalars().all()
 
+def get_all_files(db: Session) -> List[File]:
+    """Gets every file record (directory sync compares them with the disk)."""
+    return db.execute(select(File).order_by(File.id)).scalars().all()
+
+def file_filter_conditions(filters: RetrievalFilters) -> list:
+    """SQL conditions on File for the metadata parts of retrieval filters (everything but file_ids)."""
+    conditions = []
+    if filters.media_types:
+        conditions.append(File.media_type.in_(filters.media_types))
+    if filters.uploaded_after is not None:
+        conditions.append(File.created_at >= filters.uploaded_after)
+    if filters.uploaded_before is not None:
+        conditions.append(File.created_at < filters.uploaded_before)
+    if filters.tags:
+        conditions.append(File.tags.contains(filters.tags)) # tags @> ARRAY[...], GIN-indexed
+    return conditions
+
+def get_filtered_file_ids(db: Session, filters: RetrievalFilters) -> List[int]:
+    """Gets the IDs of the files matching retrieval filters."""
+    stmt = select(File.id).where(*file_filter_conditions(filters))
+    if filters.file_ids is not None:
+        stmt = stmt.where(File.id.in_(filters.file_ids))
+    return db.execute(stmt).scalars().all()
+
 def update_file(db: Session, db_file: File, file_in: FileUpdate) -> File:
     """Updates a file record."""
     update_data = file_in.model_dump(exclude_unset=True)
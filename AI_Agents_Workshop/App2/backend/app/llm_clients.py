@@ -1,10 +1,11 @@
 """Provides functions to get configured Pydantic AI LLM and Embedding clients.
-   Supports only OpenAI (CLOUD mode).
+   The LLM is OpenAI (CLOUD mode); embeddings come from OpenAI or, for
+   air-gapped deployments, a local CPU model (EMBEDDING_PROVIDER).
 """
 
 import logging
 from functools import lru_cache
-from typing import Union
+from typing import Optional, Tuple, Union
 import os
 
 # Imports:
@@ -19,12 +20,15 @@ from langchain_community.embeddings import OpenAIEmbeddings # Only OpenAI needed
 
 # Corrected config import
 from app.config import get_settings, Settings
+from app.services.embedding_cache import CachedEmbeddings, EmbeddingCache
+from app.services.local_embeddings import HASHING_MODEL, ONNX_PREFIX, HashingEmbeddings, OnnxEmbeddings
+from app.services.query_batcher import BatchedQueryEmbeddings
 
 logger = logging.getLogger(__name__)
 
 # Define specific return types using Union
 LlmClientType = OpenAIModel # Only OpenAI supported
-EmbeddingClientType = OpenAIEmbeddings # Only OpenAI supported
+EmbeddingClientType = Union[OpenAIEmbeddings, OnnxEmbeddings, HashingEmbeddings, BatchedQueryEmbeddings, CachedEmbeddings] # Optionally batched and cached
 
 @lru_cache()
 def get_llm_client() -> LlmClientType:
@@ -45,9 +49,80 @@ def get_llm_client() -> LlmClientType:
     return OpenAIModel(settings.OPENAI_LLM_MODEL, provider=provider)
 
 @lru_cache()
-def get_embedding_client() -> EmbeddingClientType:
-    """Returns a configured Langchain OpenAI Embedding client."""
+def get_embedding_cache() -> EmbeddingCache:
+    """Returns the shared on-disk embedding cache."""
     settings = get_settings()
+    return EmbeddingCache(settings.EMBEDDING_CACHE_PATH, settings.EMBEDDING_CACHE_MAX_ENTRIES)
+
+def embedding_space_name(model: str, dimensions: Optional[int] = None) -> str:
+    """Identifies an embedding space: the model plus its output dimensions, if shortened.
+
+    Stored with every embedding (`embedding_model` column), so vectors of
+    different models or sizes are never compared with each other.
+    """
+    return f"{model}@{dimensions}" if dimensions else model
+
+def parse_embedding_space(space: str) -> Tuple[str, Optional[int]]:
+    """Splits an embedding space name back into (model, dimensions)."""
+    model, _, dimensions = space.partition("@")
+    return model, int(dimensions) if dimensions else None
+
+def get_configured_embedding_space() -> str:
+    """Returns the embedding space set by EMBEDDING_PROVIDER, its model and EMBEDDING_DIMENSIONS.
+
+    Local models are named after their provider ("onnx:<model directory>",
+    "hashing@<dimensions>"), so switching providers starts a re-embedding
+    job like any other model change.
+    """
+    settings = get_settings()
+    provider = settings.EMBEDDING_PROVIDER.lower()
+    if provider == "openai":
+        return embedding_space_name(settings.OPENAI_EMBEDDING_MODEL, settings.EMBEDDING_DIMENSIONS)
+    if provider == "onnx":
+        if not settings.LOCAL_EMBEDDING_MODEL_PATH:
+            raise ValueError("EMBEDDING_PROVIDER=onnx requires LOCAL_EMBEDDING_MODEL_PATH.")
+        model_name = os.path.basename(os.path.normpath(settings.LOCAL_EMBEDDING_MODEL_PATH))
+        return embedding_space_name(ONNX_PREFIX + model_name, settings.EMBEDDING_DIMENSIONS)
+    if provider == "hashing":
+        return embedding_space_name(HASHING_MODEL, settings.EMBEDDING_DIMENSIONS or settings.HASHING_EMBEDDING_DIMENSIONS)
+    raise ValueError(f"Unsupported EMBEDDING_PROVIDER '{settings.EMBEDDING_PROVIDER}' (expected 'openai', 'onnx' or 'hashing').")
+
+def get_embedding_client(space: Optional[str] = None) -> EmbeddingClientType:
+    """Returns a configured Langchain Embedding client (OpenAI or local).
+
+    `space` selects the model and output dimensions (see `embedding_space_name`);
+    by default the configured ones are used. Concurrent query embeddings are
+    micro-batched (QUERY_EMBED_BATCH_WINDOW_MS; see `query_batcher`), except
+    for the hashing embedder, which has no per-call cost to share. When
+    EMBEDDING_CACHE_ENABLED, the client is wrapped in the persistent embedding
+    cache, so query and document embeddings both go through it and only cache
+    misses are batched.
+    """
+    return _create_embedding_client(space or get_configured_embedding_space())
+
+def create_base_embedding_client(space: str) -> Union[OpenAIEmbeddings, OnnxEmbeddings, HashingEmbeddings]:
+    """Creates the client that computes a space's vectors, without batching or caching."""
+    settings = get_settings()
+    model, dimensions = parse_embedding_space(space)
+    if model == HASHING_MODEL:
+        logger.info(f"Using local hashing embeddings: {space}")
+        return HashingEmbeddings(dimensions or settings.HASHING_EMBEDDING_DIMENSIONS)
+    if model.startswith(ONNX_PREFIX):
+        model_path = settings.LOCAL_EMBEDDING_MODEL_PATH
+        if not model_path or ONNX_PREFIX + os.path.basename(os.path.normpath(model_path)) != model:
+            raise ValueError(f"Embedding space '{space}' needs LOCAL_EMBEDDING_MODEL_PATH to point at its model directory.")
+        threads = settings.LOCAL_EMBEDDING_THREADS or max(1, (os.cpu_count() or 1) // max(1, settings.EMBEDDING_MAX_CONCURRENCY))
+        logger.info(f"Using local ONNX embeddings: {space}")
+        return OnnxEmbeddings(
+            model_path,
+            dimensions=dimensions,
+            threads=threads,
+            batch_size=settings.LOCAL_EMBEDDING_BATCH_SIZE,
+            max_tokens=settings.LOCAL_EMBEDDING_MAX_TOKENS,
+            query_prefix=settings.LOCAL_EMBEDDING_QUERY_PREFIX,
+            document_prefix=settings.LOCAL_EMBEDDING_DOCUMENT_PREFIX,
+        )
+
     logger.info(f"Creating OpenAI Embedding client") # Simplified log
 
     # # --- DEBUG: Print the key from the environment --- 
@@ -59,9 +134,29 @@ def get_embedding_client() -> EmbeddingClientType:
     if not settings.OPENAI_API_KEY:
         logger.error("OPENAI_API_KEY not set.")
         raise ValueError("OpenAI API key is required.")
-    logger.info(f"Using Langchain OpenAI Embedding: {settings.OPENAI_EMBEDDING_MODEL}")
-    # Explicitly pass the key loaded from settings (from .env)
-    return OpenAIEmbeddings(model=settings.OPENAI_EMBEDDING_MODEL, openai_api_key=settings.OPENAI_API_KEY)
+    logger.info(f"Using Langchain OpenAI Embedding: {space}")
+    # Explicitly pass the key loaded from settings (from .env); the API shortens
+    # (and re-normalizes) text-embedding-3 vectors to `dimensions` server-side
+    model_kwargs = {"dimensions": dimensions} if dimensions else {}
+    return OpenAIEmbeddings(model=model, openai_api_key=settings.OPENAI_API_KEY, model_kwargs=model_kwargs)
+
+@lru_cache()
+def _create_embedding_client(space: str) -> EmbeddingClientType:
+    settings = get_settings()
+    client = base_client = create_base_embedding_client(space)
+    if settings.QUERY_EMBED_BATCH_WINDOW_MS > 0 and not isinstance(client, HashingEmbeddings):
+        client = BatchedQueryEmbeddings(client, settings.QUERY_EMBED_BATCH_WINDOW_MS, settings.QUERY_EMBED_MAX_BATCH)
+    if not settings.EMBEDDING_CACHE_ENABLED:
+        return client
+    logger.info(f"Using persistent embedding cache at {settings.EMBEDDING_CACHE_PATH}")
+    # Task prefixes (local models) make query and document vectors of the same text differ
+    document_prefix = getattr(base_client, "document_prefix", "")
+    query_prefix = getattr(base_client, "query_prefix", "")
+    return CachedEmbeddings(
+        client, get_embedding_cache(),
+        namespace=f"{space}|{document_prefix}" if document_prefix else space,
+        query_namespace=f"{space}|{query_prefix}" if query_prefix else space,
+    )
 
 # Example Usage:
 # from app.llm_clients import get_llm_client, get_embedding_client
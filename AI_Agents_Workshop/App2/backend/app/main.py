@@ -1,10 +1,14 @@
 """Main FastAPI application entrypoint."""
 
+import threading
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from app.config import get_settings
-from app.routers import files, agents, chat_router, documents_router # Import the documents_router
+from app.routers import files, agents, chat_router, documents_router, metrics, jobs, embeddings, uploads # Import the documents_router
+from app.services import ingestion_jobs, kb_sync, reembedding, vector_store
+from app.services.vector_backends import get_vector_backend
 
 # TODO: Implement proper settings management (e.g., using Pydantic Settings)
 # from . import config
@@ -44,6 +48,38 @@ app.include_router(files.router, prefix="/files", tags=["Files"])
 app.include_router(agents.router, prefix="/agents", tags=["Agents"]) # Add agents router
 app.include_router(chat_router.router, prefix="/chats", tags=["Chat"]) # Add chat router
 app.include_router(documents_router.router, prefix="/documents", tags=["Documents"]) # Add documents router
+app.include_router(metrics.router, prefix="/metrics", tags=["Metrics"])
+app.include_router(jobs.router, prefix="/jobs", tags=["Jobs"])
+app.include_router(embeddings.router, prefix="/embeddings", tags=["Embeddings"])
+app.include_router(uploads.router, prefix="/uploads", tags=["Uploads"])
+
+@app.on_event("startup")
+def load_vector_store():
+    """Starts loading an in-process vector store in the background; queries wait for it if needed."""
+    threading.Thread(target=get_vector_backend().load, name="vector-store-load", daemon=True).start()
+
+@app.on_event("startup")
+def prepare_vector_indexes():
+    """Builds missing ANN indexes of the embedding spaces being written to, off the ingestion path."""
+    threading.Thread(target=vector_store.prepare_write_space_indexes, name="vector-index-prepare", daemon=True).start()
+
+@app.on_event("startup")
+def resume_reembedding():
+    """Resumes an interrupted re-embedding job, or starts one if the embedding model or dimensions changed."""
+    threading.Thread(target=reembedding.resume_on_startup, name="reembedding-resume", daemon=True).start()
+
+@app.on_event("startup")
+def start_knowledge_base_sync():
+    """Starts syncing files copied into the knowledge-base directory (periodic scans or filesystem events)."""
+    kb_sync.start()
+
+@app.on_event("shutdown")
+def shutdown_ingestion_workers():
+    """Stops background ingestion pools, directory sync and re-embedding so the server can exit promptly."""
+    kb_sync.shutdown()
+    ingestion_jobs.shutdown()
+    reembedding.shutdown()
+    get_vector_backend().flush() # Saves deferred in-process index checkpoints
 
 # Add other routers and endpoints here later
 # Example:
@@ -4,5 +4,7 @@ from .base import Base
 from .file import File
 from .vector_embedding import VectorEmbedding
 from .chat import Conversation, ChatMessage
+from .embedding_space import EmbeddingSpace
+from .upload_session import UploadSession
 
-__all__ = ["Base", "File", "VectorEmbedding", "Conversation", "ChatMessage"]
+__all__ = ["Base", "File", "VectorEmbedding", "Conversation", "ChatMessage", "EmbeddingSpace", "UploadSession"]
@@ -0,0 +1,39 @@
+"""SQLAlchemy model for embedding spaces (model + dimensions) and their lifecycle.
+
+Every stored embedding is labelled with its space name (`vector_embeddings.embedding_model`).
+Exactly one space is "active" and serves retrieval; a "building" space is being
+backfilled by the re-embedding job (see app/services/reembedding.py) and
+receives new uploads alongside the active one until it takes over. Replaced
+spaces are "retired"; their rows are removed once the backfill completes.
+"""
+
+import datetime
+from sqlalchemy import String, DateTime, func, Integer
+from sqlalchemy.orm import Mapped, mapped_column
+
+from .base import Base
+
+class EmbeddingSpace(Base):
+    """Represents one embedding space and its migration progress."""
+    __tablename__ = "embedding_spaces"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
+    name: Mapped[str] = mapped_column(String, unique=True, nullable=False) # e.g. text-embedding-3-small@512
+    status: Mapped[str] = mapped_column(String, nullable=False, index=True) # active, building or retired
+
+    # Re-embedding progress (files whose chunks exist in this space)
+    source_name: Mapped[str] = mapped_column(String, nullable=True) # Space the chunks are re-embedded from
+    files_total: Mapped[int] = mapped_column(Integer, nullable=True)
+    files_done: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    last_file_id: Mapped[int] = mapped_column(Integer, nullable=True) # Keyset checkpoint: resume after this file
+    error: Mapped[str] = mapped_column(String, nullable=True)
+
+    created_at: Mapped[datetime.datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now()
+    )
+    started_at: Mapped[datetime.datetime] = mapped_column(DateTime(timezone=True), nullable=True) # Re-embedding began
+    activated_at: Mapped[datetime.datetime] = mapped_column(DateTime(timezone=True), nullable=True)
+    completed_at: Mapped[datetime.datetime] = mapped_column(DateTime(timezone=True), nullable=True) # Backfilled, source removed
+
+    def __repr__(self) -> str:
+        return f"<EmbeddingSpace(id={self.id}, name='{self.name}', status='{self.status}')>"
@@ -1,7 +1,9 @@
 """SQLAlchemy model for storing file metadata."""
 
 import datetime
-from sqlalchemy import String, DateTime, func, Integer, Boolean
+from typing import List
+from sqlalchemy import BigInteger, String, DateTime, func, Integer, Boolean, Index
+from sqlalchemy.dialects.postgresql import ARRAY
 from sqlalchemy.orm import Mapped, mapped_column
 
 from .base import Base
@@ -9,21 +11,27 @@ from .base import Base
 class File(Base):
     """Represents a file stored in the knowledge base."""
     __tablename__ = "files"
+    __table_args__ = (
+        # Tag filters are array containment (tags @> ARRAY[...]) on a GIN index
+        Index("ix_files_tags", "tags", postgresql_using="gin"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
     filename: Mapped[str] = mapped_column(String, index=True, nullable=False)
     # Store the path relative to the KNOWLEDGE_BASE_PATH
     relative_path: Mapped[str] = mapped_column(String, unique=True, nullable=False)
-    file_size_bytes: Mapped[int] = mapped_column(Integer, nullable=True)
+    file_size_bytes: Mapped[int] = mapped_column(BigInteger, nullable=True) # Resumable uploads allow multi-GB files
     content_hash: Mapped[str] = mapped_column(String, nullable=True, index=True) # Optional hash of file content
-    media_type: Mapped[str] = mapped_column(String, nullable=True) # e.g., application/pdf, text/plain
+    media_type: Mapped[str] = mapped_column(String, nullable=True, index=True) # e.g., application/pdf, text/plain
+    mtime_ns: Mapped[int] = mapped_column(BigInteger, nullable=True) # Modification time on disk when last stored or synced
+    tags: Mapped[List[str]] = mapped_column(ARRAY(String), nullable=False, default=list, server_default="{}")
 
     is_processing: Mapped[bool] = mapped_column(Boolean, default=False, nullable=False)
     is_vectorized: Mapped[bool] = mapped_column(Boolean, default=False, nullable=False, index=True)
     vectorization_error: Mapped[str] = mapped_column(String, nullable=True)
 
     created_at: Mapped[datetime.datetime] = mapped_column(
-        DateTime(timezone=True), server_default=func.now()
+        DateTime(timezone=True), server_default=func.now(), index=True
     )
     updated_at: Mapped[datetime.datetime] = mapped_column(
         DateTime(timezone=True), server_default=func.now(), onupdate=func.now()
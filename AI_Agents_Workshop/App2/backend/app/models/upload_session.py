@@ -0,0 +1,44 @@
+"""SQLAlchemy model for resumable upload sessions.
+
+A session reserves a knowledge-base path and a partial file of the declared
+size; clients PUT byte ranges in any order (retrying only what is missing)
+and complete the session once every byte has arrived, which turns it into a
+regular `files` row. See app/services/resumable_uploads.py.
+"""
+
+import datetime
+from typing import List
+from sqlalchemy import BigInteger, JSON, String, DateTime, func, Integer, ForeignKey
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.orm import Mapped, mapped_column
+
+from .base import Base
+
+class UploadSession(Base):
+    """Represents one resumable upload and the byte ranges received so far."""
+    __tablename__ = "upload_sessions"
+
+    id: Mapped[str] = mapped_column(String(32), primary_key=True) # Random hex token, also the partial file name
+    filename: Mapped[str] = mapped_column(String, nullable=False)
+    relative_path: Mapped[str] = mapped_column(String, nullable=False, index=True) # Reserved destination
+    media_type: Mapped[str] = mapped_column(String, nullable=True)
+    tags: Mapped[List[str]] = mapped_column(ARRAY(String), nullable=False, default=list, server_default="{}")
+    size: Mapped[int] = mapped_column(BigInteger, nullable=False) # Declared total size in bytes
+    expected_sha256: Mapped[str] = mapped_column(String, nullable=True) # Optional client-side hash, checked on completion
+
+    received_ranges: Mapped[list] = mapped_column(JSON, nullable=False, default=list) # Sorted, merged [start, end) pairs
+    bytes_received: Mapped[int] = mapped_column(BigInteger, default=0, nullable=False)
+    status: Mapped[str] = mapped_column(String, nullable=False, index=True) # open, completed or failed
+    error: Mapped[str] = mapped_column(String, nullable=True)
+    file_id: Mapped[int] = mapped_column(Integer, ForeignKey("files.id", ondelete="SET NULL"), nullable=True) # Set on completion
+
+    created_at: Mapped[datetime.datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now()
+    )
+    updated_at: Mapped[datetime.datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), onupdate=func.now()
+    )
+    expires_at: Mapped[datetime.datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+
+    def __repr__(self) -> str:
+        return f"<UploadSession(id='{self.id}', relative_path='{self.relative_path}', status='{self.status}')>"
@@ -1,32 +1,50 @@
 """SQLAlchemy model for storing vector embeddings."""
 
 import datetime
-from sqlalchemy import Integer, ForeignKey, DateTime, func, String
+from sqlalchemy import Integer, ForeignKey, DateTime, func, String, Text, Index, Computed
+from sqlalchemy.dialects.postgresql import TSVECTOR
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from pgvector.sqlalchemy import Vector
 
 from .base import Base
 
-# Determine vector dimensions based on embedding model in config?
-# Or just set a reasonably large default? OpenAI text-embedding-3-small is 1536
-# Nomic-embed-text is 768. Let's use 1536 for now to be safe.
-VECTOR_DIMENSIONS = 1536
+# Text search configuration for the lexical index; queries must use the same one
+TEXT_SEARCH_CONFIG = "english"
 
 class VectorEmbedding(Base):
     """Represents a vector embedding associated with a file or chunk."""
     __tablename__ = "vector_embeddings"
+    __table_args__ = (
+        # Look up reusable vectors by chunk content and model
+        Index("ix_vector_embeddings_chunk_hash_embedding_model", "chunk_hash", "embedding_model"),
+        # Lexical (full-text) search over chunk text, fused with vector search
+        Index("ix_vector_embeddings_chunk_tsv", "chunk_tsv", postgresql_using="gin"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
 
     # Foreign key to the file this embedding belongs to
     file_id: Mapped[int] = mapped_column(Integer, ForeignKey("files.id", ondelete="CASCADE"), index=True)
-    # TODO: Add chunk identifier if implementing chunking
+
+    # The chunk this embedding was generated from
+    chunk_index: Mapped[int] = mapped_column(Integer, nullable=True) # Position of the chunk in the file
+    chunk_text: Mapped[str] = mapped_column(Text, nullable=True)
+    chunk_hash: Mapped[str] = mapped_column(String(64), nullable=True) # SHA-256 of chunk_text, for embedding reuse
+    char_start: Mapped[int] = mapped_column(Integer, nullable=True) # Offsets into the extracted text
+    char_end: Mapped[int] = mapped_column(Integer, nullable=True)
+    # Full-text search vector of chunk_text, maintained by the database
+    chunk_tsv: Mapped[str] = mapped_column(
+        TSVECTOR, Computed(f"to_tsvector('{TEXT_SEARCH_CONFIG}'::regconfig, coalesce(chunk_text, ''))", persisted=True), nullable=True
+    )
 
     # The actual vector embedding
-    embedding: Mapped[Vector] = mapped_column(Vector(VECTOR_DIMENSIONS))
+    # No fixed size: each embedding space (model + dimensions) has its own size. ANN indexes are
+    # partial expression indexes per space, e.g. on (embedding::vector(512)) WHERE embedding_model = '...',
+    # created by alembic revision a3f7c2d9e614 and the pgvector backend (see PgVectorStore.prepare_space).
+    embedding: Mapped[Vector] = mapped_column(Vector())
 
     # Metadata
-    embedding_model: Mapped[str] = mapped_column(String, nullable=True) # Store which model generated it
+    embedding_model: Mapped[str] = mapped_column(String, nullable=True) # Embedding space that generated it (model[@dimensions])
     created_at: Mapped[datetime.datetime] = mapped_column(
         DateTime(timezone=True), server_default=func.now()
     )
@@ -35,4 +53,4 @@ class VectorEmbedding(Base):
     # file = relationship("File", back_populates="embeddings") # Needs back_populates on File model
 
     def __repr__(self) -> str:
-        return f"<VectorEmbedding(id={self.id}, file_id={self.file_id}, model='{self.embedding_model}')>" 
\ No newline at end of file
+        return f"<VectorEmbedding(id={self.id}, file_id={self.file_id}, chunk_index={self.chunk_index}, model='{self.embedding_model}')>" 
\ No newline at end of file
@@ -40,6 +40,7 @@ def send_message(
         assistant_response = generate_chat_response(
             conversation_id_str=conversation_id, 
             user_prompt=user_message.content,
+            filters=user_message.filters,
             # mode=user_message.mode # Removed mode
         )
         return assistant_response
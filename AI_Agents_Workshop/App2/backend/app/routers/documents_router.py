@@ -4,7 +4,9 @@ API Router for Document Creation interactions.
 
 from fastapi import APIRouter, HTTPException, Body, BackgroundTasks
 from pydantic import BaseModel
+from typing import Optional
 
+from app.schemas.retrieval import RetrievalFilters
 from app.agents.doc_writer_agent import create_document, DocumentCreationResult
 
 router = APIRouter()
@@ -12,6 +14,7 @@ router = APIRouter()
 class DocumentCreateRequest(BaseModel):
     """Request model for initiating document creation."""
     prompt: str
+    filters: Optional[RetrievalFilters] = None # Scope the knowledge-base context (files, media types, dates, tags)
     # mode: str = "cloud" # Allow specifying mode - Removed
 
 @router.post("/create", response_model=DocumentCreationResult, status_code=202) # Use 202 Accepted for background tasks
@@ -22,7 +25,7 @@ def create_document_endpoint(
     """Initiates the document creation process in the background."""
     # Add the potentially long-running task to the background
     # background_tasks.add_task(create_document, request.prompt, request.mode)
-    background_tasks.add_task(create_document, request.prompt) # Removed mode
+    background_tasks.add_task(create_document, request.prompt, request.filters) # Removed mode
     
     # Immediately return an accepted response
     return DocumentCreationResult(
@@ -0,0 +1,32 @@
+"""
+API Router for embedding spaces: status and background re-embedding.
+"""
+
+import logging
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.orm import Session
+from typing import List
+
+from app import schemas
+from app.crud import crud_embedding_space
+from app.db.session import get_db
+from app.services import reembedding
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+@router.get("/spaces", response_model=List[schemas.EmbeddingSpaceRead])
+def list_spaces(db: Session = Depends(get_db)):
+    """Lists embedding spaces (active, building, retired) with re-embedding progress, newest first."""
+    return crud_embedding_space.get_spaces(db)
+
+@router.post("/reembed", response_model=schemas.EmbeddingSpaceRead, status_code=status.HTTP_202_ACCEPTED)
+def start_reembedding(db: Session = Depends(get_db)):
+    """Starts or resumes re-embedding the knowledge base into the configured space (model + EMBEDDING_DIMENSIONS).
+
+    Retrieval keeps using the current space until REEMBED_SWITCH_COVERAGE of the files are covered.
+    """
+    try:
+        return reembedding.start_reembedding(db)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
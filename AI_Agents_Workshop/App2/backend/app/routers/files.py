@@ -1,27 +1,30 @@
 """API Endpoints for file management."""
 
 import os
-import shutil
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File as FastAPIFile, status
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File as FastAPIFile, Form, status
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 import logging
 
 from app import schemas, crud, models
 from app.db.session import get_db
 from app.config import get_settings
-from app.services import file_processor, vector_store # Ensure vector_store is imported
+from app.services import batch_upload, file_processor, vector_store, ingestion_jobs, kb_sync # Ensure vector_store is imported
 
 router = APIRouter()
 settings = get_settings()
 logger = logging.getLogger(__name__) # Add logger
 
-@router.post("/upload", response_model=schemas.FileRead, status_code=status.HTTP_201_CREATED)
-def upload_file(file: UploadFile = FastAPIFile(...), db: Session = Depends(get_db)):
+@router.post("/upload", response_model=schemas.FileUploadRead, status_code=status.HTTP_201_CREATED)
+def upload_file(
+    file: UploadFile = FastAPIFile(...),
+    tags: Optional[str] = Form(None, description="Comma-separated tags for scoping retrieval."),
+    db: Session = Depends(get_db),
+):
     """Handles file uploads, saves the file, and creates a DB record.
 
-    This currently saves the file directly. In a production scenario,
-    consider background tasks for processing and vectorization.
+    Processing and vectorization run as a background ingestion job; the
+    response returns immediately with a `job_id` to poll at /jobs/{job_id}.
     """
     if not file.filename:
         raise HTTPException(status_code=400, detail="No filename provided.")
@@ -30,6 +33,9 @@ def upload_file(file: UploadFile = FastAPIFile(...), db: Session = Depends(get_d
     # Basic sanitization (consider more robust checks)
     safe_filename = os.path.basename(file.filename)
     relative_save_path = safe_filename # Simplistic path for now
+    if not kb_sync.is_synced_path(relative_save_path):
+        # Same rule as batch and resumable uploads; the knowledge-base sync would remove anything else
+        raise HTTPException(status_code=400, detail="Unsupported file type or hidden file.")
     full_save_path = os.path.join(kb_path, relative_save_path)
 
     # Ensure knowledgebase directory exists
@@ -45,9 +51,8 @@ def upload_file(file: UploadFile = FastAPIFile(...), db: Session = Depends(get_d
 
     file_size = 0
     try:
-        with open(full_save_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
-        file_size = os.path.getsize(full_save_path)
+        # Hash while writing so duplicate content can reuse existing embeddings
+        file_size, content_hash = file_processor.save_stream_with_hash(file.file, full_save_path)
     except Exception as e:
         # Clean up partially saved file if error occurs
         if os.path.exists(full_save_path):
@@ -63,25 +68,44 @@ def upload_file(file: UploadFile = FastAPIFile(...), db: Session = Depends(get_d
     file_in = schemas.FileCreate(
         filename=safe_filename,
         media_type=file.content_type,
-        file_size_bytes=file_size
+        file_size_bytes=file_size,
+        content_hash=content_hash,
+        mtime_ns=os.stat(full_save_path).st_mtime_ns,
+        tags=tags.split(",") if tags else [],
     )
     db_file = crud.create_file(db=db, file_in=file_in, relative_path=relative_save_path)
 
-    # --- Trigger processing synchronously (for now) --- 
-    print(f"File '{safe_filename}' uploaded successfully. DB ID: {db_file.id}")
-    print("Triggering synchronous file processing/vectorization...")
-    try:
-        # Pass the db_file.id and the existing session
-        file_processor.process_file_and_vectorize(db_file.id, db)
-        print(f"Synchronous processing finished for file ID: {db_file.id}")
-        # Refresh the file object to get updated status
-        db.refresh(db_file)
-    except Exception as e:
-        # Log the error but don't crash the upload request itself
-        # The processing function should handle setting the error state in the DB
-        print(f"Error during synchronous processing trigger for file ID {db_file.id}: {e}")
+    # --- Queue processing/vectorization in the background --- 
+    logger.info(f"File '{safe_filename}' uploaded successfully. DB ID: {db_file.id}")
+    job = ingestion_jobs.submit_ingestion_job(db_file.id)
+
+    response = schemas.FileUploadRead.model_validate(db_file)
+    response.job_id = job.job_id
+    return response
+
+@router.post("/upload/batch", response_model=schemas.BatchUploadRead, status_code=status.HTTP_201_CREATED)
+def upload_files_batch(
+    files: List[UploadFile] = FastAPIFile(..., description="Documents and/or .zip/.tar(.gz|.bz2|.xz) archives of documents."),
+    tags: Optional[str] = Form(None, description="Comma-separated tags applied to every file."),
+    db: Session = Depends(get_db),
+):
+    """Uploads many files at once; archives are unpacked member by member, keeping their folder structure.
+
+    All files are registered in one DB write and ingested concurrently in the
+    background; the response has a status (and `job_id`) per file.
+    """
+    return batch_upload.store_batch(db, files, tags.split(",") if tags else [])
+
+@router.post("/sync", response_model=schemas.KnowledgeBaseSyncRead)
+def sync_knowledge_base_directory(db: Session = Depends(get_db)):
+    """Syncs the knowledge-base directory with the DB: ingests new/changed files, removes deleted ones.
 
-    return db_file
+    Ingestion runs as background jobs (see `job_ids`); files are compared by size and mtime, then hash.
+    """
+    try:
+        return kb_sync.sync_knowledge_base(db)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
 
 @router.get("/", response_model=List[schemas.FileRead])
 def list_files(
@@ -93,6 +117,18 @@ def list_files(
     files = crud.get_files(db, skip=skip, limit=limit)
     return files
 
+@router.put("/{file_id}/tags", response_model=schemas.FileRead)
+def update_file_tags(
+    file_id: int,
+    tags_in: schemas.FileTagsUpdate,
+    db: Session = Depends(get_db)
+):
+    """Replaces a file's tags (used by retrieval filters); takes effect on the next query."""
+    db_file = crud.get_file(db, file_id=file_id)
+    if not db_file:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="File not found")
+    return crud.update_file(db, db_file=db_file, file_in=schemas.FileUpdate(tags=tags_in.tags))
+
 @router.delete("/{file_id}", response_model=schemas.FileRead, status_code=status.HTTP_200_OK)
 def delete_file_endpoint(
     file_id: int,
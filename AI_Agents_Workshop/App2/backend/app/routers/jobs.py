@@ -0,0 +1,35 @@
+"""
+API Router for background ingestion jobs: progress and cancellation.
+"""
+
+import logging
+from fastapi import APIRouter, HTTPException, status
+from typing import List, Optional
+
+from app import schemas
+from app.services import ingestion_jobs
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+@router.get("/", response_model=List[schemas.IngestionJobRead])
+def list_jobs(file_id: Optional[int] = None):
+    """Lists ingestion jobs known to this worker, newest first (optionally for one file)."""
+    return [job.to_schema() for job in ingestion_jobs.list_jobs(file_id=file_id)]
+
+@router.get("/{job_id}", response_model=schemas.IngestionJobRead)
+def get_job(job_id: str):
+    """Returns the status and progress (pages parsed, chunks embedded) of a job."""
+    job = ingestion_jobs.get_job(job_id)
+    if not job:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Job not found")
+    return job.to_schema()
+
+@router.post("/{job_id}/cancel", response_model=schemas.IngestionJobRead, status_code=status.HTTP_202_ACCEPTED)
+def cancel_job(job_id: str):
+    """Requests cancellation of a queued or running job."""
+    job = ingestion_jobs.cancel_job(job_id)
+    if not job:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Job not found")
+    logger.info(f"Cancellation requested for ingestion job {job_id}")
+    return job.to_schema()
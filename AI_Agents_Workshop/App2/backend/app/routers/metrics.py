@@ -0,0 +1,56 @@
+"""
+API Router exposing runtime metrics for tuning (embedding cache, etc.).
+"""
+
+import logging
+from fastapi import APIRouter, HTTPException
+
+from app.config import get_settings
+from app.llm_clients import get_embedding_cache
+from app.services import query_batcher
+from app.services.answer_cache import get_answer_cache
+from app.services.text_cache import get_text_cache
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+@router.get("/embedding-cache")
+def embedding_cache_metrics():
+    """Returns hit/miss counters (this worker) and size of the persistent embedding cache."""
+    if not settings.EMBEDDING_CACHE_ENABLED:
+        return {"enabled": False}
+    try:
+        return {"enabled": True, **get_embedding_cache().stats()}
+    except Exception as e:
+        logger.error(f"Error reading embedding cache stats: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail="Could not read embedding cache stats")
+
+@router.get("/text-cache")
+def text_cache_metrics():
+    """Returns hit/miss counters (this worker) and size of the extracted-text cache."""
+    cache = get_text_cache()
+    if cache is None:
+        return {"enabled": False}
+    try:
+        return {"enabled": True, **cache.stats()}
+    except Exception as e:
+        logger.error(f"Error reading extracted-text cache stats: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail="Could not read extracted-text cache stats")
+
+@router.get("/query-embedding")
+def query_embedding_metrics():
+    """Returns micro-batching stats for query embeddings (this worker): batch sizes, wait and call latency."""
+    return {
+        "window_ms": settings.QUERY_EMBED_BATCH_WINDOW_MS,
+        "max_batch": settings.QUERY_EMBED_MAX_BATCH,
+        **query_batcher.metrics.snapshot(),
+    }
+
+@router.get("/answer-cache")
+def answer_cache_metrics():
+    """Returns hit/miss/invalidation counters and size of the semantic answer cache (this worker)."""
+    cache = get_answer_cache()
+    if cache is None:
+        return {"enabled": False}
+    return {"enabled": True, "min_similarity": cache.min_similarity, "ttl_seconds": cache.ttl_seconds, **cache.stats()}
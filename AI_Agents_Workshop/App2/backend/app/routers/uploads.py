@@ -0,0 +1,92 @@
+"""
+API Router for resumable uploads of large files: create a session, PUT byte ranges, complete.
+"""
+
+import logging
+from fastapi import APIRouter, Depends, Header, HTTPException, Request, Response, status
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from app import schemas
+from app.db.session import SessionLocal, get_db
+from app.services import resumable_uploads
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+def _get_session_or_404(db: Session, session_id: str):
+    upload_session = resumable_uploads.get_session(db, session_id)
+    if upload_session is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Upload session not found")
+    return upload_session
+
+@router.post("/", response_model=schemas.UploadSessionRead, status_code=status.HTTP_201_CREATED)
+def create_upload_session(session_in: schemas.UploadSessionCreate, db: Session = Depends(get_db)):
+    """Starts an upload: reserves the file name and allocates space for `size` bytes."""
+    try:
+        return resumable_uploads.to_read(resumable_uploads.create_session(db, session_in))
+    except resumable_uploads.UploadConflict as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+@router.get("/{session_id}", response_model=schemas.UploadSessionRead)
+def get_upload_session(session_id: str, db: Session = Depends(get_db)):
+    """Returns upload progress; after an interruption, resend only `missing_ranges`."""
+    return resumable_uploads.to_read(_get_session_or_404(db, session_id))
+
+def _session_size(session_id: str) -> int:
+    db = SessionLocal()
+    try:
+        return _get_session_or_404(db, session_id).size
+    finally:
+        db.close()
+
+def _session_read(session_id: str) -> schemas.UploadSessionRead:
+    db = SessionLocal()
+    try:
+        return resumable_uploads.to_read(_get_session_or_404(db, session_id))
+    finally:
+        db.close()
+
+@router.put("/{session_id}", response_model=schemas.UploadSessionRead)
+async def upload_range(
+    session_id: str,
+    request: Request,
+    content_range: str = Header(..., description="Byte range of the body, e.g. 'bytes 0-8388607/1073741824'."),
+):
+    """Writes the request body at the given byte range. Ranges may arrive in any order or in parallel.
+
+    The body is streamed to disk, never held in memory; if the connection
+    drops, the bytes that did arrive are kept.
+    """
+    size = await run_in_threadpool(_session_size, session_id)
+    try:
+        start, end = resumable_uploads.parse_content_range(content_range, size)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE, detail=str(e))
+    try:
+        await resumable_uploads.receive_range(session_id, start, end, request.stream())
+    except LookupError as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+    return await run_in_threadpool(_session_read, session_id)
+
+@router.post("/{session_id}/complete", response_model=schemas.FileUploadRead, status_code=status.HTTP_201_CREATED)
+def complete_upload_session(session_id: str, db: Session = Depends(get_db)):
+    """Finishes an upload once every byte has arrived: verifies the hash, registers the file and queues ingestion."""
+    upload_session = _get_session_or_404(db, session_id)
+    try:
+        db_file, job = resumable_uploads.complete_session(db, upload_session)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+    response = schemas.FileUploadRead.model_validate(db_file)
+    response.job_id = job.job_id if job else None
+    return response
+
+@router.delete("/{session_id}", status_code=status.HTTP_204_NO_CONTENT)
+def abort_upload_session(session_id: str, db: Session = Depends(get_db)):
+    """Cancels an upload and discards the bytes received so far."""
+    resumable_uploads.abort_session(db, _get_session_or_404(db, session_id))
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
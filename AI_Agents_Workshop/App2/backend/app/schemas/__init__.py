@@ -1,11 +1,27 @@
 """Import schemas for easy access."""
 
-from .file import FileBase, FileCreate, FileRead, FileUpdate
+from .file import (
+    FileBase, FileCreate, FileRead, FileUpdate, FileTagsUpdate, FileUploadRead,
+    BatchUploadStatus, BatchUploadItem, BatchUploadRead,
+)
 from .router import AgentType, RouterInput, RouterOutput, RouteDecision
+from .retrieval import RetrievalFilters, RetrievedChunk, RetrievalTimings, RetrievalResult, ContextPassage
+from .ingestion import JobStatus, IngestionJobRead, KnowledgeBaseSyncRead
+from .embedding_space import EmbeddingSpaceRead
+from .upload_session import UploadSessionCreate, UploadSessionRead
 
 __all__ = [
     # File Schemas
-    "FileBase", "FileCreate", "FileRead", "FileUpdate",
+    "FileBase", "FileCreate", "FileRead", "FileUpdate", "FileTagsUpdate", "FileUploadRead",
+    "BatchUploadStatus", "BatchUploadItem", "BatchUploadRead",
     # Router Schemas
     "AgentType", "RouterInput", "RouterOutput", "RouteDecision",
+    # Retrieval Schemas
+    "RetrievalFilters", "RetrievedChunk", "RetrievalTimings", "RetrievalResult", "ContextPassage",
+    # Ingestion Job Schemas
+    "JobStatus", "IngestionJobRead", "KnowledgeBaseSyncRead",
+    # Embedding Space Schemas
+    "EmbeddingSpaceRead",
+    # Upload Session Schemas
+    "UploadSessionCreate", "UploadSessionRead",
 ]
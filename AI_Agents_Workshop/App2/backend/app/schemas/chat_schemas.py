@@ -6,6 +6,8 @@ from typing import List, Literal, Optional
 from datetime import datetime
 import uuid
 
+from app.schemas.retrieval import RetrievalFilters
+
 # --- Base Schemas --- 
 class ChatMessageBase(BaseModel):
     """Base schema for a single message."""
@@ -22,6 +24,7 @@ class ConversationBase(BaseModel):
 class UserMessageInput(BaseModel):
     """Input schema for receiving a user message."""
     content: str = Field(..., description="The text content of the user's message.")
+    filters: Optional[RetrievalFilters] = Field(None, description="Restricts the knowledge-base context to matching files.")
 
 # --- Schemas for Database Interaction (used by CRUD) ---
 class ChatMessageCreate(ChatMessageBase):
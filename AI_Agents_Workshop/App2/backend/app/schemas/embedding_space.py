@@ -0,0 +1,23 @@
+"""Pydantic schemas for embedding spaces and re-embedding progress."""
+
+import datetime
+from pydantic import BaseModel, Field
+from typing import Optional
+
+class EmbeddingSpaceRead(BaseModel):
+    """An embedding space (model + dimensions) and its re-embedding progress."""
+    id: int
+    name: str = Field(..., description="Model name, with '@<dimensions>' for shortened vectors.")
+    status: str = Field(..., description="active (serves retrieval), building (being backfilled) or retired.")
+    source_name: Optional[str] = Field(None, description="Space the chunks are re-embedded from.")
+    files_total: Optional[int] = None
+    files_done: int = 0
+    last_file_id: Optional[int] = None
+    error: Optional[str] = None
+    created_at: datetime.datetime
+    started_at: Optional[datetime.datetime] = None
+    activated_at: Optional[datetime.datetime] = None
+    completed_at: Optional[datetime.datetime] = None
+
+    class Config:
+        from_attributes = True # Enable ORM mode
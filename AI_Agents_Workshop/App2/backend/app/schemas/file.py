@@ -1,8 +1,15 @@
 """Pydantic schemas for file data transfer."""
 
 import datetime
-from pydantic import BaseModel
-from typing import Optional
+from enum import Enum
+from pydantic import BaseModel, field_validator
+from typing import List, Optional
+
+def normalize_tags(tags: Optional[List[str]]) -> Optional[List[str]]:
+    """Lower-cases and trims tags, dropping empty and repeated ones (order kept); None stays None."""
+    if tags is None:
+        return None
+    return list(dict.fromkeys(tag.strip().lower() for tag in tags if tag.strip()))
 
 class FileBase(BaseModel):
     """Base schema for file properties."""
@@ -12,12 +19,19 @@ class FileBase(BaseModel):
 
 class FileCreate(FileBase):
     """Schema used for creating a file record (doesn't include path)."""
-    pass # Path is determined internally on save
+    # Path is determined internally on save
+    content_hash: Optional[str] = None # SHA-256 of the file content, computed while saving
+    mtime_ns: Optional[int] = None # Modification time of the saved file (lets directory sync skip it)
+    tags: List[str] = [] # Free-form labels for scoping retrieval
+
+    _normalize_tags = field_validator("tags")(normalize_tags)
 
 class FileRead(FileBase):
     """Schema for reading file data, including DB fields."""
     id: int
     relative_path: str
+    content_hash: Optional[str] = None
+    tags: List[str] = []
     is_processing: bool
     is_vectorized: bool
     vectorization_error: Optional[str] = None
@@ -31,4 +45,42 @@ class FileUpdate(BaseModel):
     """Schema for updating file properties (e.g., processing status)."""
     is_processing: Optional[bool] = None
     is_vectorized: Optional[bool] = None
-    vectorization_error: Optional[str] = None # Use Optional to allow clearing the error 
\ No newline at end of file
+    vectorization_error: Optional[str] = None # Use Optional to allow clearing the error 
+    file_size_bytes: Optional[int] = None
+    content_hash: Optional[str] = None
+    mtime_ns: Optional[int] = None # Set together with file_size_bytes after the file on disk changed
+    tags: Optional[List[str]] = None
+
+    _normalize_tags = field_validator("tags")(normalize_tags)
+
+class FileTagsUpdate(BaseModel):
+    """Schema for replacing a file's tags."""
+    tags: List[str]
+
+    _normalize_tags = field_validator("tags")(normalize_tags)
+
+class FileUploadRead(FileRead):
+    """Schema returned by the upload endpoint: the file plus its ingestion job."""
+    job_id: Optional[str] = None # Poll GET /jobs/{job_id} for processing progress
+
+class BatchUploadStatus(str, Enum):
+    """Outcome for one file of a batch upload."""
+    QUEUED = "queued" # Registered; ingestion job queued
+    CONFLICT = "conflict" # Path already in the knowledge base (or twice in the batch)
+    REJECTED = "rejected" # Unsupported type, unsafe path, over the size limit or unreadable
+
+class BatchUploadItem(BaseModel):
+    """One uploaded file or archive member of a batch upload."""
+    relative_path: str
+    status: BatchUploadStatus
+    file_id: Optional[int] = None
+    job_id: Optional[str] = None # Poll GET /jobs/{job_id} for processing progress
+    file_size_bytes: Optional[int] = None
+    error: Optional[str] = None
+
+class BatchUploadRead(BaseModel):
+    """Schema returned by the batch upload endpoint: a status per file."""
+    files: List[BatchUploadItem]
+    queued: int = 0
+    conflicts: int = 0
+    rejected: int = 0
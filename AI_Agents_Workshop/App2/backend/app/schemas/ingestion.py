@@ -0,0 +1,42 @@
+"""Pydantic schemas for background ingestion jobs."""
+
+import datetime
+from enum import Enum
+from pydantic import BaseModel, Field
+from typing import List, Optional
+
+class JobStatus(str, Enum):
+    """Lifecycle states of an ingestion job."""
+    QUEUED = "queued"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+class IngestionJobRead(BaseModel):
+    """Status and progress of one file's ingestion job."""
+    job_id: str
+    file_id: int
+    status: JobStatus
+    stage: Optional[str] = Field(None, description="Current pipeline stage: extracting (until the first chunk is ready), embedding, done, or reused (an identical file's vectors were copied).")
+    pages_parsed: int = 0
+    chunks_total: Optional[int] = None
+    chunks_embedded: int = 0
+    chunks_reused: int = Field(0, description="Chunks whose text already had a vector (not re-embedded).")
+    chunks_near_duplicate: int = Field(0, description="Near-duplicate chunks linked to an existing vector (not re-embedded).")
+    error: Optional[str] = None
+    created_at: datetime.datetime
+    started_at: Optional[datetime.datetime] = None
+    finished_at: Optional[datetime.datetime] = None
+
+class KnowledgeBaseSyncRead(BaseModel):
+    """Outcome of one sync of the knowledge-base directory with the `files` table."""
+    scanned: int = 0
+    added: int = 0
+    changed: int = 0
+    unchanged: int = 0
+    deleted: int = 0
+    deferred: List[str] = Field([], description="Paths left for the next sync (still being written or processed).")
+    errors: List[str] = []
+    job_ids: List[str] = Field([], description="Ingestion jobs queued for new and changed files.")
+    duration_ms: float = 0.0
@@ -0,0 +1,61 @@
+"""Pydantic schemas for knowledge-base retrieval filters and results."""
+
+import datetime
+from pydantic import BaseModel, Field, field_validator
+from typing import List, Optional
+
+from .file import normalize_tags
+
+class RetrievalFilters(BaseModel):
+    """Scopes retrieval to part of the knowledge base; every field that is set must match."""
+    file_ids: Optional[List[int]] = Field(None, description="Only chunks of these files.")
+    media_types: Optional[List[str]] = Field(None, description="Only files of these media types, e.g. application/pdf.")
+    uploaded_after: Optional[datetime.datetime] = Field(None, description="Only files uploaded at or after this time.")
+    uploaded_before: Optional[datetime.datetime] = Field(None, description="Only files uploaded before this time.")
+    tags: Optional[List[str]] = Field(None, description="Only files carrying all of these tags.")
+
+    _normalize_tags = field_validator("tags")(normalize_tags) # Stored tags are normalized the same way
+
+    def is_empty(self) -> bool:
+        return not any(value is not None for value in self.model_dump().values())
+
+class RetrievedChunk(BaseModel):
+    """A lean retrieval hit: the chunk and its source, without the vector."""
+    id: int
+    file_id: int
+    filename: Optional[str] = None
+    chunk_index: Optional[int] = None
+    chunk_text: Optional[str] = None
+    char_start: Optional[int] = None
+    char_end: Optional[int] = None
+    distance: Optional[float] = None # Cosine distance to the query (lower is more similar); None for lexical-only hits
+    score: Optional[float] = None # Fused rank score in hybrid retrieval (higher is better)
+    vector_rank: Optional[int] = None # 1-based rank in the vector results, if present there
+    lexical_rank: Optional[int] = None # 1-based rank in the full-text results, if present there
+
+    class Config:
+        from_attributes = True # Allow building from SQLAlchemy result rows
+
+class RetrievalTimings(BaseModel):
+    """Per-source latency of one retrieval call, in milliseconds."""
+    embedding_ms: float = 0.0 # Query embedding (overlaps the lexical query)
+    vector_ms: float = 0.0 # ANN query
+    lexical_ms: float = 0.0 # Full-text query
+    fusion_ms: float = 0.0
+    total_ms: float = 0.0
+
+class RetrievalResult(BaseModel):
+    """Ranked chunks for a query plus where the time went."""
+    chunks: List[RetrievedChunk]
+    timings: RetrievalTimings
+    query_embedding: Optional[List[float]] = Field(None, exclude=True) # Reused for context packing
+
+class ContextPassage(BaseModel):
+    """A contiguous stretch of one file for prompt context, built from one or more merged chunks."""
+    file_id: int
+    filename: Optional[str] = None
+    chunk_indexes: List[int] = []
+    char_start: Optional[int] = None
+    char_end: Optional[int] = None
+    text: str = ""
+    tokens: int = 0
@@ -0,0 +1,35 @@
+"""Pydantic schemas for resumable upload sessions."""
+
+import datetime
+from pydantic import BaseModel, Field, field_validator
+from typing import List, Optional
+
+from .file import normalize_tags
+
+class UploadSessionCreate(BaseModel):
+    """Schema for starting a resumable upload."""
+    filename: str
+    size: int = Field(..., ge=0, description="Total file size in bytes.")
+    media_type: Optional[str] = None
+    tags: List[str] = []
+    sha256: Optional[str] = Field(None, description="Expected SHA-256 hex digest; checked on completion if given.")
+
+    _normalize_tags = field_validator("tags")(normalize_tags)
+
+class UploadSessionRead(BaseModel):
+    """State of a resumable upload; `missing_ranges` are what the client still has to PUT."""
+    id: str
+    filename: str
+    relative_path: str
+    size: int
+    bytes_received: int
+    received_ranges: List[List[int]] # [start, end) byte offsets
+    missing_ranges: List[List[int]] = [] # [start, end) byte offsets
+    status: str
+    error: Optional[str] = None
+    file_id: Optional[int] = None
+    created_at: Optional[datetime.datetime] = None
+    expires_at: datetime.datetime
+
+    class Config:
+        from_attributes = True
@@ -0,0 +1,154 @@
+"""Semantic cache of approved chatbot answers.
+
+A chat message runs retrieval plus up to MAX_REVISIONS + 1 generation and QA
+calls, and many users ask the same questions about the same knowledge base.
+`SemanticAnswerCache` keeps QA-approved answers keyed by the question's
+embedding: a new question whose cosine similarity to a cached one is at
+least ANSWER_CACHE_MIN_SIMILARITY (same retrieval filters) gets the cached
+answer without retrieval, generation or QA.
+
+Entries are only valid for the knowledge base they were answered from:
+
+- Each entry records the knowledge-base generation read before retrieval:
+  the active embedding space plus the latest `updated_at` of the vectorized
+  files. Any ingestion, re-vectorization or space switch changes it (through
+  whichever path: uploads, sync, document writer, re-embedding), so every
+  older entry stops matching. New content may answer any question better.
+- Each entry records the files its context came from. Deleting a file only
+  invalidates the entries that used it.
+
+Entries also expire after ANSWER_CACHE_TTL_SECONDS and are evicted
+least-recently-used beyond ANSWER_CACHE_MAX_ENTRIES. Only the first question
+of a conversation is cached and looked up, since later ones are answered in
+the context of the conversation history. The cache lives in each
+worker's memory (a similarity scan over a few thousand vectors is cheap);
+the generation comes from the database, so every worker sees changes.
+"""
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, Iterable, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from app.config import get_settings
+from app.models import File
+from app.schemas import RetrievalFilters
+from app.services.vector_store import embed_query_text, get_active_space_name
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+def knowledge_base_generation(db: Session, space_name: str) -> str:
+    """Identifies the current state of the searchable knowledge base (changes on any ingestion)."""
+    latest = db.execute(select(func.max(File.updated_at)).where(File.is_vectorized)).scalar()
+    return f"{space_name}|{latest.isoformat() if latest else '-'}"
+
+@dataclass
+class AnswerCacheKey:
+    """What a question is looked up and stored by."""
+    vector: np.ndarray # Unit-length question embedding
+    generation: str
+    scope: str # Serialized retrieval filters
+
+@dataclass
+class _Entry:
+    key: AnswerCacheKey
+    answer: str
+    file_ids: Tuple[int, ...]
+    created: float
+
+class SemanticAnswerCache:
+    """Per-worker LRU of approved answers, matched by question similarity."""
+
+    def __init__(self, min_similarity: float, ttl_seconds: float, max_entries: int):
+        self.min_similarity = min_similarity
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[int, _Entry]" = OrderedDict()
+        self._next_id = 0
+        self.hits = 0
+        self.misses = 0
+        self.invalidated = 0 # Dropped because the knowledge base changed or a source file was deleted
+
+    def make_key(self, db: Session, question: str, filters: Optional[RetrievalFilters] = None) -> AnswerCacheKey:
+        """Embeds the question (the embedding cache serves it again to retrieval) and reads the generation."""
+        space_name = get_active_space_name(db)
+        generation = knowledge_base_generation(db, space_name) # Before retrieval, so later changes invalidate the answer
+        vector = embed_query_text(question, space_name).astype(np.float32)
+        norm = np.linalg.norm(vector)
+        scope = filters.model_dump_json() if filters is not None and not filters.is_empty() else ""
+        return AnswerCacheKey(vector=vector / norm if norm else vector, generation=generation, scope=scope)
+
+    def get(self, db: Session, key: AnswerCacheKey) -> Optional[str]:
+        """Returns the cached answer to the most similar question, if it is similar enough and still valid."""
+        now = time.time()
+        with self._lock:
+            stale = [entry_id for entry_id, entry in self._entries.items()
+                     if entry.key.generation != key.generation or now - entry.created > self.ttl_seconds]
+            for entry_id in stale:
+                del self._entries[entry_id]
+            self.invalidated += len(stale)
+            candidates = [(entry_id, entry) for entry_id, entry in self._entries.items() if entry.key.scope == key.scope]
+            best_id, best = None, None
+            if candidates:
+                similarities = np.stack([entry.key.vector for _, entry in candidates]) @ key.vector
+                position = int(np.argmax(similarities))
+                similarity = float(similarities[position])
+                if similarity >= self.min_similarity:
+                    best_id, best = candidates[position]
+            if best is None:
+                self.misses += 1
+                return None
+
+        if best.file_ids and not self._sources_exist(db, best.file_ids):
+            with self._lock:
+                if self._entries.pop(best_id, None) is not None:
+                    self.invalidated += 1
+                self.misses += 1
+            return None
+        with self._lock:
+            if best_id in self._entries:
+                self._entries.move_to_end(best_id)
+            self.hits += 1
+        logger.info(f"Serving cached answer (question similarity {similarity:.3f})")
+        return best.answer
+
+    @staticmethod
+    def _sources_exist(db: Session, file_ids: Tuple[int, ...]) -> bool:
+        count = db.execute(select(func.count(File.id)).where(File.id.in_(file_ids), File.is_vectorized)).scalar()
+        return count == len(file_ids)
+
+    def put(self, key: AnswerCacheKey, answer: str, file_ids: Iterable[int]) -> None:
+        """Stores an approved answer and the files its context came from."""
+        with self._lock:
+            self._entries[self._next_id] = _Entry(key, answer, tuple(sorted(set(file_ids))), time.time())
+            self._next_id += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "invalidated": self.invalidated,
+            }
+
+@lru_cache()
+def get_answer_cache() -> Optional[SemanticAnswerCache]:
+    """Returns this worker's answer cache, or None if it is disabled."""
+    if not settings.ANSWER_CACHE_ENABLED:
+        return None
+    return SemanticAnswerCache(settings.ANSWER_CACHE_MIN_SIMILARITY, settings.ANSWER_CACHE_TTL_SECONDS, settings.ANSWER_CACHE_MAX_ENTRIES)
@@ -0,0 +1,180 @@
+"""Batch uploads: many files and zip/tar archives in one request.
+
+Each uploaded file, and each member of an uploaded archive, is streamed to a
+staging directory inside the knowledge base (hidden, so directory sync
+ignores it) while being hashed; archives are read member by member (zip via
+its central directory, tar as a forward-only stream), so nothing is
+extracted whole into memory. Member names are normalized and anything that
+could escape the knowledge base (absolute paths, `..`, links, devices) is
+rejected, as is everything past BATCH_UPLOAD_MAX_FILES files or
+BATCH_UPLOAD_MAX_BYTES written (archive bombs).
+
+Staged files are then moved into place and registered with one multi-row
+INSERT while holding the directory-sync lock, so a concurrent sync never sees
+a file without its row. Every registered file gets its own ingestion job;
+jobs run concurrently on the ingestion pool (INGESTION_MAX_CONCURRENT_JOBS).
+"""
+
+import logging
+import mimetypes
+import os
+import shutil
+import tarfile
+import uuid
+import zipfile
+from typing import BinaryIO, Dict, Iterator, List, Optional, Tuple
+
+from fastapi import UploadFile
+from sqlalchemy.orm import Session
+
+from app import crud, schemas
+from app.config import get_settings
+from app.services import file_processor, ingestion_jobs, kb_sync
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+ZIP_SUFFIXES = (".zip",)
+TAR_SUFFIXES = (".tar", ".tar.gz", ".tgz", ".tar.bz2", ".tbz2", ".tar.xz", ".txz")
+STAGING_DIRECTORY = ".staging"
+
+# (entry name, stream or None, error or None)
+UploadEntry = Tuple[str, Optional[BinaryIO], Optional[str]]
+
+def safe_relative_path(name: str) -> Optional[str]:
+    """Normalizes an uploaded name to a relative "/" path, or None if it could leave the knowledge base."""
+    parts = [part for part in name.replace("\\", "/").split("/") if part not in ("", ".")]
+    if not parts or ".." in parts or name.startswith(("/", "\\")) or ":" in parts[0]:
+        return None
+    return "/".join(parts)
+
+def iter_upload_entries(upload: UploadFile) -> Iterator[UploadEntry]:
+    """Yields the uploaded file itself, or each regular-file member of an archive, as a stream.
+
+    A yielded stream is only valid until the next entry is requested.
+    """
+    filename = upload.filename or ""
+    lower_name = filename.lower()
+    if lower_name.endswith(ZIP_SUFFIXES):
+        with zipfile.ZipFile(upload.file) as archive: # Spooled upload files are seekable
+            for info in archive.infolist():
+                if info.is_dir():
+                    continue
+                try:
+                    stream = archive.open(info)
+                except (RuntimeError, NotImplementedError, zipfile.BadZipFile) as e: # Encrypted or unsupported compression
+                    yield info.filename, None, str(e)
+                    continue
+                with stream:
+                    yield info.filename, stream, None
+    elif lower_name.endswith(TAR_SUFFIXES):
+        with tarfile.open(fileobj=upload.file, mode="r|*") as archive:
+            for member in archive:
+                if member.isdir():
+                    continue
+                if not member.isfile(): # Links and devices could point outside the knowledge base
+                    yield member.name, None, "Only regular files are accepted from archives."
+                    continue
+                yield member.name, archive.extractfile(member), None
+    else:
+        yield os.path.basename(filename), upload.file, None
+
+class _Batch:
+    """Files of one batch request staged so far."""
+
+    def __init__(self, staging_path: str, tags: List[str]):
+        self.staging_path = staging_path
+        self.tags = tags
+        self.items: List[schemas.BatchUploadItem] = []
+        self.staged: Dict[str, Tuple[schemas.BatchUploadItem, schemas.FileCreate, str]] = {}
+        self.bytes_left = settings.BATCH_UPLOAD_MAX_BYTES
+
+    def reject(self, relative_path: str, error: str, status: schemas.BatchUploadStatus = schemas.BatchUploadStatus.REJECTED) -> None:
+        self.items.append(schemas.BatchUploadItem(relative_path=relative_path, status=status, error=error))
+
+    def stage(self, name: str, stream: Optional[BinaryIO], error: Optional[str], media_type: Optional[str]) -> None:
+        relative_path = safe_relative_path(name)
+        if error is not None or stream is None:
+            self.reject(name, error or "Unreadable entry.")
+        elif relative_path is None:
+            self.reject(name, "Unsafe path.")
+        elif not kb_sync.is_synced_path(relative_path):
+            self.reject(name, "Unsupported file type or hidden file.")
+        elif relative_path in self.staged:
+            self.reject(relative_path, "Path appears twice in the batch.", schemas.BatchUploadStatus.CONFLICT)
+        elif len(self.staged) >= settings.BATCH_UPLOAD_MAX_FILES:
+            self.reject(relative_path, f"Batch limit of {settings.BATCH_UPLOAD_MAX_FILES} files reached.")
+        else:
+            staged_path = os.path.join(self.staging_path, str(len(self.staged)))
+            try:
+                size, content_hash = file_processor.save_stream_with_hash(stream, staged_path, max_bytes=self.bytes_left)
+            except Exception as e:
+                self.reject(relative_path, f"Could not save file: {e}")
+                return
+            self.bytes_left -= size
+            item = schemas.BatchUploadItem(relative_path=relative_path, status=schemas.BatchUploadStatus.QUEUED, file_size_bytes=size)
+            file_in = schemas.FileCreate(
+                filename=os.path.basename(relative_path),
+                media_type=media_type or mimetypes.guess_type(relative_path)[0],
+                file_size_bytes=size,
+                content_hash=content_hash,
+                tags=self.tags,
+            )
+            self.items.append(item)
+            self.staged[relative_path] = (item, file_in, staged_path)
+
+    def register(self, db: Session) -> None:
+        """Moves staged files into the knowledge base and creates their rows in one INSERT."""
+        kb_path = settings.KNOWLEDGE_BASE_PATH
+        with kb_sync.sync_lock(db, wait=True):
+            existing = crud.get_existing_relative_paths(db, self.staged)
+            moved: List[Tuple[schemas.BatchUploadItem, schemas.FileCreate, str]] = []
+            for relative_path, (item, file_in, staged_path) in self.staged.items():
+                final_path = os.path.join(kb_path, relative_path)
+                if relative_path in existing or os.path.exists(final_path):
+                    item.status, item.error = schemas.BatchUploadStatus.CONFLICT, f"File with path '{relative_path}' already exists."
+                    continue
+                os.makedirs(os.path.dirname(final_path), exist_ok=True)
+                os.replace(staged_path, final_path) # Same filesystem: a rename, no copy
+                file_in.mtime_ns = os.stat(final_path).st_mtime_ns
+                moved.append((item, file_in, final_path))
+            try:
+                file_ids = crud.create_files(db, [(file_in, item.relative_path) for item, file_in, _ in moved])
+            except Exception:
+                db.rollback()
+                for _, _, final_path in moved:
+                    os.remove(final_path)
+                raise
+        for (item, _, _), file_id in zip(moved, file_ids):
+            item.file_id = file_id
+            item.job_id = ingestion_jobs.submit_ingestion_job(file_id).job_id
+
+def store_batch(db: Session, uploads: List[UploadFile], tags: Optional[List[str]] = None) -> schemas.BatchUploadRead:
+    """Stores uploaded files and archive members, registers them and queues their ingestion."""
+    staging_path = os.path.join(settings.KNOWLEDGE_BASE_PATH, STAGING_DIRECTORY, uuid.uuid4().hex)
+    os.makedirs(staging_path)
+    batch = _Batch(staging_path, tags or [])
+    try:
+        for upload in uploads:
+            is_archive = (upload.filename or "").lower().endswith(ZIP_SUFFIXES + TAR_SUFFIXES)
+            try:
+                for name, stream, error in iter_upload_entries(upload):
+                    batch.stage(name, stream, error, None if is_archive else upload.content_type)
+            except (zipfile.BadZipFile, tarfile.TarError, EOFError, OSError) as e:
+                batch.reject(upload.filename or "", f"Unreadable archive: {e}")
+            finally:
+                upload.file.close()
+        batch.register(db)
+    finally:
+        shutil.rmtree(staging_path, ignore_errors=True)
+
+    result = schemas.BatchUploadRead(files=batch.items)
+    for item in batch.items:
+        if item.status == schemas.BatchUploadStatus.QUEUED:
+            result.queued += 1
+        elif item.status == schemas.BatchUploadStatus.CONFLICT:
+            result.conflicts += 1
+        else:
+            result.rejected += 1
+    logger.info(f"Batch upload: {result.queued} files queued, {result.conflicts} conflicts, {result.rejected} rejected")
+    return result
@@ -0,0 +1,187 @@
+"""Text chunking for the ingestion pipeline.
+
+`iter_chunks` consumes an iterator of text blocks (PDF pages, DOCX
+paragraphs, file reads) and yields chunks with character offsets into the
+concatenated text, so a document never has to be held in memory as one
+string: only a bounded window of upcoming text is buffered.
+
+Chunks are sized in tokens (see `tokenizer.get_tokenizer`) and split
+recursively on the coarsest boundary that fits - paragraphs, then
+sentences, then lines, then words, and only as a last resort mid-word - before
+adjacent pieces are packed back together up to the budget. Consecutive
+chunks share up to `overlap_tokens` of whole trailing pieces. Budgets can be
+set per media type or file kind with `CHUNK_SIZE_OVERRIDES`.
+
+`iter_fixed_chunks` is the previous fixed character-window splitter, kept as
+the baseline for `benchmarks/bench_chunking.py`.
+"""
+
+import logging
+import re
+from collections import deque
+from typing import Deque, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+from app.config import get_settings
+from app.services.tokenizer import CHARS_PER_TOKEN, Tokenizer, get_tokenizer
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# Split boundaries, coarsest first: paragraphs, sentences, lines, words. Sentences
+# come before lines because PDF extraction breaks every visual line. The
+# boundary stays with the text before it.
+SEPARATORS: Tuple["re.Pattern[str]", ...] = tuple(
+    re.compile(pattern) for pattern in (r"\n\s*\n", r"[.!?][\"')\]]*\s", r"\n", r"\s")
+)
+# Buffered text per window, in chunks, before the window is split.
+WINDOW_CHUNKS = 16
+
+class TextChunk(NamedTuple):
+    """A chunk of document text and where it came from."""
+    index: int # Position of the chunk within the document
+    text: str
+    char_start: int # Offset of the first character in the extracted text
+    char_end: int # Offset one past the last character
+
+class _Piece(NamedTuple):
+    start: int
+    end: int
+    tokens: int
+
+def get_chunk_params(media_type: Optional[str] = None, file_kind: Optional[str] = None) -> Tuple[int, int]:
+    """Returns (chunk tokens, overlap tokens) for a media type or file kind."""
+    for key in (media_type, file_kind):
+        if key and key in settings.CHUNK_SIZE_OVERRIDES:
+            return tuple(settings.CHUNK_SIZE_OVERRIDES[key])
+    return settings.CHUNK_SIZE_TOKENS, settings.CHUNK_OVERLAP_TOKENS
+
+def _split(text: str, start: int, end: int, max_tokens: int, tokenizer: Tokenizer,
+           separators: Sequence["re.Pattern[str]"] = SEPARATORS) -> Iterator[_Piece]:
+    """Splits text[start:end] into consecutive pieces of at most max_tokens each.
+
+    The pieces cover the span exactly, so offsets never drift.
+    """
+    tokens = tokenizer.count(text[start:end])
+    if tokens <= max_tokens or end - start <= 1:
+        yield _Piece(start, end, tokens)
+        return
+
+    for i, separator in enumerate(separators):
+        match = separator.search(text, start, end)
+        if match is None or match.end() == end:
+            continue # No boundary inside the span at this level
+        part_start = start
+        while match is not None:
+            yield from _split(text, part_start, match.end(), max_tokens, tokenizer, separators[i + 1:])
+            part_start = match.end()
+            match = separator.search(text, part_start, end) if part_start < end else None
+        if part_start < end:
+            yield from _split(text, part_start, end, max_tokens, tokenizer, separators[i + 1:])
+        return
+
+    # No boundary left: cut into roughly budget-sized windows
+    width = max(1, (end - start) * max_tokens // tokens)
+    for part_start in range(start, end, width):
+        yield from _split(text, part_start, min(part_start + width, end), max_tokens, tokenizer, ())
+
+def _merge(pieces: Iterable[_Piece], max_tokens: int, overlap_tokens: int) -> Iterator[Tuple[int, int]]:
+    """Packs consecutive pieces into (start, end) spans of at most max_tokens."""
+    current: Deque[_Piece] = deque()
+    current_tokens = 0
+    for piece in pieces:
+        if current and current_tokens + piece.tokens > max_tokens:
+            yield current[0].start, current[-1].end
+            # Keep whole trailing pieces as overlap, as long as the next piece still fits
+            while current and (current_tokens > overlap_tokens or current_tokens + piece.tokens > max_tokens):
+                current_tokens -= current.popleft().tokens
+        current.append(piece)
+        current_tokens += piece.tokens
+    if current:
+        yield current[0].start, current[-1].end
+
+def iter_chunks(
+    blocks: Iterable[str],
+    chunk_tokens: Optional[int] = None,
+    overlap_tokens: Optional[int] = None,
+    tokenizer: Optional[Tokenizer] = None,
+) -> Iterator[TextChunk]:
+    """Streams boundary-aware, token-budgeted chunks out of consecutive text blocks.
+
+    Text is buffered in windows of about `WINDOW_CHUNKS` chunks; each window
+    is split and every chunk but the last is emitted, and the last one is
+    re-split together with the next window so it is never cut at a block
+    boundary. Whitespace-only chunks are skipped and chunk text is stripped
+    (offsets point at the stripped text).
+    """
+    chunk_tokens = chunk_tokens or settings.CHUNK_SIZE_TOKENS
+    overlap_tokens = min(settings.CHUNK_OVERLAP_TOKENS if overlap_tokens is None else overlap_tokens, chunk_tokens // 2)
+    tokenizer = tokenizer or get_tokenizer()
+    window_chars = chunk_tokens * CHARS_PER_TOKEN * WINDOW_CHUNKS
+
+    buffer = ""
+    offset = 0 # Offset of buffer[0] within the whole text
+    index = 0
+    blocks = iter(blocks)
+    exhausted = False
+    while not exhausted:
+        for block in blocks:
+            buffer += block
+            if len(buffer) >= window_chars:
+                break
+        else:
+            exhausted = True
+
+        spans = list(_merge(_split(buffer, 0, len(buffer), chunk_tokens, tokenizer), chunk_tokens, overlap_tokens))
+        if not exhausted:
+            if len(spans) < 2:
+                continue # Not even one complete chunk yet; read more
+            spans, (keep_from, _) = spans[:-1], spans[-1]
+        for start, end in spans:
+            text = buffer[start:end]
+            stripped = text.strip()
+            if not stripped:
+                continue
+            lead = len(text) - len(text.lstrip())
+            char_start = offset + start + lead
+            yield TextChunk(index=index, text=stripped, char_start=char_start, char_end=char_start + len(stripped))
+            index += 1
+        if not exhausted:
+            buffer = buffer[keep_from:]
+            offset += keep_from
+
+def iter_fixed_chunks(blocks: Iterable[str], chunk_size: int = 1000, chunk_overlap: int = 100) -> Iterator[TextChunk]:
+    """Streams fixed-size overlapping character windows (the previous splitter)."""
+    step = chunk_size - chunk_overlap
+    if step <= 0: # Avoid issues if overlap >= size
+        step = chunk_size
+
+    buffer = ""
+    pos = 0 # Start of the next chunk within buffer
+    start = 0 # Offset of buffer[pos] within the whole text
+    index = 0
+    for block in blocks:
+        buffer = buffer[pos:] + block # Drop consumed text before growing the buffer
+        pos = 0
+        while len(buffer) - pos >= chunk_size:
+            yield TextChunk(index=index, text=buffer[pos:pos + chunk_size], char_start=start, char_end=start + chunk_size)
+            index += 1
+            pos += step
+            start += step
+
+    # Tail: whatever is left is shorter than a full chunk
+    while pos < len(buffer):
+        text = buffer[pos:pos + chunk_size]
+        yield TextChunk(index=index, text=text, char_start=start, char_end=start + len(text))
+        index += 1
+        pos += step
+        start += step
+
+def chunk_text_with_offsets(text: str, chunk_tokens: Optional[int] = None, overlap_tokens: Optional[int] = None) -> List[TextChunk]:
+    """Splits text into token-budgeted chunks, keeping character offsets."""
+    chunks = list(iter_chunks([text], chunk_tokens, overlap_tokens))
+    logger.info(f"Chunked text (length: {len(text)}) into {len(chunks)} chunks.")
+    return chunks
+
+def chunk_text(text: str, chunk_tokens: Optional[int] = None, overlap_tokens: Optional[int] = None) -> List[str]:
+    """Splits text into token-budgeted chunks."""
+    return [chunk.text for chunk in chunk_text_with_offsets(text, chunk_tokens, overlap_tokens)]
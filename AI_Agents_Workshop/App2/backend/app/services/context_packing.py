@@ -0,0 +1,143 @@
+"""Context assembly for RAG prompts: overlap merging, MMR diversity and a token budget.
+
+Retrieval returns ranked chunks, but consecutive chunks of a document share
+up to CHUNK_OVERLAP_TOKENS of text, and the best few hits are often
+near-copies of each other (the same paragraph in two revisions of a
+procedure). `pack_context` turns a larger candidate list into prompt context:
+
+- Candidates are picked by maximal marginal relevance (MMR): each pick
+  maximizes `lambda * sim(query, chunk) - (1 - lambda) * max sim(chunk, picked)`,
+  with cosine similarities computed in NumPy on the stored chunk vectors (no
+  re-embedding).
+- Picked chunks of the same file that overlap (by character offsets) or are
+  consecutive are merged into one passage, and only their new text is
+  charged against the budget.
+- Picks stop once the token budget (RAG_CONTEXT_TOKEN_BUDGET) is spent;
+  candidates that no longer fit are skipped in favour of smaller ones.
+
+Passages are returned in pick order, i.e. most relevant first.
+"""
+
+import logging
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from app.config import get_settings
+from app.schemas import ContextPassage, RetrievedChunk
+from app.services.tokenizer import get_tokenizer
+from app.services.vector_backends import get_vector_backend
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+def format_passages(passages: Sequence[ContextPassage]) -> str:
+    """Renders passages as numbered, sourced context blocks for a prompt."""
+    return "\n\n".join(
+        f"[{number}] Source: {passage.filename or f'file {passage.file_id}'} "
+        f"(chunks {', '.join(str(index) for index in sorted(passage.chunk_indexes))})\n{passage.text.strip()}"
+        for number, passage in enumerate(passages, start=1)
+    )
+
+def _normalized(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.where(norms == 0, 1.0, norms)
+
+def mmr_order(query_vector: np.ndarray, vectors: np.ndarray, mmr_lambda: float) -> List[int]:
+    """Orders all candidate rows by maximal marginal relevance; returns row positions."""
+    if len(vectors) == 0:
+        return []
+    vectors = _normalized(vectors.astype(np.float32))
+    relevance = vectors @ _normalized(query_vector.astype(np.float32))
+    redundancy = np.full(len(vectors), -np.inf, dtype=np.float32) # Max similarity to anything picked so far
+    remaining = np.ones(len(vectors), dtype=bool)
+    order: List[int] = []
+    for _ in range(len(vectors)):
+        scores = mmr_lambda * relevance - (1.0 - mmr_lambda) * np.where(np.isinf(redundancy), 0.0, redundancy)
+        scores[~remaining] = -np.inf
+        pick = int(np.argmax(scores))
+        order.append(pick)
+        remaining[pick] = False
+        redundancy = np.maximum(redundancy, vectors @ vectors[pick])
+    return order
+
+def _touches(first: ContextPassage, second: ContextPassage) -> bool:
+    """Whether two stretches of the same file overlap or are consecutive chunks."""
+    if first.file_id != second.file_id or None in (first.char_start, first.char_end, second.char_start, second.char_end):
+        return False
+    if first.char_start <= second.char_end and second.char_start <= first.char_end:
+        return True
+    # Consecutive chunks are separated only by the whitespace the chunker stripped
+    return any(abs(a - b) == 1 for a in first.chunk_indexes for b in second.chunk_indexes)
+
+def _union(first: ContextPassage, second: ContextPassage) -> ContextPassage:
+    """Joins two touching stretches of a file, keeping overlapping text once."""
+    if second.char_start < first.char_start:
+        first, second = second, first
+    if second.char_end <= first.char_end:
+        text = first.text
+    elif second.char_start > first.char_end:
+        text = first.text + "\n" + second.text
+    else:
+        text = first.text + second.text[first.char_end - second.char_start:]
+    return first.model_copy(update={
+        "chunk_indexes": first.chunk_indexes + second.chunk_indexes,
+        "char_end": max(first.char_end, second.char_end),
+        "text": text,
+    })
+
+def pack_context(
+    db: Session,
+    query_embedding: Sequence[float],
+    candidates: Sequence[RetrievedChunk],
+    token_budget: Optional[int] = None,
+    mmr_lambda: Optional[float] = None,
+) -> List[ContextPassage]:
+    """Selects and merges candidate chunks into passages that fit the token budget.
+
+    The first pick is always included, even if it alone exceeds the budget.
+    """
+    token_budget = settings.RAG_CONTEXT_TOKEN_BUDGET if token_budget is None else token_budget
+    mmr_lambda = settings.RAG_MMR_LAMBDA if mmr_lambda is None else mmr_lambda
+    candidates = [chunk for chunk in candidates if chunk.chunk_text and chunk.chunk_text.strip()]
+    vectors_by_id: Dict[int, np.ndarray] = get_vector_backend().vectors_by_id(db, [chunk.id for chunk in candidates])
+    candidates = [chunk for chunk in candidates if chunk.id in vectors_by_id] # Deleted since retrieval
+    if not candidates:
+        return []
+    query_vector = np.asarray(query_embedding, dtype=np.float32)
+    # In-process stores zero-pad narrower spaces to the matrix width; the padding carries no similarity
+    vectors = np.stack([vectors_by_id[chunk.id][:len(query_vector)] for chunk in candidates])
+    order = mmr_order(query_vector, vectors, mmr_lambda)
+
+    tokenizer = get_tokenizer()
+    passages: List[ContextPassage] = []
+    remaining = token_budget
+    for position in order:
+        chunk = candidates[position]
+        passage = ContextPassage(
+            file_id=chunk.file_id, filename=chunk.filename, chunk_indexes=[chunk.chunk_index] if chunk.chunk_index is not None else [],
+            char_start=chunk.char_start, char_end=chunk.char_end, text=chunk.chunk_text,
+        )
+        touching = [i for i, other in enumerate(passages) if _touches(other, passage)]
+        for i in touching:
+            passage = _union(passages[i], passage)
+        passage.tokens = tokenizer.count(passage.text)
+        charged = passage.tokens - sum(passages[i].tokens for i in touching) # Only the new text costs budget
+        if charged > remaining and passages:
+            continue # Too big; a smaller candidate may still fit
+        if touching:
+            passages[touching[0]] = passage # Keeps the position of the earliest pick
+            for i in reversed(touching[1:]):
+                del passages[i]
+        else:
+            passages.append(passage)
+        remaining -= charged
+        if remaining <= 0:
+            break
+
+    logger.info(
+        f"[Retrieval] Packed {sum(len(p.chunk_indexes) for p in passages)} of {len(candidates)} candidate chunks "
+        f"into {len(passages)} passages ({token_budget - remaining}/{token_budget} tokens)"
+    )
+    return passages
@@ -0,0 +1,193 @@
+"""Persistent on-disk cache for embedding vectors.
+
+Wraps the configured embedding client so repeated texts (identical chat
+queries, unchanged document chunks) are served from a local SQLite file
+instead of a network round trip. Entries are keyed by a hash of the embedding
+model namespace and the normalized text (queries get their own namespace
+when the model embeds them with a different task prefix), evicted least-recently-used once the
+cache holds more than the configured number of entries, and the file is
+shared by every worker process on the host (SQLite WAL mode).
+
+Lookups only read: last-access times are queued in memory and written in
+batches (and only for entries not touched within TOUCH_INTERVAL_SECONDS), so
+concurrent queries don't serialize on SQLite's write lock, and hit/miss
+counters are kept per worker in memory. Eviction runs once the inserts since
+the last check could have pushed the cache EVICTION_SLACK over its bound,
+not on every write.
+
+Cache failures never fail an embedding call; the cache is simply bypassed.
+"""
+
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+logger = logging.getLogger(__name__)
+
+TOUCH_INTERVAL_SECONDS = 60.0 # LRU time resolution; hits within this of the last recorded access aren't re-recorded
+TOUCH_FLUSH_KEYS = 256 # Queued last-access updates written in one batch...
+TOUCH_FLUSH_SECONDS = 30.0 # ...or after this long, whichever comes first
+EVICTION_SLACK = 0.1 # Fraction of max_entries inserted between eviction checks
+
+def normalize_text(text: str) -> str:
+    """Normalizes text for cache keys: Unicode NFC and collapsed whitespace."""
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+class EmbeddingCache:
+    """Size-bounded LRU store of embedding vectors in a shared SQLite file."""
+
+    def __init__(self, path: str, max_entries: int):
+        self.path = path
+        self.max_entries = max_entries
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._touched: Dict[str, float] = {} # Key -> access time not yet written
+        self._last_flush = time.time()
+        self._inserted_since_check = 0
+        self.hits = 0 # This worker's counters
+        self.misses = 0
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings ("
+                "key TEXT PRIMARY KEY, vector BLOB NOT NULL, last_access REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_embeddings_last_access ON embeddings (last_access)")
+
+    def _connect(self) -> sqlite3.Connection:
+        """Returns this thread's connection (SQLite connections are not shareable)."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def make_key(namespace: str, text: str) -> str:
+        """Builds the cache key for a text embedded in the given model namespace."""
+        return hashlib.sha256(f"{namespace}\0{normalize_text(text)}".encode("utf-8")).hexdigest()
+
+    def get_many(self, keys: Sequence[str]) -> Dict[str, List[float]]:
+        """Returns cached vectors for the keys that are present and records hits/misses."""
+        unique_keys = list(dict.fromkeys(keys))
+        found: Dict[str, List[float]] = {}
+        now = time.time()
+        stale_access = []
+        conn = self._connect()
+        for start in range(0, len(unique_keys), 500): # Stay under SQLite's variable limit
+            part = unique_keys[start:start + 500]
+            placeholders = ",".join("?" * len(part))
+            query = f"SELECT key, vector, last_access FROM embeddings WHERE key IN ({placeholders})"
+            for key, blob, last_access in conn.execute(query, part):
+                found[key] = np.frombuffer(blob, dtype=np.float32).tolist()
+                if now - last_access > TOUCH_INTERVAL_SECONDS:
+                    stale_access.append(key)
+        hits = sum(1 for key in keys if key in found)
+        with self._lock:
+            self.hits += hits
+            self.misses += len(keys) - hits
+            self._touched.update((key, now) for key in stale_access)
+            flush = len(self._touched) >= TOUCH_FLUSH_KEYS or (self._touched and now - self._last_flush >= TOUCH_FLUSH_SECONDS)
+        if flush:
+            with conn:
+                self._flush_touched(conn)
+        return found
+
+    def _flush_touched(self, conn: sqlite3.Connection) -> None:
+        """Writes queued last-access times (inside the caller's transaction)."""
+        with self._lock:
+            touched, self._touched = self._touched, {}
+            self._last_flush = time.time()
+        if touched:
+            conn.executemany("UPDATE embeddings SET last_access = ? WHERE key = ?", [(at, key) for key, at in touched.items()])
+
+    def put_many(self, items: Dict[str, Sequence[float]]) -> None:
+        """Stores vectors and evicts the least recently used entries over the size bound."""
+        if not items:
+            return
+        now = time.time()
+        rows = [(key, np.asarray(vector, dtype=np.float32).tobytes(), now) for key, vector in items.items()]
+        with self._lock:
+            self._inserted_since_check += len(rows)
+            check_size = self._inserted_since_check >= max(1, int(self.max_entries * EVICTION_SLACK))
+            if check_size:
+                self._inserted_since_check = 0
+        with self._connect() as conn:
+            conn.executemany("INSERT OR REPLACE INTO embeddings (key, vector, last_access) VALUES (?, ?, ?)", rows)
+            self._flush_touched(conn) # Already writing; recent accesses count before evicting
+            if check_size and conn.execute("SELECT count(*) FROM embeddings").fetchone()[0] > self.max_entries:
+                conn.execute(
+                    "DELETE FROM embeddings WHERE key IN ("
+                    "SELECT key FROM embeddings ORDER BY last_access DESC LIMIT -1 OFFSET ?)",
+                    (self.max_entries,),
+                )
+
+    def stats(self) -> Dict[str, int]:
+        """Returns hit/miss counters (this worker) and the current entry count."""
+        with self._connect() as conn:
+            entries = conn.execute("SELECT count(*) FROM embeddings").fetchone()[0]
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "entries": entries, "max_entries": self.max_entries}
+
+class CachedEmbeddings(Embeddings):
+    """Embedding client wrapper that serves repeated texts from an `EmbeddingCache`."""
+
+    def __init__(self, client: Embeddings, cache: EmbeddingCache, namespace: str, query_namespace: Optional[str] = None):
+        self.client = client
+        self.cache = cache
+        self.namespace = namespace # Model identity used in cache keys
+        # Differs when the model embeds queries differently from documents (task prefixes)
+        self.query_namespace = query_namespace or namespace
+
+    @property
+    def model(self) -> str:
+        return self.client.model
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys = [EmbeddingCache.make_key(self.namespace, text) for text in texts]
+        try:
+            cached = self.cache.get_many(keys)
+        except sqlite3.Error as e:
+            logger.warning(f"Embedding cache read failed, bypassing cache: {e}")
+            return self.client.embed_documents(texts)
+
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in cached:
+                missing.setdefault(key, text)
+        if missing:
+            vectors = self.client.embed_documents(list(missing.values()))
+            fresh = dict(zip(missing.keys(), vectors))
+            try:
+                self.cache.put_many(fresh)
+            except sqlite3.Error as e:
+                logger.warning(f"Embedding cache write failed: {e}")
+            cached.update(fresh)
+        return [cached[key] for key in keys]
+
+    def embed_query(self, text: str) -> List[float]:
+        key = EmbeddingCache.make_key(self.query_namespace, text)
+        try:
+            cached = self.cache.get_many([key])
+        except sqlite3.Error as e:
+            logger.warning(f"Embedding cache read failed, bypassing cache: {e}")
+            return self.client.embed_query(text)
+        if key in cached:
+            return cached[key]
+        vector = self.client.embed_query(text)
+        try:
+            self.cache.put_many({key: vector})
+        except sqlite3.Error as e:
+            logger.warning(f"Embedding cache write failed: {e}")
+        return vector
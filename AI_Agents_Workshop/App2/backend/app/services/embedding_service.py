@@ -0,0 +1,88 @@
+"""Batched, concurrent embedding generation for document ingestion.
+
+Groups text chunks into embedding requests bounded by both item count and an
+estimated token count, then sends those requests to the configured embedding
+client with a bounded number of requests in flight. Results are yielded in
+input order, one batch at a time, so callers can stream them straight into
+bulk database inserts without holding a whole document's vectors in memory.
+"""
+
+import logging
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Deque, Iterable, Iterator, List, Optional, Tuple, TypeVar
+
+from app.config import get_settings
+from app.llm_clients import get_embedding_client
+from app.services.tokenizer import CHARS_PER_TOKEN
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+def estimate_tokens(text: str) -> int:
+    """Cheaply estimates the token count of a text without a tokenizer."""
+    return max(1, len(text) // CHARS_PER_TOKEN)
+
+def iter_batches(
+    items: Iterable[T],
+    get_text: Callable[[T], str] = str,
+    max_items: Optional[int] = None,
+    max_tokens: Optional[int] = None,
+) -> Iterator[List[T]]:
+    """Groups items into batches bounded by item count and estimated tokens.
+
+    A single item larger than `max_tokens` still forms its own batch; the
+    embedding client is responsible for truncating oversized inputs.
+    """
+    max_items = max_items or settings.EMBEDDING_BATCH_SIZE
+    max_tokens = max_tokens or settings.EMBEDDING_BATCH_MAX_TOKENS
+
+    batch: List[T] = []
+    batch_tokens = 0
+    for item in items:
+        item_tokens = estimate_tokens(get_text(item))
+        if batch and (len(batch) >= max_items or batch_tokens + item_tokens > max_tokens):
+            yield batch
+            batch, batch_tokens = [], 0
+        batch.append(item)
+        batch_tokens += item_tokens
+    if batch:
+        yield batch
+
+def iter_embedded_batches(
+    items: Iterable[T],
+    get_text: Callable[[T], str] = str,
+    embedding_client=None,
+    max_concurrency: Optional[int] = None,
+) -> Iterator[Tuple[List[T], List[List[float]]]]:
+    """Embeds items in bounded batches and yields `(batch, vectors)` in input order.
+
+    At most `max_concurrency` embedding requests are in flight at any time,
+    which also bounds how many batches are buffered in memory.
+    """
+    embedding_client = embedding_client or get_embedding_client()
+    max_concurrency = max(1, max_concurrency or settings.EMBEDDING_MAX_CONCURRENCY)
+
+    def _embed(batch: List[T]) -> List[List[float]]:
+        vectors = embedding_client.embed_documents([get_text(item) for item in batch])
+        if len(vectors) != len(batch):
+            raise ValueError(f"Embedding client returned {len(vectors)} vectors for {len(batch)} inputs.")
+        return vectors
+
+    with ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="embed") as executor:
+        in_flight: Deque = deque()
+        try:
+            for batch in iter_batches(items, get_text=get_text):
+                in_flight.append((batch, executor.submit(_embed, batch)))
+                if len(in_flight) >= max_concurrency:
+                    done_batch, future = in_flight.popleft()
+                    yield done_batch, future.result()
+            while in_flight:
+                done_batch, future = in_flight.popleft()
+                yield done_batch, future.result()
+        finally:
+            # Don't start queued requests if the consumer stopped early or failed
+            for _, future in in_flight:
+                future.cancel()
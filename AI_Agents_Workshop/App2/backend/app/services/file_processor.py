@@ -1,68 +1,138 @@
-"""Service for processing uploaded files: text extraction and chunking."""
+"""Service for processing uploaded files: storage, text extraction and the ingestion pipeline."""
 
 import os
-from typing import List, Optional, Generator
+import hashlib
+from typing import TYPE_CHECKING, BinaryIO, Callable, Iterable, Iterator, List, Optional, Tuple
 import logging
+from concurrent.futures import Executor
 
 # Import necessary libraries for file types
 import docx # python-docx
-from pypdf import PdfReader
 
 from app import schemas
 from app.config import get_settings
+from app.services.chunking import get_chunk_params, iter_chunks
+from app.services.pdf_extraction import extract_pdf_page_range, iter_pdf_pages
+from app.services.text_cache import CacheEntry, get_text_cache
+
+if TYPE_CHECKING:
+    from app.services.ingestion_jobs import IngestionJob
 
 settings = get_settings()
 logger = logging.getLogger(__name__)
 
+# --- File Storage --- 
+
+COPY_BUFFER_SIZE = 1024 * 1024 # 1 MiB
+
+def save_stream_with_hash(source: BinaryIO, destination_path: str, max_bytes: Optional[int] = None) -> Tuple[int, str]:
+    """Writes a binary stream to disk, hashing it on the way through.
+
+    Returns the number of bytes written and the SHA-256 hex digest, so the
+    content hash costs no extra pass over the file. Raises ValueError once
+    more than `max_bytes` have been read (e.g. an archive bomb).
+    """
+    sha256 = hashlib.sha256()
+    size = 0
+    with open(destination_path, "wb") as buffer:
+        while True:
+            block = source.read(COPY_BUFFER_SIZE)
+            if not block:
+                break
+            size += len(block)
+            if max_bytes is not None and size > max_bytes:
+                raise ValueError(f"File exceeds the size limit of {max_bytes} bytes.")
+            sha256.update(block)
+            buffer.write(block)
+    return size, sha256.hexdigest()
+
+def hash_file(file_path: str) -> str:
+    """Returns the SHA-256 hex digest of a file, read in blocks."""
+    sha256 = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(COPY_BUFFER_SIZE), b""):
+            sha256.update(block)
+    return sha256.hexdigest()
+
 # --- Text Extraction --- 
 
-def extract_text_from_txt(file_path: str) -> str:
-    """Extracts text content from a plain text file."""
+TEXT_READ_BLOCK_SIZE = 64 * 1024 # Characters per read when streaming text files
+
+def iter_text_from_txt(file_path: str, block_size: int = TEXT_READ_BLOCK_SIZE) -> Iterator[str]:
+    """Streams the content of a plain text file in fixed-size blocks."""
     try:
         with open(file_path, 'r', encoding='utf-8') as f:
-            return f.read()
+            while True:
+                block = f.read(block_size)
+                if not block:
+                    break
+                yield block
     except Exception as e:
         logger.error(f"Error reading text file {file_path}: {e}", exc_info=True)
         raise ValueError(f"Could not read text file: {e}")
 
-def extract_text_from_docx(file_path: str) -> str:
-    """Extracts text content from a DOCX file."""
+def extract_text_from_txt(file_path: str) -> str:
+    """Extracts text content from a plain text file."""
+    return "".join(iter_text_from_txt(file_path))
+
+def extract_paragraphs_from_docx(file_path: str) -> List[str]:
+    """Extracts the text of each paragraph of a DOCX file."""
     try:
         doc = docx.Document(file_path)
-        full_text = [para.text for para in doc.paragraphs]
-        return '\n'.join(full_text)
+        return [para.text for para in doc.paragraphs]
     except Exception as e:
         logger.error(f"Error reading docx file {file_path}: {e}", exc_info=True)
         raise ValueError(f"Could not read docx file: {e}")
 
-def extract_text_from_pdf(file_path: str) -> str:
-    """Extracts text content from a PDF file."""
+def extract_text_from_docx(file_path: str) -> str:
+    """Extracts text content from a DOCX file."""
+    return '\n'.join(extract_paragraphs_from_docx(file_path))
+
+def extract_pages_from_pdf(file_path: str) -> List[str]:
+    """Extracts the text of each page of a PDF file (serially; see `pdf_extraction` for parallel)."""
     try:
-        reader = PdfReader(file_path)
-        full_text = []
-        for page in reader.pages:
-            full_text.append(page.extract_text() or "") # Handle cases where extraction might return None
-        return "\n".join(full_text)
+        return extract_pdf_page_range(file_path, 0)
     except Exception as e:
         logger.error(f"Error reading pdf file {file_path}: {e}", exc_info=True)
         raise ValueError(f"Could not read pdf file: {e}")
 
-def extract_text(file_path: str, media_type: Optional[str]) -> str:
-    """Extracts text from a file based on its path or media type."""
-    logger.info(f"Attempting to extract text from {file_path} (media_type: {media_type})")
+def extract_text_from_pdf(file_path: str) -> str:
+    """Extracts text content from a PDF file."""
+    return "\n".join(extract_pages_from_pdf(file_path))
+
+SUPPORTED_EXTENSIONS = (".txt", ".docx", ".pdf")
+
+def detect_file_kind(file_path: str, media_type: Optional[str]) -> str:
+    """Returns "txt", "docx" or "pdf" based on the file's extension or media type."""
     _, extension = os.path.splitext(file_path)
     effective_media_type = media_type or ""
+    if extension.lower() == ".txt" or "text/plain" in effective_media_type:
+        return "txt"
+    elif extension.lower() == ".docx" or "application/vnd.openxmlformats-officedocument.wordprocessingml.document" in effective_media_type:
+        return "docx"
+    elif extension.lower() == ".pdf" or "application/pdf" in effective_media_type:
+        return "pdf"
+    logger.warning(f"Unsupported file type/extension: {extension} / {media_type}")
+    raise ValueError(f"Unsupported file type: {extension or media_type}")
+
+def extract_text(file_path: str, media_type: Optional[str]) -> str:
+    """Extracts text from a file based on its path or media type."""
+    return "\n".join(extract_pages(file_path, media_type))
 
+def extract_pages(file_path: str, media_type: Optional[str]) -> List[str]:
+    """Extracts text from a file as a list of pages, based on its path or media type.
+
+    PDFs yield one entry per page; other formats yield a single entry.
+    Module-level (picklable) so it can run in the extraction process pool.
+    """
+    logger.info(f"Attempting to extract text from {file_path} (media_type: {media_type})")
     try:
-        if extension.lower() == ".txt" or "text/plain" in effective_media_type:
-            return extract_text_from_txt(file_path)
-        elif extension.lower() == ".docx" or "application/vnd.openxmlformats-officedocument.wordprocessingml.document" in effective_media_type:
-            return extract_text_from_docx(file_path)
-        elif extension.lower() == ".pdf" or "application/pdf" in effective_media_type:
-            return extract_text_from_pdf(file_path)
-        else:
-            logger.warning(f"Unsupported file type/extension: {extension} / {media_type}")
-            raise ValueError(f"Unsupported file type: {extension or media_type}")
+        file_kind = detect_file_kind(file_path, media_type)
+        if file_kind == "txt":
+            return [extract_text_from_txt(file_path)]
+        elif file_kind == "docx":
+            return [extract_text_from_docx(file_path)]
+        return extract_pages_from_pdf(file_path)
     except ValueError as ve:
         # Re-raise ValueErrors (like unsupported type or read errors) directly
         raise ve
@@ -71,78 +141,175 @@ def extract_text(file_path: str, media_type: Optional[str]) -> str:
         logger.error(f"Unexpected error extracting text from {file_path}: {e}", exc_info=True)
         raise ValueError(f"Unexpected error during text extraction: {e}")
 
-# --- Chunking --- 
-
-# TODO: Implement chunking strategies (e.g., fixed size, recursive character)
-# Consider using libraries like langchain.text_splitter or similar logic.
-
-def chunk_text(text: str, chunk_size: int = 1000, chunk_overlap: int = 100) -> List[str]:
-    """Placeholder for text chunking logic."""
-    logger.info(f"Chunking text (length: {len(text)}), chunk_size={chunk_size}, overlap={chunk_overlap}")
-    # Simple placeholder: split by paragraphs or fixed length
-    # In a real app, use a more robust method like RecursiveCharacterTextSplitter
-    chunks = []
-    start = 0
-    while start < len(text):
-        end = start + chunk_size
-        chunks.append(text[start:end])
-        start += chunk_size - chunk_overlap
-        if start < 0: # Avoid issues if overlap > size
-             start = end
-    logger.info(f"Generated {len(chunks)} chunks.")
-    return chunks
+def _join_blocks(blocks: Iterable[str], separator: str = "\n") -> Iterator[str]:
+    """Yields blocks with a separator between them, as `separator.join` would."""
+    for i, block in enumerate(blocks):
+        if i:
+            yield separator
+        yield block
+
+def iter_text_blocks(
+    file_path: str,
+    media_type: Optional[str],
+    executor: Executor,
+    on_page: Optional[Callable[[], None]] = None,
+    content_hash: Optional[str] = None,
+) -> Iterator[str]:
+    """Streams a file's extracted text as consecutive blocks.
+
+    The blocks concatenate to exactly what `extract_text` returns, so chunk
+    offsets are the same either way. Text files are read incrementally, DOCX
+    parsing runs in one worker task, and PDF page ranges are extracted in
+    parallel on `executor` and streamed in order. `on_page` is called after
+    each PDF page (once for other formats). Given the file's `content_hash`,
+    parsed PDF and DOCX text is served from (and saved to) the extracted-text
+    cache, see `text_cache`.
+    """
+    file_kind = detect_file_kind(file_path, media_type)
+    if file_kind == "txt": # Reading is as cheap as the cache would be
+        yield from iter_text_from_txt(file_path)
+        if on_page:
+            on_page()
+        return
+
+    cache = get_text_cache() if content_hash else None
+    cache_key = cache.make_key(content_hash, file_kind) if cache else None
+    entry = cache.get(cache_key) if cache else None
+    if file_kind == "pdf":
+        try:
+            if entry is not None and entry.complete:
+                pages = entry.pages()
+            else:
+                pages = _resumed_pdf_pages(file_path, executor, entry)
+                if cache:
+                    pages = cache.write_through(cache_key, pages)
+            yield from _join_blocks(_counted(pages, on_page))
+        except Exception as e:
+            logger.error(f"Error reading pdf file {file_path}: {e}", exc_info=True)
+            raise ValueError(f"Could not read pdf file: {e}")
+        return
+
+    if entry is not None and entry.complete:
+        paragraphs = list(entry.pages())
+    else:
+        paragraphs = executor.submit(extract_paragraphs_from_docx, file_path).result()
+        if cache:
+            cache.put(cache_key, paragraphs)
+    yield from _join_blocks(paragraphs)
+    if on_page:
+        on_page()
+
+def _resumed_pdf_pages(file_path: str, executor: Executor, entry: Optional[CacheEntry]) -> Iterator[str]:
+    """Yields the pages of a partial cache entry, then extracts the rest of the PDF."""
+    first_page = 0
+    if entry is not None:
+        for page in entry.pages():
+            first_page += 1
+            yield page
+        logger.info(f"Resuming extraction of {file_path} at page {first_page + 1} from the extracted-text cache")
+    yield from iter_pdf_pages(file_path, executor, first_page=first_page)
+
+def _counted(pages: Iterable[str], on_page: Optional[Callable[[], None]]) -> Iterator[str]:
+    """Calls `on_page` after each page has been consumed."""
+    for page in pages:
+        yield page
+        if on_page:
+            on_page()
 
 # --- Full Processing Pipeline --- 
 
-def process_file_and_vectorize(db_file_id: int, db_session): # Needs DB session
+def process_file_and_vectorize(db_file_id: int, db_session, job: Optional["IngestionJob"] = None): # Needs DB session
     """Orchestrates the file processing and vectorization.
-       Placeholder - to be implemented, likely triggered by upload endpoint.
+
+    Normally run by a background ingestion job (see `ingestion_jobs`), which
+    passes itself as `job` to receive progress updates and to be able to
+    cancel between stages and embedding batches. Errors are recorded on the
+    file row and re-raised.
     """
     from app import crud
     from app.services import vector_store
+    from app.services.ingestion_jobs import IngestionCancelled, get_extraction_pool
+
+    def report(**progress):
+        if job:
+            job.update(**progress)
 
     db_file = crud.crud_file.get_file(db_session, db_file_id)
     if not db_file:
         logger.error(f"File with ID {db_file_id} not found for processing.")
-        return
+        raise ValueError(f"File with ID {db_file_id} not found.")
 
     full_path = os.path.join(settings.KNOWLEDGE_BASE_PATH, db_file.relative_path)
     logger.info(f"Starting processing for file: {full_path} (ID: {db_file.id})")
 
     try:
         # 1. Update status to processing
-        crud.crud_file.update_file(db_session, db_file, schemas.file.FileUpdate(is_processing=True))
-
-        # 2. Extract Text
-        text_content = extract_text(full_path, db_file.media_type)
-        logger.info(f"Extracted text content (length: {len(text_content)}) for file ID: {db_file.id}")
-
-        # 3. Chunk Text
-        # TODO: Make chunk size/overlap configurable?
-        text_chunks = chunk_text(text_content)
-
-        # 4. Generate & Store Embeddings for each chunk
-        embedding_model = settings.OLLAMA_EMBEDDING_MODEL if settings.APP_MODE == "LOCAL" else settings.OPENAI_EMBEDDING_MODEL
-        for chunk in text_chunks:
-            if chunk.strip(): # Avoid embedding empty chunks
-                 vector_store.add_vector_embedding(
-                     db=db_session,
-                     file_id=db_file.id,
-                     text_chunk=chunk,
-                     embedding_model=embedding_model
-                 )
-        logger.info(f"Finished generating and storing embeddings for file ID: {db_file.id}")
+        crud.crud_file.update_file(db_session, db_file, schemas.file.FileUpdate(is_processing=True, vectorization_error=None))
+
+        # 1b. Identical content already vectorized? Reuse its chunks and embeddings.
+        if db_file.content_hash:
+            source_file = crud.crud_file.get_vectorized_file_by_content_hash(
+                db_session, db_file.content_hash, exclude_file_id=db_file.id
+            )
+            if source_file:
+                copied_count = vector_store.copy_vector_embeddings(db_session, source_file.id, db_file.id)
+                if copied_count:
+                    report(stage="reused", chunks_total=copied_count, chunks_embedded=copied_count)
+                    crud.crud_file.update_file(db_session, db_file, schemas.file.FileUpdate(is_processing=False, is_vectorized=True))
+                    logger.info(f"Reused {copied_count} embeddings of identical file ID {source_file.id} for file ID: {db_file.id}")
+                    return
+
+        # 2-4. Stream: extract text blocks -> chunk -> embed & store in bulk (one transaction).
+        # Extraction is CPU-bound (PDF page ranges run in parallel in the extraction
+        # process pool); memory stays bounded by chunk/batch sizes, not file size.
+        # The stage is "extracting" until the first chunk is ready, then "embedding"
+        # (later pages are still read between embedding batches; pages_parsed keeps counting).
+        report(stage="extracting")
+        pages_parsed = 0
+        def on_page():
+            nonlocal pages_parsed
+            pages_parsed += 1
+            report(pages_parsed=pages_parsed)
+
+        chunks_seen = 0
+        def non_empty_chunks():
+            nonlocal chunks_seen
+            blocks = iter_text_blocks(
+                full_path, db_file.media_type, get_extraction_pool(), on_page=on_page, content_hash=db_file.content_hash
+            )
+            chunk_tokens, overlap_tokens = get_chunk_params(db_file.media_type, detect_file_kind(full_path, db_file.media_type))
+            for chunk in iter_chunks(blocks, chunk_tokens, overlap_tokens):
+                chunks_seen += 1
+                if chunks_seen == 1:
+                    report(stage="embedding")
+                if chunk.text.strip(): # Avoid embedding empty chunks
+                    yield chunk
+
+        stored_count = vector_store.add_vector_embeddings_bulk(
+            db=db_session,
+            file_id=db_file.id,
+            text_chunks=non_empty_chunks(),
+            on_progress=job.add_chunks_embedded if job else None,
+            on_reuse=job.add_chunks_reused if job else None,
+        )
+        report(chunks_total=stored_count)
+        logger.info(f"Extracted {pages_parsed} page(s) and {chunks_seen} chunks for file ID: {db_file.id}")
+        logger.info(f"Finished generating and storing {stored_count} embeddings for file ID: {db_file.id}")
 
         # 5. Update status to vectorized
         crud.crud_file.update_file(db_session, db_file, schemas.file.FileUpdate(is_processing=False, is_vectorized=True))
+        report(stage="done")
         logger.info(f"Successfully processed and vectorized file ID: {db_file.id}")
 
+    except IngestionCancelled:
+        db_session.rollback()
+        crud.crud_file.update_file(db_session, db_file, schemas.file.FileUpdate(is_processing=False, is_vectorized=False, vectorization_error="Ingestion cancelled."))
+        raise
+
     except Exception as e:
         logger.error(f"Error processing file ID {db_file.id}: {e}", exc_info=True)
+        db_session.rollback()
         # Update status with error
         error_message = str(e)
         crud.crud_file.update_file(db_session, db_file, schemas.file.FileUpdate(is_processing=False, is_vectorized=False, vectorization_error=error_message))
-
-    finally:
-        # Ensure session is managed appropriately if called as background task
-        pass 
\ No newline at end of file
+        raise
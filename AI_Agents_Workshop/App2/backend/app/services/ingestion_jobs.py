@@ -0,0 +1,203 @@
+"""Background ingestion job queue for uploaded files.
+
+Uploads register a job here and return immediately; the job runs
+`file_processor.process_file_and_vectorize` on a bounded thread pool with its
+own DB session. CPU-bound text extraction is sent to a shared process pool,
+while embedding I/O runs on the batched thread pool in `embedding_service`.
+
+Jobs, their progress (pages parsed, chunks embedded) and cancellation flags
+live in process memory. This is an in-process stand-in for an external queue
+such as Redis: job state is per worker process and is lost on restart (the
+file row keeps its `vectorization_error`/`is_vectorized` status either way).
+"""
+
+import datetime
+import logging
+import multiprocessing
+import threading
+import uuid
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import List, Optional
+
+from app.config import get_settings
+from app.schemas.ingestion import IngestionJobRead, JobStatus
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+class IngestionCancelled(Exception):
+    """Raised inside a running job once cancellation has been requested."""
+
+class IngestionJob:
+    """Mutable, thread-safe progress record for one file's ingestion."""
+
+    def __init__(self, file_id: int):
+        self.job_id = uuid.uuid4().hex
+        self.file_id = file_id
+        self.status = JobStatus.QUEUED
+        self.stage: Optional[str] = None
+        self.pages_parsed = 0
+        self.chunks_total: Optional[int] = None
+        self.chunks_embedded = 0
+        self.chunks_reused = 0
+        self.chunks_near_duplicate = 0
+        self.error: Optional[str] = None
+        self.created_at = datetime.datetime.now(datetime.timezone.utc)
+        self.started_at: Optional[datetime.datetime] = None
+        self.finished_at: Optional[datetime.datetime] = None
+        self.future: Optional[Future] = None
+        self._cancel_requested = threading.Event()
+        self._lock = threading.Lock()
+
+    def update(self, **fields) -> None:
+        """Sets progress fields, then raises `IngestionCancelled` if cancellation was requested."""
+        with self._lock:
+            for key, value in fields.items():
+                setattr(self, key, value)
+        self.raise_if_cancelled()
+
+    def add_chunks_embedded(self, count: int) -> None:
+        """Progress callback for bulk embedding; also a cancellation point."""
+        with self._lock:
+            self.chunks_embedded += count
+        self.raise_if_cancelled()
+
+    def add_chunks_reused(self, same_text: int, near_duplicate: int) -> None:
+        """Reuse callback for bulk embedding: vectors not re-embedded, by exact and near-duplicate match."""
+        with self._lock:
+            self.chunks_reused += same_text
+            self.chunks_near_duplicate += near_duplicate
+
+    def raise_if_cancelled(self) -> None:
+        if self._cancel_requested.is_set():
+            raise IngestionCancelled(f"Ingestion job {self.job_id} was cancelled.")
+
+    def to_schema(self) -> IngestionJobRead:
+        with self._lock:
+            return IngestionJobRead(
+                job_id=self.job_id, file_id=self.file_id, status=self.status, stage=self.stage,
+                pages_parsed=self.pages_parsed, chunks_total=self.chunks_total,
+                chunks_embedded=self.chunks_embedded, chunks_reused=self.chunks_reused,
+                chunks_near_duplicate=self.chunks_near_duplicate, error=self.error,
+                created_at=self.created_at, started_at=self.started_at, finished_at=self.finished_at,
+            )
+
+_jobs: "OrderedDict[str, IngestionJob]" = OrderedDict()
+_jobs_lock = threading.Lock()
+_job_pool: Optional[ThreadPoolExecutor] = None
+_extraction_pool: Optional[ProcessPoolExecutor] = None
+_pools_lock = threading.Lock()
+
+def get_job_pool() -> ThreadPoolExecutor:
+    """Returns the thread pool that runs ingestion jobs (one DB session each)."""
+    global _job_pool
+    with _pools_lock:
+        if _job_pool is None:
+            _job_pool = ThreadPoolExecutor(max_workers=settings.INGESTION_MAX_CONCURRENT_JOBS, thread_name_prefix="ingest")
+        return _job_pool
+
+def get_extraction_pool() -> ProcessPoolExecutor:
+    """Returns the shared process pool for CPU-bound text extraction."""
+    global _extraction_pool
+    with _pools_lock:
+        if _extraction_pool is None:
+            # spawn: forking a multi-threaded server process is not safe
+            _extraction_pool = ProcessPoolExecutor(
+                max_workers=settings.INGESTION_EXTRACTION_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _extraction_pool
+
+CANCELLED_BEFORE_PROCESSING = "Ingestion cancelled before processing."
+
+def _record_cancelled_before_processing(db, file_id: int) -> None:
+    """Records on the file row that its ingestion never ran, so it doesn't silently stay unindexed."""
+    from app import crud, schemas
+
+    db_file = crud.get_file(db, file_id=file_id)
+    if db_file is not None:
+        crud.update_file(db, db_file, schemas.FileUpdate(is_processing=False, vectorization_error=CANCELLED_BEFORE_PROCESSING))
+
+def _run_job(job: IngestionJob) -> None:
+    """Runs one job on a worker thread with its own DB session."""
+    from app.db.session import SessionLocal
+    from app.services.file_processor import process_file_and_vectorize
+
+    job.status = JobStatus.RUNNING
+    job.started_at = datetime.datetime.now(datetime.timezone.utc)
+    db = SessionLocal()
+    try:
+        try:
+            job.raise_if_cancelled()
+        except IngestionCancelled:
+            _record_cancelled_before_processing(db, job.file_id)
+            raise
+        process_file_and_vectorize(job.file_id, db, job=job)
+        job.status = JobStatus.COMPLETED
+    except IngestionCancelled:
+        job.status = JobStatus.CANCELLED
+        logger.info(f"Ingestion job {job.job_id} for file ID {job.file_id} cancelled.")
+    except Exception as e:
+        job.status = JobStatus.FAILED
+        job.error = str(e)
+        logger.error(f"Ingestion job {job.job_id} for file ID {job.file_id} failed: {e}")
+    finally:
+        job.finished_at = datetime.datetime.now(datetime.timezone.utc)
+        db.close()
+
+def submit_ingestion_job(file_id: int) -> IngestionJob:
+    """Queues ingestion of a file and returns its job."""
+    job = IngestionJob(file_id)
+    with _jobs_lock:
+        _jobs[job.job_id] = job
+        # Forget the oldest finished jobs beyond the history bound
+        while len(_jobs) > settings.INGESTION_JOB_HISTORY:
+            oldest_id, oldest = next(iter(_jobs.items()))
+            if oldest.status in (JobStatus.QUEUED, JobStatus.RUNNING):
+                break
+            del _jobs[oldest_id]
+    job.future = get_job_pool().submit(_run_job, job)
+    logger.info(f"Queued ingestion job {job.job_id} for file ID {file_id}")
+    return job
+
+def get_job(job_id: str) -> Optional[IngestionJob]:
+    with _jobs_lock:
+        return _jobs.get(job_id)
+
+def list_jobs(file_id: Optional[int] = None) -> List[IngestionJob]:
+    """Lists known jobs, newest first, optionally for one file."""
+    with _jobs_lock:
+        jobs = list(_jobs.values())
+    return [job for job in reversed(jobs) if file_id is None or job.file_id == file_id]
+
+def cancel_job(job_id: str) -> Optional[IngestionJob]:
+    """Requests cancellation; queued jobs never start, running ones stop at the next checkpoint."""
+    job = get_job(job_id)
+    if job is None:
+        return None
+    job._cancel_requested.set()
+    if job.future is not None and job.future.cancel():
+        job.status = JobStatus.CANCELLED
+        job.finished_at = datetime.datetime.now(datetime.timezone.utc)
+        from app.db.session import SessionLocal
+
+        db = SessionLocal()
+        try:
+            _record_cancelled_before_processing(db, job.file_id)
+        except Exception as e:
+            logger.error(f"Could not record cancellation of ingestion job {job.job_id} on file ID {job.file_id}: {e}")
+        finally:
+            db.close()
+    return job
+
+def shutdown() -> None:
+    """Cancels queued jobs and stops the worker pools (application shutdown)."""
+    global _job_pool, _extraction_pool
+    with _pools_lock:
+        if _job_pool is not None:
+            _job_pool.shutdown(wait=False, cancel_futures=True)
+            _job_pool = None
+        if _extraction_pool is not None:
+            _extraction_pool.shutdown(wait=False, cancel_futures=True)
+            _extraction_pool = None
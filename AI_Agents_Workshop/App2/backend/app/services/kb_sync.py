@@ -0,0 +1,311 @@
+"""Incremental sync of the knowledge-base directory with the `files` table.
+
+Files copied into KNOWLEDGE_BASE_PATH by other tooling (rather than uploaded)
+are picked up here. A sync walks the directory (supported extensions only,
+skipping hidden files and directories) and compares each file with its row:
+
+    no row                        -> row created, ingestion job queued
+    same size and mtime           -> unchanged (no read at all)
+    different, same content hash  -> only size/mtime refreshed
+    different content             -> old vectors deleted, ingestion job queued
+    row without a file            -> vectors and row deleted
+
+Files modified within KB_SYNC_SETTLE_SECONDS (a copy may still be running)
+and files with an ingestion in progress are deferred to the next sync.
+
+`start` runs syncs on a background thread: a full scan at startup, then
+either a full scan every KB_SYNC_INTERVAL_SECONDS or, when the optional
+`watchdog` package is installed (inotify on Linux) and KB_SYNC_USE_WATCHER is
+on, a sync of just the paths that filesystem events reported. A Postgres
+advisory lock keeps one sync at a time across worker processes. On demand:
+POST /files/sync, or `python -m app.services.kb_sync` from the `backend`
+directory (waits for the queued ingestion unless --no-wait is given).
+"""
+
+import argparse
+import contextlib
+import logging
+import mimetypes
+import os
+import threading
+import time
+from typing import Dict, Iterable, Iterator, Optional, Set, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app import crud, schemas
+from app.config import get_settings
+from app.models import File
+from app.services import ingestion_jobs, vector_store
+from app.services.file_processor import SUPPORTED_EXTENSIONS, hash_file
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+ADVISORY_LOCK_KEY = 0x4B4253594E43 # pg_advisory_lock key held while syncing ("KBSYNC")
+
+_stop = threading.Event()
+_thread: Optional[threading.Thread] = None
+_observer = None
+_dirty_paths: Set[str] = set()
+_full_scan_requested = threading.Event()
+_dirty_lock = threading.Lock()
+
+def is_synced_path(relative_path: str) -> bool:
+    """Whether a path (relative, "/"-separated) is one the sync manages."""
+    parts = relative_path.split("/")
+    if any(part.startswith(".") or part.startswith("~$") for part in parts): # Hidden, temp and Office lock files
+        return False
+    return os.path.splitext(relative_path)[1].lower() in SUPPORTED_EXTENSIONS
+
+def iter_knowledge_base_files(root: str) -> Iterator[Tuple[str, os.stat_result]]:
+    """Yields (relative path, stat) of every synced file under the root."""
+    for directory, subdirectories, filenames in os.walk(root):
+        subdirectories[:] = [name for name in subdirectories if not name.startswith(".")]
+        for filename in filenames:
+            full_path = os.path.join(directory, filename)
+            relative_path = os.path.relpath(full_path, root).replace(os.sep, "/")
+            if is_synced_path(relative_path):
+                try:
+                    yield relative_path, os.stat(full_path)
+                except FileNotFoundError: # Deleted during the walk
+                    continue
+
+@contextlib.contextmanager
+def sync_lock(db: Session, wait: bool = False):
+    """Holds the cluster-wide sync lock, e.g. while registering files that were moved into the directory.
+
+    Without `wait`, raises ValueError if another sync holds it.
+    """
+    with db.get_bind().connect().execution_options(isolation_level="AUTOCOMMIT") as lock_conn:
+        if wait:
+            lock_conn.execute(text("SELECT pg_advisory_lock(:key)"), {"key": ADVISORY_LOCK_KEY})
+        elif not lock_conn.execute(text("SELECT pg_try_advisory_lock(:key)"), {"key": ADVISORY_LOCK_KEY}).scalar():
+            raise ValueError("A knowledge-base sync is already running.")
+        try:
+            yield
+        finally:
+            lock_conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": ADVISORY_LOCK_KEY})
+
+def _queue_ingestion(db_file: File, result: schemas.KnowledgeBaseSyncRead) -> None:
+    result.job_ids.append(ingestion_jobs.submit_ingestion_job(db_file.id).job_id)
+
+def _sync_file(db: Session, relative_path: str, stat: os.stat_result, db_file: Optional[File], result: schemas.KnowledgeBaseSyncRead) -> None:
+    """Brings the row and vectors of one file on disk up to date."""
+    if db_file is not None and db_file.file_size_bytes == stat.st_size and db_file.mtime_ns == stat.st_mtime_ns:
+        result.unchanged += 1
+        return
+    if (db_file is not None and db_file.is_processing) or time.time_ns() - stat.st_mtime_ns < settings.KB_SYNC_SETTLE_SECONDS * 1e9:
+        result.deferred.append(relative_path)
+        return
+    full_path = os.path.join(settings.KNOWLEDGE_BASE_PATH, relative_path)
+    content_hash = hash_file(full_path)
+    if db_file is None:
+        file_in = schemas.FileCreate(
+            filename=os.path.basename(relative_path),
+            media_type=mimetypes.guess_type(relative_path)[0],
+            file_size_bytes=stat.st_size,
+            content_hash=content_hash,
+            mtime_ns=stat.st_mtime_ns,
+        )
+        try:
+            db_file = crud.create_file(db, file_in=file_in, relative_path=relative_path)
+        except IntegrityError: # Uploaded at the same moment; the upload ingests it
+            db.rollback()
+            result.unchanged += 1
+            return
+        result.added += 1
+        _queue_ingestion(db_file, result)
+        return
+    if db_file.content_hash == content_hash: # Touched or copied over with identical content
+        crud.update_file(db, db_file, schemas.FileUpdate(file_size_bytes=stat.st_size, mtime_ns=stat.st_mtime_ns))
+        result.unchanged += 1
+        return
+    vector_store.delete_vector_embeddings_for_file(db, db_file.id)
+    crud.update_file(db, db_file, schemas.FileUpdate(
+        file_size_bytes=stat.st_size, content_hash=content_hash, mtime_ns=stat.st_mtime_ns,
+        is_vectorized=False, vectorization_error=None,
+    ))
+    result.changed += 1
+    _queue_ingestion(db_file, result)
+
+def _remove_file(db: Session, db_file: File, result: schemas.KnowledgeBaseSyncRead) -> None:
+    if db_file.is_processing:
+        result.deferred.append(db_file.relative_path)
+        return
+    vector_store.delete_vector_embeddings_for_file(db, db_file.id)
+    crud.delete_file(db, file_id=db_file.id)
+    result.deleted += 1
+    logger.info(f"[KnowledgeBaseSync] Removed file ID {db_file.id} ({db_file.relative_path}): no longer on disk")
+
+def sync_knowledge_base(db: Session, relative_paths: Optional[Iterable[str]] = None) -> schemas.KnowledgeBaseSyncRead:
+    """Syncs the whole directory, or only the given relative paths, with the `files` table.
+
+    Ingestion of new and changed files is queued, not awaited. Raises
+    ValueError if another sync is running.
+    """
+    started = time.perf_counter()
+    result = schemas.KnowledgeBaseSyncRead()
+    root = settings.KNOWLEDGE_BASE_PATH
+    if not os.path.isdir(root):
+        # An unmounted or misconfigured directory must not wipe the knowledge base
+        raise ValueError(f"Knowledge base directory '{root}' does not exist.")
+    with sync_lock(db):
+        if relative_paths is None:
+            on_disk: Dict[str, os.stat_result] = dict(iter_knowledge_base_files(root))
+            known = {db_file.relative_path: db_file for db_file in crud.get_all_files(db)}
+        else:
+            on_disk, known = {}, {}
+            for relative_path in set(relative_paths):
+                full_path = os.path.join(root, relative_path)
+                if is_synced_path(relative_path) and os.path.isfile(full_path):
+                    on_disk[relative_path] = os.stat(full_path)
+                db_file = crud.get_file_by_relative_path(db, relative_path=relative_path)
+                if db_file is not None:
+                    known[relative_path] = db_file
+
+        for relative_path in sorted(on_disk):
+            result.scanned += 1
+            try:
+                _sync_file(db, relative_path, on_disk[relative_path], known.get(relative_path), result)
+            except Exception as e:
+                db.rollback()
+                logger.error(f"[KnowledgeBaseSync] Could not sync {relative_path}: {e}", exc_info=True)
+                result.errors.append(f"{relative_path}: {e}")
+        for relative_path, db_file in known.items():
+            # Rows the sync doesn't manage (e.g. legacy uploads of other types) are never "missing"
+            if relative_path not in on_disk and is_synced_path(relative_path):
+                try:
+                    _remove_file(db, db_file, result)
+                except Exception as e:
+                    db.rollback()
+                    logger.error(f"[KnowledgeBaseSync] Could not remove {relative_path}: {e}", exc_info=True)
+                    result.errors.append(f"{relative_path}: {e}")
+
+    result.duration_ms = (time.perf_counter() - started) * 1000
+    logger.info(
+        f"[KnowledgeBaseSync] Scanned {result.scanned} files in {result.duration_ms:.0f} ms: {result.added} added, "
+        f"{result.changed} changed, {result.deleted} deleted, {len(result.deferred)} deferred, {len(result.errors)} errors"
+    )
+    return result
+
+# --- Background sync ---
+
+class _EventCollector:
+    """watchdog event handler that records the relative paths events touch."""
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def dispatch(self, event) -> None:
+        if event.event_type in ("opened", "closed_no_write"):
+            return
+        if event.is_directory:
+            if event.event_type in ("moved", "deleted"): # Files inside changed without their own events
+                _full_scan_requested.set()
+            return
+        for path in (event.src_path, getattr(event, "dest_path", None)):
+            if not path:
+                continue
+            relative_path = os.path.relpath(os.fsdecode(path), self.root).replace(os.sep, "/")
+            if is_synced_path(relative_path):
+                with _dirty_lock:
+                    _dirty_paths.add(relative_path)
+
+def _start_watcher() -> bool:
+    """Starts a watchdog observer on the directory; False if watchdog isn't available."""
+    global _observer
+    try:
+        from watchdog.observers import Observer
+    except ImportError:
+        logger.info("[KnowledgeBaseSync] watchdog is not installed; using periodic full scans.")
+        return False
+    root = os.path.abspath(settings.KNOWLEDGE_BASE_PATH)
+    os.makedirs(root, exist_ok=True)
+    _observer = Observer()
+    _observer.schedule(_EventCollector(root), root, recursive=True)
+    _observer.start()
+    logger.info(f"[KnowledgeBaseSync] Watching {root} for changes.")
+    return True
+
+def _run_sync(relative_paths: Optional[Set[str]]) -> bool:
+    """One background sync; deferred paths are retried. False if it could not run."""
+    from app.db.session import SessionLocal
+
+    db = SessionLocal()
+    try:
+        result = sync_knowledge_base(db, relative_paths)
+    except ValueError as e:
+        logger.info(f"[KnowledgeBaseSync] Sync skipped: {e}")
+        return False
+    except Exception as e:
+        logger.error(f"[KnowledgeBaseSync] Sync failed: {e}", exc_info=True)
+        return False
+    finally:
+        db.close()
+    with _dirty_lock:
+        _dirty_paths.update(result.deferred)
+    return True
+
+def _sync_loop(watching: bool) -> None:
+    _full_scan_requested.set() # Startup scan catches changes made while the app was down
+    while not _stop.is_set():
+        if _full_scan_requested.is_set() or not watching:
+            _full_scan_requested.clear()
+            with _dirty_lock:
+                _dirty_paths.clear() # The full scan covers them
+            if not _run_sync(None):
+                _full_scan_requested.set()
+        else:
+            with _dirty_lock:
+                paths = set(_dirty_paths)
+                _dirty_paths.clear()
+            if paths and not _run_sync(paths):
+                with _dirty_lock:
+                    _dirty_paths.update(paths)
+        _stop.wait(settings.KB_SYNC_SETTLE_SECONDS if watching else settings.KB_SYNC_INTERVAL_SECONDS)
+
+def start() -> None:
+    """Starts the background sync (application startup), if enabled."""
+    global _thread
+    watching = settings.KB_SYNC_USE_WATCHER and _start_watcher()
+    if not watching and not settings.KB_SYNC_INTERVAL_SECONDS:
+        return
+    _stop.clear()
+    _thread = threading.Thread(target=_sync_loop, args=(watching,), name="kb-sync", daemon=True)
+    _thread.start()
+
+def shutdown() -> None:
+    """Stops the watcher and the background sync (application shutdown)."""
+    global _observer
+    _stop.set()
+    if _observer is not None:
+        _observer.stop()
+        _observer = None
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Sync KNOWLEDGE_BASE_PATH with the knowledge base.")
+    parser.add_argument("--no-wait", action="store_true", help="Exit once ingestion is queued instead of when it finishes.")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    from concurrent.futures import wait
+    from app.db.session import SessionLocal
+
+    db = SessionLocal()
+    try:
+        result = sync_knowledge_base(db)
+    finally:
+        db.close()
+    print(result.model_dump_json(indent=2))
+    if not args.no_wait:
+        jobs = [ingestion_jobs.get_job(job_id) for job_id in result.job_ids]
+        wait([job.future for job in jobs if job is not None and job.future is not None])
+        failed = [job for job in jobs if job is not None and job.status == schemas.JobStatus.FAILED]
+        print(f"Ingested {len(jobs) - len(failed)} files, {len(failed)} failed.")
+    ingestion_jobs.shutdown()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+"""Embedding clients that run on the local CPU, with no network access.
+
+Air-gapped plant networks cannot reach the OpenAI API, so EMBEDDING_PROVIDER
+can select one of these instead (see `llm_clients.get_embedding_client`):
+
+    onnx     a sentence-embedding model exported to ONNX (e.g. a quantized
+             nomic-embed-text, bge-small or all-MiniLM), loaded from
+             LOCAL_EMBEDDING_MODEL_PATH: `model.onnx` (or `onnx/model.onnx`)
+             plus the Hugging Face `tokenizer.json`. Needs the optional
+             `onnxruntime` package.
+    hashing  deterministic feature hashing of words and word pairs into a
+             fixed-size vector. No model and no dependencies; lexical only,
+             meant for tests and offline development.
+
+Both implement the LangChain `Embeddings` interface and return L2-normalized
+vectors, so they slot in behind the embedding cache and the vector backends
+like the OpenAI client. The ONNX client sorts texts by length and runs them
+in passes of LOCAL_EMBEDDING_BATCH_SIZE to keep padding small; ONNX Runtime
+spreads each pass over LOCAL_EMBEDDING_THREADS cores, and concurrent
+ingestion requests (EMBEDDING_MAX_CONCURRENCY) share the one session.
+"""
+
+import hashlib
+import logging
+import os
+import re
+from typing import List, Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+logger = logging.getLogger(__name__)
+
+ONNX_PREFIX = "onnx:" # Embedding space model names of the onnx provider: "onnx:<model directory name>"
+HASHING_MODEL = "hashing"
+MODEL_FILES = ("model.onnx", os.path.join("onnx", "model.onnx"))
+WORD_PATTERN = re.compile(r"\w+")
+
+def _l2_normalized(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.where(norms == 0, 1.0, norms)
+
+class HashingEmbeddings(Embeddings):
+    """Signed feature hashing of lower-cased words and word bigrams."""
+
+    def __init__(self, dimensions: int):
+        self.dimensions = dimensions
+        self.model = HASHING_MODEL
+
+    def _embed(self, texts: List[str]) -> np.ndarray:
+        vectors = np.zeros((len(texts), self.dimensions), dtype=np.float32)
+        for row, text in enumerate(texts):
+            words = WORD_PATTERN.findall(text.lower())
+            features = words + [f"{first} {second}" for first, second in zip(words, words[1:])]
+            if not features:
+                continue
+            hashes = np.array(
+                [int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(), "little") for feature in features],
+                dtype=np.uint64,
+            )
+            signs = np.where(hashes >> np.uint64(63), -1.0, 1.0).astype(np.float32) # Top bit; collisions cancel out on average
+            np.add.at(vectors[row], (hashes % np.uint64(self.dimensions)).astype(np.int64), signs)
+        return _l2_normalized(vectors)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self._embed(texts).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed([text])[0].tolist()
+
+class OnnxEmbeddings(Embeddings):
+    """Mean-pooled sentence embeddings from a local ONNX model, batched on the CPU."""
+
+    def __init__(
+        self,
+        model_path: str,
+        dimensions: Optional[int] = None,
+        threads: Optional[int] = None,
+        batch_size: int = 32,
+        max_tokens: int = 512,
+        query_prefix: str = "",
+        document_prefix: str = "",
+    ):
+        try:
+            import onnxruntime
+        except ImportError as e:
+            raise ImportError("EMBEDDING_PROVIDER=onnx requires the 'onnxruntime' package (pip install onnxruntime).") from e
+        from tokenizers import Tokenizer
+
+        model_file = next((os.path.join(model_path, name) for name in MODEL_FILES if os.path.isfile(os.path.join(model_path, name))), None)
+        tokenizer_file = os.path.join(model_path, "tokenizer.json")
+        if model_file is None or not os.path.isfile(tokenizer_file):
+            raise ValueError(f"LOCAL_EMBEDDING_MODEL_PATH '{model_path}' must contain model.onnx (or onnx/model.onnx) and tokenizer.json.")
+
+        self.model = ONNX_PREFIX + os.path.basename(os.path.normpath(model_path))
+        self.dimensions = dimensions # Leading dimensions kept (Matryoshka models), re-normalized
+        self.batch_size = max(1, batch_size)
+        self.query_prefix = query_prefix
+        self.document_prefix = document_prefix
+
+        self.tokenizer = Tokenizer.from_file(tokenizer_file)
+        self.tokenizer.enable_truncation(max_length=max_tokens)
+        padding = self.tokenizer.padding or {}
+        self.tokenizer.enable_padding(pad_id=padding.get("pad_id", 0), pad_token=padding.get("pad_token", "[PAD]"))
+
+        options = onnxruntime.SessionOptions()
+        options.intra_op_num_threads = threads or 0 # 0 = one per core
+        options.inter_op_num_threads = 1
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = onnxruntime.InferenceSession(model_file, options, providers=["CPUExecutionProvider"])
+        self.input_names = {model_input.name for model_input in self.session.get_inputs()}
+        output_names = [output.name for output in self.session.get_outputs()]
+        # Exports with a pooling head return the sentence vector directly; otherwise mean-pool token states
+        self.pooled_output = "sentence_embedding" if "sentence_embedding" in output_names else None
+        logger.info(f"Loaded ONNX embedding model {model_file} ({threads or 'all'} threads, batches of {self.batch_size})")
+
+    def _run(self, texts: List[str]) -> np.ndarray:
+        """One forward pass over a batch of texts."""
+        encodings = self.tokenizer.encode_batch(texts)
+        input_ids = np.array([encoding.ids for encoding in encodings], dtype=np.int64)
+        attention_mask = np.array([encoding.attention_mask for encoding in encodings], dtype=np.int64)
+        feeds = {"input_ids": input_ids, "attention_mask": attention_mask}
+        if "token_type_ids" in self.input_names:
+            feeds["token_type_ids"] = np.zeros_like(input_ids)
+        if self.pooled_output:
+            return self.session.run([self.pooled_output], feeds)[0].astype(np.float32)
+        token_states = self.session.run(None, feeds)[0]
+        mask = attention_mask[:, :, None].astype(np.float32)
+        return (token_states * mask).sum(axis=1) / np.maximum(mask.sum(axis=1), 1e-9)
+
+    def _embed(self, texts: List[str]) -> np.ndarray:
+        vectors: Optional[np.ndarray] = None
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i])) # Similar lengths share a pass, so padding stays small
+        for start in range(0, len(order), self.batch_size):
+            positions = order[start:start + self.batch_size]
+            batch_vectors = self._run([texts[i] for i in positions])
+            if vectors is None:
+                vectors = np.empty((len(texts), batch_vectors.shape[1]), dtype=np.float32)
+            vectors[positions] = batch_vectors
+        if vectors is None:
+            return np.empty((0, self.dimensions or 0), dtype=np.float32)
+        if self.dimensions:
+            vectors = vectors[:, :self.dimensions]
+        return _l2_normalized(vectors)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self._embed([self.document_prefix + text for text in texts]).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_queries([text])[0]
+
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        """Embeds several queries in one pass (used by the query batcher, so they keep the query prefix)."""
+        return self._embed([self.query_prefix + text for text in texts]).tolist()
@@ -0,0 +1,118 @@
+"""Near-duplicate chunk detection with SimHash.
+
+Vendor manuals and procedures repeat the same boilerplate (safety notices,
+headers, legal text) with small differences: page numbers, dates, product
+names. Exact chunk-hash reuse misses those, so every copy would be embedded.
+Each chunk instead gets a 64-bit SimHash over its word 3-shingles: texts that
+share most shingles get signatures a few bits apart. A chunk whose signature
+is within NEAR_DUP_MAX_HAMMING bits of an already embedded chunk reuses that
+chunk's vector (see `vector_store._vectors_for_group`); its own text and
+offsets are still stored, so it is retrievable as before.
+
+Signatures live in a local SQLite file shared by the workers on a host, keyed
+by chunk hash (so they apply to every embedding space). Lookups split the
+signature into four 16-bit bands: two signatures at most 3 bits apart agree
+exactly on at least one band, so each band is an indexed equality lookup.
+Only chunks that were embedded (or reused exactly) are indexed, so matches
+never chain from one near-duplicate to the next. Entries whose chunk has no
+stored vector (rolled back, deleted, other space) match nothing, and index
+failures never fail ingestion; the chunk is simply embedded.
+"""
+
+import hashlib
+import logging
+import os
+import re
+import sqlite3
+import threading
+from functools import lru_cache
+from typing import Iterable, Optional, Tuple
+
+import numpy as np
+
+from app.config import get_settings
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+WORD_PATTERN = re.compile(r"\w+")
+SHINGLE_WORDS = 3
+BANDS = 4 # 16-bit bands; finds every match up to BANDS - 1 differing bits
+BAND_BITS = 64 // BANDS
+MAX_CANDIDATES = 256 # Per lookup; common boilerplate bands can match many signatures
+
+def simhash(text: str, min_words: int = 0) -> Optional[int]:
+    """Returns the 64-bit SimHash of a text's word shingles, or None if it has fewer than `min_words` words."""
+    words = WORD_PATTERN.findall(text.lower())
+    if len(words) < max(min_words, 1):
+        return None
+    shingles = [" ".join(words[i:i + SHINGLE_WORDS]) for i in range(max(1, len(words) - SHINGLE_WORDS + 1))]
+    hashes = np.array(
+        [int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest(), "little") for shingle in shingles],
+        dtype=np.uint64,
+    )
+    bits = (hashes[:, None] >> np.arange(64, dtype=np.uint64)) & np.uint64(1)
+    votes = bits.sum(axis=0, dtype=np.int64) * 2 - len(hashes)
+    return sum(1 << int(bit) for bit in np.flatnonzero(votes > 0))
+
+def hamming_distance(first: int, second: int) -> int:
+    return (first ^ second).bit_count()
+
+def _to_signed(value: int) -> int:
+    """SQLite integers are signed 64-bit."""
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+def _bands(signature: int) -> Tuple[int, ...]:
+    return tuple((signature >> (band * BAND_BITS)) & ((1 << BAND_BITS) - 1) for band in range(BANDS))
+
+class SignatureIndex:
+    """Chunk hash -> SimHash store with banded lookups, in a shared SQLite file."""
+
+    def __init__(self, path: str, max_distance: int):
+        self.path = path
+        self.max_distance = min(max_distance, BANDS - 1)
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            band_columns = ", ".join(f"band{band} INTEGER NOT NULL" for band in range(BANDS))
+            conn.execute(f"CREATE TABLE IF NOT EXISTS signatures (chunk_hash TEXT PRIMARY KEY, simhash INTEGER NOT NULL, {band_columns})")
+            for band in range(BANDS):
+                conn.execute(f"CREATE INDEX IF NOT EXISTS ix_signatures_band{band} ON signatures (band{band})")
+
+    def _connect(self) -> sqlite3.Connection:
+        """Returns this thread's connection (SQLite connections are not shareable)."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def find(self, signature: int) -> Optional[str]:
+        """Returns the hash of the indexed chunk closest to `signature` within `max_distance` bits, if any."""
+        where = " OR ".join(f"band{band} = ?" for band in range(BANDS))
+        rows = self._connect().execute(
+            f"SELECT chunk_hash, simhash FROM signatures WHERE {where} LIMIT {MAX_CANDIDATES}", _bands(signature)
+        ).fetchall()
+        best, best_distance = None, self.max_distance + 1
+        for chunk_hash, stored in rows:
+            distance = hamming_distance(signature, stored & ((1 << 64) - 1))
+            if distance < best_distance:
+                best, best_distance = chunk_hash, distance
+        return best
+
+    def add_many(self, items: Iterable[Tuple[str, int]]) -> None:
+        """Indexes (chunk hash, signature) pairs; known hashes are left as they are."""
+        rows = [(chunk_hash, _to_signed(signature), *_bands(signature)) for chunk_hash, signature in items]
+        if not rows:
+            return
+        with self._connect() as conn:
+            conn.executemany(f"INSERT OR IGNORE INTO signatures VALUES ({', '.join('?' * (2 + BANDS))})", rows)
+
+@lru_cache()
+def get_signature_index() -> Optional[SignatureIndex]:
+    """Returns the shared signature index, or None if near-duplicate detection is disabled."""
+    if not settings.NEAR_DUP_ENABLED:
+        return None
+    return SignatureIndex(settings.NEAR_DUP_INDEX_PATH, settings.NEAR_DUP_MAX_HAMMING)
@@ -0,0 +1,81 @@
+"""Parallel, page-level PDF text extraction.
+
+pypdf text extraction is CPU-bound and single-threaded, so large PDFs are
+split into page ranges that worker processes extract independently (each
+worker opens the file itself; only page texts cross the process boundary).
+`iter_pdf_pages` yields page texts strictly in page order as ranges complete,
+so downstream chunking can start before the whole document is parsed.
+
+How many ranges are in flight is bounded both by the configured worker count
+and by a memory ceiling on extracted-but-not-yet-consumed text, estimated from
+the page sizes seen so far.
+"""
+
+import logging
+import os
+from collections import deque
+from concurrent.futures import Executor
+from typing import Deque, Iterator, List, Optional
+
+from pypdf import PdfReader
+
+from app.config import get_settings
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# Initial guess of in-memory size per extracted page, refined as pages arrive
+INITIAL_PAGE_BYTES_ESTIMATE = 8 * 1024
+
+def count_pdf_pages(file_path: str) -> int:
+    """Returns the number of pages in a PDF."""
+    return len(PdfReader(file_path).pages)
+
+def extract_pdf_page_range(file_path: str, start: int, end: Optional[int] = None) -> List[str]:
+    """Extracts the text of pages [start, end) of a PDF (all remaining pages if end is None).
+
+    Module-level (picklable) so it can run in a worker process.
+    """
+    reader = PdfReader(file_path)
+    pages = reader.pages
+    end = len(pages) if end is None else min(end, len(pages))
+    return [pages[i].extract_text() or "" for i in range(start, end)] # Handle cases where extraction might return None
+
+def iter_pdf_pages(
+    file_path: str,
+    executor: Executor,
+    pages_per_task: Optional[int] = None,
+    max_workers: Optional[int] = None,
+    max_buffered_bytes: Optional[int] = None,
+    first_page: int = 0,
+) -> Iterator[str]:
+    """Extracts PDF pages in parallel page ranges and yields their text in page order, from `first_page` on."""
+    pages_per_task = max(1, pages_per_task or settings.PDF_PAGES_PER_TASK)
+    max_workers = max(1, max_workers or settings.PDF_EXTRACT_WORKERS or settings.INGESTION_EXTRACTION_WORKERS or os.cpu_count() or 1)
+    max_buffered_bytes = max_buffered_bytes or settings.PDF_EXTRACT_MAX_BUFFERED_MB * 1024 * 1024
+
+    page_count = count_pdf_pages(file_path)
+    logger.info(f"Extracting {page_count - first_page} PDF pages from {file_path} in ranges of {pages_per_task} (up to {max_workers} in flight)")
+
+    in_flight: Deque = deque()
+    next_start = first_page
+    pages_seen = 0
+    bytes_seen = 0 # Approximated by character count
+    try:
+        while next_start < page_count or in_flight:
+            # Bound in-flight ranges by workers and by the estimated memory they will hold
+            page_bytes = bytes_seen / pages_seen if pages_seen else INITIAL_PAGE_BYTES_ESTIMATE
+            memory_bound = int(max_buffered_bytes // max(1.0, page_bytes * pages_per_task))
+            max_in_flight = max(1, min(max_workers, memory_bound))
+            while next_start < page_count and len(in_flight) < max_in_flight:
+                end = min(next_start + pages_per_task, page_count)
+                in_flight.append(executor.submit(extract_pdf_page_range, file_path, next_start, end))
+                next_start = end
+
+            pages = in_flight.popleft().result()
+            pages_seen += len(pages)
+            bytes_seen += sum(len(page) for page in pages)
+            yield from pages
+    finally:
+        for future in in_flight:
+            future.cancel()
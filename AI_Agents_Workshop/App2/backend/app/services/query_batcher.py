@@ -0,0 +1,145 @@
+"""Micro-batching of query embeddings across concurrent requests.
+
+Under load many chat turns embed their query at the same moment, each as its
+own embeddings API request. `BatchedQueryEmbeddings` wraps the embedding
+client: the first query to arrive opens a batch and waits up to
+QUERY_EMBED_BATCH_WINDOW_MS for others (or until QUERY_EMBED_MAX_BATCH have
+joined), then sends them all in one `embed_documents` call and hands every
+caller its own vector. The first caller does the call itself, so there is no
+background thread; a failed call fails every query of the batch.
+
+It sits behind the embedding cache, so cached queries never wait for a
+window, and document embedding (ingestion) passes straight through. Batch
+size, wait and call latency are recorded in `metrics` (GET
+/metrics/query-embedding) to tune the window against request count.
+"""
+
+import logging
+import threading
+import time
+from concurrent.futures import Future
+from typing import Dict, List, Optional
+
+from langchain_core.embeddings import Embeddings
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128) # Upper bounds of the batch-size histogram
+
+class QueryBatchingMetrics:
+    """Counters for query batching, shared by all embedding spaces of the process."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.queries = 0
+            self.batches = 0
+            self.full_batches = 0 # Closed by size rather than by the window
+            self.failed_batches = 0
+            self.max_batch_size = 0
+            self.wait_ms_total = 0.0 # Enqueue to result, summed over queries
+            self.call_ms_total = 0.0 # Embeddings API time, summed over batches
+            self.batch_sizes = [0] * (len(BATCH_SIZE_BUCKETS) + 1)
+
+    def record_batch(self, size: int, full: bool, call_ms: float, failed: bool) -> None:
+        with self._lock:
+            self.batches += 1
+            self.queries += size
+            self.full_batches += int(full)
+            self.failed_batches += int(failed)
+            self.max_batch_size = max(self.max_batch_size, size)
+            self.call_ms_total += call_ms
+            bucket = next((i for i, bound in enumerate(BATCH_SIZE_BUCKETS) if size <= bound), len(BATCH_SIZE_BUCKETS))
+            self.batch_sizes[bucket] += 1
+
+    def record_wait(self, wait_ms: float) -> None:
+        with self._lock:
+            self.wait_ms_total += wait_ms
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            labels = [f"<={bound}" for bound in BATCH_SIZE_BUCKETS] + [f">{BATCH_SIZE_BUCKETS[-1]}"]
+            return {
+                "queries": self.queries,
+                "batches": self.batches,
+                "full_batches": self.full_batches,
+                "failed_batches": self.failed_batches,
+                "api_calls_saved": self.queries - self.batches,
+                "mean_batch_size": self.queries / self.batches if self.batches else 0.0,
+                "max_batch_size": self.max_batch_size,
+                "mean_wait_ms": self.wait_ms_total / self.queries if self.queries else 0.0,
+                "mean_call_ms": self.call_ms_total / self.batches if self.batches else 0.0,
+                "batch_size_histogram": dict(zip(labels, self.batch_sizes)),
+            }
+
+metrics = QueryBatchingMetrics()
+
+class _Batch:
+    def __init__(self):
+        self.texts: List[str] = []
+        self.futures: List[Future] = []
+        self.closed = threading.Event() # Set once the batch is full
+
+class BatchedQueryEmbeddings(Embeddings):
+    """Embedding client wrapper that coalesces concurrent `embed_query` calls into batched requests."""
+
+    def __init__(self, client: Embeddings, window_ms: float, max_batch_size: int):
+        self.client = client
+        self.window_seconds = window_ms / 1000
+        self.max_batch_size = max(1, max_batch_size)
+        self._lock = threading.Lock()
+        self._open: Optional[_Batch] = None
+
+    @property
+    def model(self) -> str:
+        return self.client.model
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.client.embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        started = time.perf_counter()
+        future: Future = Future()
+        with self._lock:
+            batch = self._open
+            leader = batch is None
+            if leader:
+                batch = self._open = _Batch()
+            batch.texts.append(text)
+            batch.futures.append(future)
+            if len(batch.texts) >= self.max_batch_size:
+                self._open = None
+                batch.closed.set()
+        if leader:
+            full = batch.closed.wait(self.window_seconds)
+            with self._lock:
+                if self._open is batch:
+                    self._open = None
+            self._send(batch, full)
+        try:
+            return future.result()
+        finally:
+            metrics.record_wait((time.perf_counter() - started) * 1000)
+
+    def _send(self, batch: _Batch, full: bool) -> None:
+        """Embeds a closed batch in one request and resolves its callers' futures."""
+        call_started = time.perf_counter()
+        try:
+            # Clients that embed queries differently from documents (task prefixes) say so with `embed_queries`
+            embed_many = getattr(self.client, "embed_queries", self.client.embed_documents)
+            vectors = embed_many(batch.texts)
+            if len(vectors) != len(batch.futures): # Every caller must get a result, or it would wait forever
+                raise ValueError(f"Embedding client returned {len(vectors)} vectors for {len(batch.futures)} queries.")
+        except Exception as e:
+            metrics.record_batch(len(batch.texts), full, (time.perf_counter() - call_started) * 1000, failed=True)
+            for future in batch.futures:
+                future.set_exception(e)
+            return
+        metrics.record_batch(len(batch.texts), full, (time.perf_counter() - call_started) * 1000, failed=False)
+        if len(batch.texts) > 1:
+            logger.debug(f"Embedded {len(batch.texts)} queries in one request")
+        for future, vector in zip(batch.futures, vectors):
+            future.set_result(vector)
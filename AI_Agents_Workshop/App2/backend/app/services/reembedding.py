@@ -0,0 +1,207 @@
+"""Background re-embedding of the knowledge base into a new embedding space.
+
+Setting EMBEDDING_DIMENSIONS (e.g. 512 for text-embedding-3-small, a third of
+the storage and index memory of 1536) or another OPENAI_EMBEDDING_MODEL
+defines a new embedding space. `start_reembedding` (called at startup when
+REEMBED_AUTO_START is on, or via POST /embeddings/reembed) marks it "building"
+and runs a job on a background thread that walks the vectorized files in
+keyset (ID) order and embeds each file's stored chunks (chunk text and offsets
+of the source space, so nothing is re-extracted) into the new space in bulk,
+one transaction per file, at most REEMBED_MAX_CHUNKS_PER_SECOND. Before the
+backfill, the job builds the space's ANN index (pgvector), which is quick
+while the space is still nearly empty.
+
+Retrieval keeps using the old space, and new uploads are embedded into both,
+until REEMBED_SWITCH_COVERAGE of the files are covered; then the new space is
+activated in one transaction (retrieval switches on its next query). The job
+finishes the remaining files, catches up on files ingested meanwhile, and
+only then deletes the old space's rows and ANN index.
+
+The last finished file is checkpointed on the space row, so after a crash or
+restart the job resumes after it (at startup, or when started again). A
+Postgres advisory lock keeps a single job running across worker processes.
+"""
+
+import datetime
+import logging
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Optional
+
+from sqlalchemy import func, select, text
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.config import get_settings
+from app.crud import crud_embedding_space
+from app.llm_clients import get_configured_embedding_space
+from app.models import EmbeddingSpace, File
+from app.services.vector_backends import get_vector_backend
+from app.services.vector_store import add_vector_embeddings_bulk, get_active_space_name, prepare_space_index
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+FILE_PAGE_SIZE = 100 # File IDs fetched per keyset page
+ADVISORY_LOCK_KEY = 0x5245454D42 # pg_advisory_lock key held by the running job ("REEMB")
+
+_executor: Optional[ThreadPoolExecutor] = None
+_future: Optional[Future] = None
+_lock = threading.Lock()
+_stop = threading.Event()
+
+class ReembeddingStopped(Exception):
+    """Raised inside the job when the application shuts down."""
+
+class _Throttle:
+    """Sleeps as needed to keep the job under a chunks-per-second budget; also a stop checkpoint."""
+
+    def __init__(self, chunks_per_second: Optional[float]):
+        self.chunks_per_second = chunks_per_second
+        self.started = time.monotonic()
+        self.chunks = 0
+
+    def __call__(self, count: int) -> None:
+        self.chunks += count
+        delay = self.chunks / self.chunks_per_second - (time.monotonic() - self.started) if self.chunks_per_second else 0
+        if _stop.wait(max(delay, 0)):
+            raise ReembeddingStopped()
+
+def start_reembedding(db: Session, space_name: Optional[str] = None) -> EmbeddingSpace:
+    """Starts (or resumes) building an embedding space, by default the configured one.
+
+    Raises ValueError if the space is already active or another space is being built.
+    """
+    space_name = space_name or get_configured_embedding_space()
+    active_name = get_active_space_name(db)
+    if space_name == active_name:
+        raise ValueError(f"Embedding space '{space_name}' is already active.")
+    for other in crud_embedding_space.get_unfinished_spaces(db):
+        if other.name != space_name:
+            raise ValueError(f"Re-embedding into '{other.name}' has not finished yet.")
+    files_total = db.execute(select(func.count(File.id)).where(File.is_vectorized.is_(True))).scalar()
+    space = crud_embedding_space.start_building_space(db, space_name, active_name, files_total)
+    _submit(space.id)
+    logger.info(f"[Reembedding] Building embedding space {space_name} from {active_name} ({space.files_done}/{files_total} files done)")
+    return space
+
+def resume_on_startup() -> None:
+    """Resumes an interrupted re-embedding, or starts one if the configured space isn't active."""
+    from app.db.session import SessionLocal
+
+    db = SessionLocal()
+    try:
+        unfinished = crud_embedding_space.get_unfinished_spaces(db)
+        if unfinished:
+            logger.info(f"[Reembedding] Resuming re-embedding into {unfinished[0].name}")
+            _submit(unfinished[0].id)
+        elif settings.REEMBED_AUTO_START and get_configured_embedding_space() != get_active_space_name(db):
+            start_reembedding(db)
+    except Exception as e:
+        logger.error(f"[Reembedding] Could not check for pending re-embedding at startup: {e}", exc_info=True)
+    finally:
+        db.close()
+
+def _submit(space_id: int) -> None:
+    global _executor, _future
+    with _lock:
+        if _future is not None and not _future.done():
+            return # The running job picks up the space (there is only ever one unfinished)
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="reembed")
+        _stop.clear()
+        _future = _executor.submit(_run_reembedding, space_id)
+
+def _reembed_files(
+    db: Session,
+    space: EmbeddingSpace,
+    throttle: _Throttle,
+    after_file_id: int = 0,
+    since: Optional[datetime.datetime] = None,
+) -> None:
+    """Embeds the chunks of vectorized files after `after_file_id` (or changed since `since`) missing from the space.
+
+    The main pass checkpoints every file and switches retrieval to the space
+    once REEMBED_SWITCH_COVERAGE is reached.
+    """
+    backend = get_vector_backend()
+    last_file_id = after_file_id
+    while True:
+        stmt = select(File.id).where(File.is_vectorized.is_(True), File.id > last_file_id)
+        if since is not None:
+            stmt = stmt.where(File.updated_at >= since)
+        file_ids = db.execute(stmt.order_by(File.id).limit(FILE_PAGE_SIZE)).scalars().all()
+        if not file_ids:
+            return
+        for file_id in file_ids:
+            throttle(0) # Stop checkpoint
+            last_file_id = file_id
+            if not backend.file_chunks(db, file_id, space.name): # Else covered by an earlier run or a new upload
+                chunks = backend.file_chunks(db, file_id, space.source_name)
+                if chunks:
+                    try:
+                        add_vector_embeddings_bulk(db, file_id, chunks, on_progress=throttle, spaces=[space.name])
+                    except IntegrityError:
+                        logger.info(f"[Reembedding] File ID {file_id} was deleted while re-embedding; skipped.")
+            if since is not None:
+                continue
+            space.files_done += 1
+            space.last_file_id = file_id
+            db.commit() # Checkpoint
+            coverage = space.files_done / space.files_total if space.files_total else 1.0
+            if space.status == crud_embedding_space.BUILDING and coverage >= settings.REEMBED_SWITCH_COVERAGE:
+                _activate(db, space)
+
+def _activate(db: Session, space: EmbeddingSpace) -> None:
+    crud_embedding_space.activate_space(db, space.id)
+    db.refresh(space)
+    logger.info(f"[Reembedding] Retrieval switched to embedding space {space.name} ({space.files_done}/{space.files_total} files)")
+
+def _run_reembedding(space_id: int) -> None:
+    """Job body: backfill from the checkpoint, switch, catch up, then drop the source space."""
+    from app.db.session import SessionLocal, engine
+
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as lock_conn:
+        if not lock_conn.execute(text("SELECT pg_try_advisory_lock(:key)"), {"key": ADVISORY_LOCK_KEY}).scalar():
+            logger.info("[Reembedding] Another worker is running the re-embedding job.")
+            return
+        db = SessionLocal()
+        space = db.get(EmbeddingSpace, space_id)
+        space_name = space.name
+        try:
+            db.commit() # A concurrent index build waits for open transactions
+            prepare_space_index(db, space_name) # Cheap while the space has few rows
+            throttle = _Throttle(settings.REEMBED_MAX_CHUNKS_PER_SECOND)
+            _reembed_files(db, space, throttle, after_file_id=space.last_file_id or 0)
+            # Files whose ingestion began before the space took writes only reached the source space
+            _reembed_files(db, space, throttle, since=space.started_at)
+            if space.status == crud_embedding_space.BUILDING:
+                _activate(db, space)
+            source = crud_embedding_space.get_space(db, space.source_name)
+            if source is not None and source.status == crud_embedding_space.RETIRED:
+                deleted = get_vector_backend().delete_space(db, source.name)
+                logger.info(f"[Reembedding] Deleted {deleted} embeddings of retired space {source.name}")
+            crud_embedding_space.update_space_progress(
+                db, space.id, completed_at=datetime.datetime.now(datetime.timezone.utc), error=None
+            )
+            logger.info(f"[Reembedding] Re-embedding into {space_name} completed")
+        except ReembeddingStopped:
+            db.rollback()
+            logger.info(f"[Reembedding] Stopped building {space_name}; it resumes from its checkpoint on next start.")
+        except Exception as e:
+            db.rollback()
+            logger.error(f"[Reembedding] Building embedding space {space_name} failed: {e}", exc_info=True)
+            crud_embedding_space.update_space_progress(db, space_id, error=str(e))
+        finally:
+            db.close()
+            lock_conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": ADVISORY_LOCK_KEY})
+
+def shutdown() -> None:
+    """Stops the job at its next checkpoint (application shutdown)."""
+    global _executor
+    _stop.set()
+    with _lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
@@ -0,0 +1,291 @@
+"""Resumable uploads: create a session, PUT byte ranges, complete.
+
+For files too large to send in one request (historian exports of several
+GB), a client creates a session with the file name and size, then PUTs the
+content in byte ranges (`Content-Range: bytes start-end/size`), in any order
+and in parallel if it likes. The session row records which ranges have
+arrived, including the part of a range received before a connection dropped,
+so a retry only resends `missing_ranges`. Completing the session turns it
+into a regular file row and queues ingestion.
+
+Bytes are written straight into a partial file of the final size under
+`<KNOWLEDGE_BASE_PATH>/.uploads` (hidden from directory sync) and only
+renamed into place on completion, so the content is never copied. SHA-256 is
+computed incrementally while the contiguous prefix arrives; on completion
+only what was not hashed on the way (ranges received out of order or by
+another worker process) is read back from disk.
+
+Unfinished sessions expire after UPLOAD_SESSION_TTL_HOURS without activity.
+"""
+
+import datetime
+import hashlib
+import logging
+import os
+import threading
+import uuid
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from app import crud, schemas
+from app.config import get_settings
+from app.models import File, UploadSession
+from app.services import ingestion_jobs, kb_sync
+from app.services.file_processor import COPY_BUFFER_SIZE
+from app.services.ingestion_jobs import IngestionJob
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+PARTS_DIRECTORY = ".uploads"
+OPEN, COMPLETED, FAILED = "open", "completed", "failed"
+
+class UploadConflict(ValueError):
+    """The destination path is already taken."""
+
+class _PrefixHasher:
+    """SHA-256 of the contiguous prefix [0, offset) received by this process."""
+
+    def __init__(self):
+        self.sha256 = hashlib.sha256()
+        self.offset = 0
+        self.valid = True
+        self.lock = threading.Lock()
+
+    def update(self, position: int, data: bytes) -> None:
+        with self.lock:
+            if position == self.offset:
+                self.sha256.update(data)
+                self.offset += len(data)
+            elif position < self.offset: # Hashed bytes rewritten (a retry): start over on completion
+                self.valid = False
+
+_hashers: Dict[str, _PrefixHasher] = {}
+_hashers_lock = threading.Lock()
+
+def part_path(session_id: str) -> str:
+    return os.path.join(settings.KNOWLEDGE_BASE_PATH, PARTS_DIRECTORY, f"{session_id}.part")
+
+def merge_range(ranges: List[List[int]], start: int, end: int) -> List[List[int]]:
+    """Adds [start, end) to sorted, non-overlapping ranges, merging overlaps and neighbours."""
+    merged: List[List[int]] = []
+    for range_start, range_end in sorted(ranges + [[start, end]]):
+        if merged and range_start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], range_end)
+        else:
+            merged.append([range_start, range_end])
+    return merged
+
+def missing_ranges(ranges: List[List[int]], size: int) -> List[List[int]]:
+    """The [start, end) gaps of `ranges` within [0, size)."""
+    missing, position = [], 0
+    for range_start, range_end in ranges:
+        if range_start > position:
+            missing.append([position, range_start])
+        position = max(position, range_end)
+    if position < size:
+        missing.append([position, size])
+    return missing
+
+def parse_content_range(header: str, size: int) -> Tuple[int, int]:
+    """Parses `bytes start-end/total` (inclusive end) into a [start, end) range within the file."""
+    try:
+        unit, _, spec = header.strip().partition(" ")
+        byte_range, _, total = spec.partition("/")
+        first, _, last = byte_range.partition("-")
+        start, end = int(first), int(last) + 1
+    except ValueError:
+        raise ValueError(f"Malformed Content-Range '{header}' (expected 'bytes start-end/size').")
+    if unit != "bytes" or total not in ("*", str(size)) or not 0 <= start < end <= size:
+        raise ValueError(f"Content-Range '{header}' is outside the {size}-byte file.")
+    return start, end
+
+def to_read(upload_session: UploadSession) -> schemas.UploadSessionRead:
+    read = schemas.UploadSessionRead.model_validate(upload_session)
+    read.missing_ranges = missing_ranges(upload_session.received_ranges, upload_session.size)
+    return read
+
+def _remove_expired(db: Session) -> None:
+    now = datetime.datetime.now(datetime.timezone.utc)
+    expired = db.execute(
+        select(UploadSession).where(UploadSession.status == OPEN, UploadSession.expires_at < now)
+    ).scalars().all()
+    for upload_session in expired:
+        abort_session(db, upload_session)
+        logger.info(f"Removed expired upload session {upload_session.id} ({upload_session.relative_path})")
+
+def create_session(db: Session, session_in: schemas.UploadSessionCreate) -> UploadSession:
+    """Reserves the destination path and allocates the partial file."""
+    _remove_expired(db)
+    filename = os.path.basename(session_in.filename)
+    relative_path = filename # Same flat layout as single uploads
+    if not kb_sync.is_synced_path(relative_path):
+        raise ValueError(f"Unsupported file type: '{filename}'.")
+    if session_in.size > settings.UPLOAD_SESSION_MAX_BYTES:
+        raise ValueError(f"File exceeds the upload limit of {settings.UPLOAD_SESSION_MAX_BYTES} bytes.")
+    open_session = db.execute(
+        select(UploadSession.id).where(UploadSession.relative_path == relative_path, UploadSession.status == OPEN)
+    ).first()
+    if (
+        open_session is not None
+        or crud.get_file_by_relative_path(db, relative_path=relative_path)
+        or os.path.exists(os.path.join(settings.KNOWLEDGE_BASE_PATH, relative_path))
+    ):
+        raise UploadConflict(f"File with path '{relative_path}' already exists or is being uploaded.")
+
+    upload_session = UploadSession(
+        id=uuid.uuid4().hex,
+        filename=filename,
+        relative_path=relative_path,
+        media_type=session_in.media_type,
+        tags=session_in.tags,
+        size=session_in.size,
+        expected_sha256=session_in.sha256.lower() if session_in.sha256 else None,
+        received_ranges=[],
+        bytes_received=0,
+        status=OPEN,
+        expires_at=datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(hours=settings.UPLOAD_SESSION_TTL_HOURS),
+    )
+    os.makedirs(os.path.dirname(part_path(upload_session.id)), exist_ok=True)
+    with open(part_path(upload_session.id), "wb") as f:
+        f.truncate(session_in.size) # Sparse: disk blocks are allocated as ranges arrive
+    db.add(upload_session)
+    db.commit()
+    db.refresh(upload_session)
+    logger.info(f"Created upload session {upload_session.id} for '{relative_path}' ({session_in.size} bytes)")
+    return upload_session
+
+def get_session(db: Session, session_id: str) -> Optional[UploadSession]:
+    return db.get(UploadSession, session_id)
+
+def _open_for_range(session_id: str, start: int, end: int):
+    """Checks that the session accepts the range; returns the partial file opened for writing."""
+    from app.db.session import SessionLocal
+
+    db = SessionLocal()
+    try:
+        upload_session = get_session(db, session_id)
+        if upload_session is None:
+            raise LookupError("Upload session not found.")
+        if upload_session.status != OPEN:
+            raise ValueError(f"Upload session is {upload_session.status}.")
+    finally:
+        db.close()
+    f = open(part_path(session_id), "r+b")
+    f.seek(start)
+    return f
+
+def _write_chunk(f, hasher: _PrefixHasher, position: int, chunk: bytes) -> None:
+    f.write(chunk)
+    hasher.update(position, chunk)
+
+def _record_range(f, session_id: str, start: int, end: int) -> None:
+    """Makes the written bytes durable, then records them on the session row."""
+    from app.db.session import SessionLocal
+
+    f.flush()
+    os.fsync(f.fileno())
+    db = SessionLocal()
+    try:
+        upload_session = db.get(UploadSession, session_id, with_for_update=True) # Serializes concurrent PUTs
+        upload_session.received_ranges = merge_range(upload_session.received_ranges, start, end)
+        upload_session.bytes_received = sum(range_end - range_start for range_start, range_end in upload_session.received_ranges)
+        upload_session.expires_at = datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(hours=settings.UPLOAD_SESSION_TTL_HOURS)
+        db.commit()
+    finally:
+        db.close()
+
+async def receive_range(session_id: str, start: int, end: int, body: AsyncIterator[bytes]) -> None:
+    """Streams a request body into [start, end) of the partial file.
+
+    Whatever arrives is recorded even if the client disconnects mid-range.
+    Raises ValueError if the body does not match the range length.
+    """
+    f = await run_in_threadpool(_open_for_range, session_id, start, end)
+    with _hashers_lock:
+        hasher = _hashers.setdefault(session_id, _PrefixHasher())
+    written = 0
+    try:
+        async for chunk in body:
+            if written + len(chunk) > end - start:
+                raise ValueError("Request body is longer than its Content-Range.")
+            await run_in_threadpool(_write_chunk, f, hasher, start + written, chunk)
+            written += len(chunk)
+    finally:
+        try:
+            if written:
+                await run_in_threadpool(_record_range, f, session_id, start, start + written)
+        finally:
+            f.close()
+    if written != end - start:
+        raise ValueError(f"Request body ended after {written} of {end - start} bytes; resend the missing range.")
+
+def _content_hash(upload_session: UploadSession) -> str:
+    """Finishes the incremental hash, reading back only the bytes it has not seen."""
+    with _hashers_lock:
+        hasher = _hashers.pop(upload_session.id, None)
+    if hasher is None or not hasher.valid:
+        hasher = _PrefixHasher()
+    with open(part_path(upload_session.id), "rb") as f:
+        f.seek(hasher.offset)
+        for block in iter(lambda: f.read(COPY_BUFFER_SIZE), b""):
+            hasher.sha256.update(block)
+    return hasher.sha256.hexdigest()
+
+def complete_session(db: Session, upload_session: UploadSession) -> Tuple[File, Optional[IngestionJob]]:
+    """Moves the finished file into the knowledge base, registers it and queues ingestion.
+
+    Completing an already completed session returns its file again (no new job).
+    """
+    if upload_session.status == COMPLETED:
+        return crud.get_file(db, file_id=upload_session.file_id), None
+    if upload_session.status != OPEN:
+        raise ValueError(f"Upload session is {upload_session.status}.")
+    missing = missing_ranges(upload_session.received_ranges, upload_session.size)
+    if missing:
+        raise ValueError(f"{sum(end - start for start, end in missing)} bytes in {len(missing)} ranges are still missing.")
+
+    content_hash = _content_hash(upload_session)
+    if upload_session.expected_sha256 and content_hash != upload_session.expected_sha256:
+        upload_session.status, upload_session.error = FAILED, f"SHA-256 mismatch: got {content_hash}."
+        db.commit()
+        os.remove(part_path(upload_session.id))
+        raise ValueError(f"Uploaded content does not match the expected SHA-256 (got {content_hash}).")
+
+    final_path = os.path.join(settings.KNOWLEDGE_BASE_PATH, upload_session.relative_path)
+    with kb_sync.sync_lock(db, wait=True):
+        if crud.get_file_by_relative_path(db, relative_path=upload_session.relative_path) or os.path.exists(final_path):
+            raise UploadConflict(f"File with path '{upload_session.relative_path}' already exists.")
+        os.replace(part_path(upload_session.id), final_path) # Same filesystem: a rename, no copy
+        file_in = schemas.FileCreate(
+            filename=upload_session.filename,
+            media_type=upload_session.media_type,
+            file_size_bytes=upload_session.size,
+            content_hash=content_hash,
+            mtime_ns=os.stat(final_path).st_mtime_ns,
+            tags=upload_session.tags,
+        )
+        try:
+            db_file = crud.create_file(db, file_in=file_in, relative_path=upload_session.relative_path)
+        except Exception:
+            # Without a row the file must not stay in the knowledge base; the session can be completed again
+            db.rollback()
+            os.replace(final_path, part_path(upload_session.id))
+            raise
+    upload_session.status, upload_session.file_id = COMPLETED, db_file.id
+    db.commit()
+    job = ingestion_jobs.submit_ingestion_job(db_file.id)
+    logger.info(f"Completed upload session {upload_session.id}: file ID {db_file.id} ({upload_session.size} bytes)")
+    return db_file, job
+
+def abort_session(db: Session, upload_session: UploadSession) -> None:
+    """Deletes a session and its partial file."""
+    with _hashers_lock:
+        _hashers.pop(upload_session.id, None)
+    if os.path.exists(part_path(upload_session.id)):
+        os.remove(part_path(upload_session.id))
+    db.delete(upload_session)
+    db.commit()
@@ -0,0 +1,165 @@
+"""Hybrid knowledge-base retrieval: full-text + vector search with rank fusion.
+
+Vector similarity misses exact identifiers (PLC model numbers, CVE IDs,
+hostnames) that a lexical index matches directly, and the lexical index
+misses paraphrases. `search_knowledge_base` runs both against the stored
+chunks and merges them with reciprocal rank fusion (RRF): each chunk scores
+sum(1 / (RRF_K + rank)) over the result lists it appears in, so agreement
+between the sources outranks a high position in just one.
+
+The lexical side (pgvector backend only) is Postgres full-text search over
+the generated `chunk_tsv` column (GIN index). Query terms are OR-ed, since
+natural-language questions rarely have every word in one chunk, and hits are
+ranked with `ts_rank_cd`. The query embedding is computed on a worker thread while the
+full-text query runs, and every call reports per-source latency. Both sides
+search only the active embedding space, so retrieval keeps serving it while a
+re-embedding job builds its replacement, and both apply the same optional
+`RetrievalFilters` in SQL, so each side ranks only the chunks in scope.
+"""
+
+import logging
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import reduce
+from typing import Dict, List, Optional, Sequence
+
+from sqlalchemy import cast, func, literal, select
+from sqlalchemy.dialects.postgresql import REGCONFIG
+from sqlalchemy.orm import Session
+
+from app.config import get_settings
+from app.models import File, VectorEmbedding
+from app.models.vector_embedding import TEXT_SEARCH_CONFIG
+from app.schemas import RetrievalFilters, RetrievalResult, RetrievalTimings, RetrievedChunk
+from app.services.vector_backends import get_vector_backend
+from app.services.vector_backends.base import file_scope_conditions
+from app.services.vector_store import embed_query_text, get_active_space_name, search_by_vector
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# Terms keep inner punctuation so identifiers like S7-1500, CVE-2021-44228 or
+# plc01.site.local stay whole; the text search parser splits them further.
+QUERY_TERM_PATTERN = re.compile(r"\w[\w.\-:/]*\w|\w")
+MAX_QUERY_TERMS = 32
+
+def build_tsquery(query_text: str):
+    """Builds an OR of the query's terms as a tsquery expression, or None if it has none."""
+    terms = list(dict.fromkeys(QUERY_TERM_PATTERN.findall(query_text)))[:MAX_QUERY_TERMS]
+    if not terms:
+        return None
+    config = cast(literal(TEXT_SEARCH_CONFIG), REGCONFIG)
+    # Stop words become empty tsqueries, which `||` ignores
+    return reduce(lambda left, right: left.op("||")(right), [func.plainto_tsquery(config, term) for term in terms])
+
+def lexical_search(
+    db: Session,
+    query_text: str,
+    embedding_model_name: str,
+    limit: int = 5,
+    filters: Optional[RetrievalFilters] = None,
+) -> List[RetrievedChunk]:
+    """Full-text search over chunk text, best `ts_rank_cd` first."""
+    tsquery = build_tsquery(query_text)
+    if tsquery is None:
+        return []
+    rank = func.ts_rank_cd(VectorEmbedding.chunk_tsv, tsquery)
+    stmt = (
+        select(
+            VectorEmbedding.id,
+            VectorEmbedding.file_id,
+            File.filename,
+            VectorEmbedding.chunk_index,
+            VectorEmbedding.chunk_text,
+            VectorEmbedding.char_start,
+            VectorEmbedding.char_end,
+        )
+        .join(File, File.id == VectorEmbedding.file_id)
+        .where(VectorEmbedding.embedding_model == embedding_model_name) # Same space the vector side searches
+        .where(VectorEmbedding.chunk_tsv.op("@@")(tsquery), *file_scope_conditions(filters))
+        .order_by(rank.desc())
+        .limit(limit)
+    )
+    return [RetrievedChunk.model_validate(row) for row in db.execute(stmt).all()]
+
+def reciprocal_rank_fusion(
+    vector_hits: Sequence[RetrievedChunk],
+    lexical_hits: Sequence[RetrievedChunk],
+    limit: int,
+    k: Optional[int] = None,
+) -> List[RetrievedChunk]:
+    """Merges two ranked hit lists by reciprocal rank fusion."""
+    k = settings.RRF_K if k is None else k
+    fused: Dict[int, RetrievedChunk] = {}
+    for field, hits in (("vector_rank", vector_hits), ("lexical_rank", lexical_hits)):
+        for rank, hit in enumerate(hits, start=1):
+            chunk = fused.setdefault(hit.id, hit.model_copy(update={"score": 0.0}))
+            setattr(chunk, field, rank)
+            chunk.score += 1.0 / (k + rank)
+    return sorted(fused.values(), key=lambda chunk: chunk.score, reverse=True)[:limit]
+
+def search_knowledge_base(
+    db: Session,
+    query_text: str,
+    limit: int = 5,
+    ef_search: Optional[int] = None,
+    probes: Optional[int] = None,
+    mode: Optional[str] = None,
+    filters: Optional[RetrievalFilters] = None,
+) -> RetrievalResult:
+    """Retrieves the best chunks for a query in one call.
+
+    `mode` is "hybrid" (default, from RETRIEVAL_MODE) or "vector". Each
+    source contributes up to HYBRID_CANDIDATES candidates (never fewer than
+    `limit`) before fusion. `ef_search`/`probes` tune the ANN side as in
+    `vector_store.find_similar_embeddings`; `filters` restrict both sources
+    to matching files before ranking. Backends without the SQL chunk
+    table (the in-process ones) always use vector mode.
+    """
+    mode = mode or settings.RETRIEVAL_MODE
+    if not get_vector_backend().supports_lexical_search:
+        mode = "vector"
+    timings = RetrievalTimings()
+    started = time.perf_counter()
+    embedding_model_name = get_active_space_name(db)
+
+    def timed_embed():
+        embed_started = time.perf_counter()
+        query_embedding = embed_query_text(query_text, embedding_model_name)
+        timings.embedding_ms = (time.perf_counter() - embed_started) * 1000
+        return query_embedding
+
+    if mode != "hybrid":
+        query_embedding = timed_embed()
+        vector_started = time.perf_counter()
+        chunks = search_by_vector(
+            db, query_embedding, embedding_model_name, limit=limit, ef_search=ef_search, probes=probes, filters=filters
+        )
+        timings.vector_ms = (time.perf_counter() - vector_started) * 1000
+    else:
+        candidates = max(limit, settings.HYBRID_CANDIDATES)
+        with ThreadPoolExecutor(max_workers=1, thread_name_prefix="query-embed") as executor:
+            embedding_future = executor.submit(timed_embed) # Network-bound; overlaps the full-text query
+            lexical_started = time.perf_counter()
+            lexical_hits = lexical_search(db, query_text, embedding_model_name, limit=candidates, filters=filters)
+            timings.lexical_ms = (time.perf_counter() - lexical_started) * 1000
+            query_embedding = embedding_future.result()
+
+        vector_started = time.perf_counter()
+        vector_hits = search_by_vector(
+            db, query_embedding, embedding_model_name, limit=candidates, ef_search=ef_search, probes=probes, filters=filters
+        )
+        timings.vector_ms = (time.perf_counter() - vector_started) * 1000
+
+        fusion_started = time.perf_counter()
+        chunks = reciprocal_rank_fusion(vector_hits, lexical_hits, limit)
+        timings.fusion_ms = (time.perf_counter() - fusion_started) * 1000
+
+    timings.total_ms = (time.perf_counter() - started) * 1000
+    logger.info(
+        f"[Retrieval] {mode} search returned {len(chunks)} chunks in {timings.total_ms:.1f} ms "
+        f"(embedding {timings.embedding_ms:.1f}, vector {timings.vector_ms:.1f}, "
+        f"lexical {timings.lexical_ms:.1f}, fusion {timings.fusion_ms:.1f})"
+    )
+    return RetrievalResult(chunks=chunks, timings=timings, query_embedding=query_embedding.tolist())
@@ -0,0 +1,188 @@
+"""Persistent on-disk cache of extracted document text.
+
+Parsing PDFs (and, to a lesser degree, DOCX files) is the most expensive CPU
+step of ingestion, and reprocessing a file (retry after an embedding error,
+re-chunking) would otherwise repeat it. Extracted pages are stored as one
+zstd-compressed file per document under TEXT_CACHE_PATH, keyed by the file's
+content hash, its kind and the extractor version, so edited files and
+extractor upgrades never see stale text.
+
+Entries are written while extraction streams (pages are teed into a temporary
+file that is renamed into place), so caching costs no extra pass and adds no
+memory. If the consumer stops early (embedding error, cancellation) the pages
+extracted so far are kept as a partial entry, and the next run resumes
+parsing after them (PDFs). Once the cache exceeds TEXT_CACHE_MAX_MB, the least
+recently used entries are evicted. The directory can be shared by every
+worker process on the host; failed cache writes never fail ingestion.
+"""
+
+import logging
+import os
+import struct
+import threading
+import uuid
+from functools import lru_cache
+from typing import Dict, Iterable, Iterator, Optional
+
+import docx
+import pypdf
+import zstandard
+
+from app.config import get_settings
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# Bump when extraction output changes for the same input (e.g. a new page-text rule)
+EXTRACTOR_VERSION = f"1-pypdf{pypdf.__version__}-docx{getattr(docx, '__version__', '')}"
+
+_LENGTH = struct.Struct("<I") # Byte length of each page record
+PARTIAL_SUFFIX = ".partial.zst"
+COMPLETE_SUFFIX = ".zst"
+
+class CacheEntry:
+    """A cached document: its pages, and whether they are all of them."""
+
+    def __init__(self, path: str, complete: bool):
+        self.path = path
+        self.complete = complete
+
+    def pages(self) -> Iterator[str]:
+        """Streams the stored pages in order."""
+        with open(self.path, "rb") as f, zstandard.ZstdDecompressor().stream_reader(f) as reader:
+            while True:
+                header = reader.read(_LENGTH.size)
+                if len(header) < _LENGTH.size:
+                    return
+                (length,) = _LENGTH.unpack(header)
+                yield reader.read(length).decode("utf-8")
+
+class ExtractedTextCache:
+    """Size-bounded LRU store of extracted pages, one compressed file per document."""
+
+    def __init__(self, path: str, max_bytes: int, level: int = 3):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.level = level
+        self.hits = 0 # This process only
+        self.misses = 0
+        self._evict_lock = threading.Lock()
+        os.makedirs(path, exist_ok=True)
+
+    @staticmethod
+    def make_key(content_hash: str, file_kind: str) -> str:
+        return f"{content_hash}.{file_kind}.{EXTRACTOR_VERSION}"
+
+    def _entry_path(self, key: str, complete: bool) -> str:
+        return os.path.join(self.path, key + (COMPLETE_SUFFIX if complete else PARTIAL_SUFFIX))
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        """Returns the complete entry for a key, else its partial one, else None."""
+        for complete in (True, False):
+            entry_path = self._entry_path(key, complete)
+            try:
+                os.utime(entry_path) # Mark as recently used for eviction
+            except FileNotFoundError:
+                continue
+            self.hits += 1
+            return CacheEntry(entry_path, complete)
+        self.misses += 1
+        return None
+
+    def put(self, key: str, pages: Iterable[str]) -> None:
+        """Stores all pages under `key`."""
+        for _ in self.write_through(key, pages):
+            pass
+
+    def write_through(self, key: str, pages: Iterable[str]) -> Iterator[str]:
+        """Yields `pages` unchanged while storing them under `key`.
+
+        Complete when `pages` is exhausted; if iteration stops early or fails,
+        the pages yielded so far are stored as a partial entry.
+        """
+        temp_path = os.path.join(self.path, f".{key}.{uuid.uuid4().hex}.tmp")
+        writer = self._open_writer(temp_path)
+        written = 0
+        complete = False
+        try:
+            for page in pages:
+                if writer is not None:
+                    writer = self._write_page(writer, temp_path, page)
+                    written += 1
+                yield page
+            complete = True
+        finally:
+            if writer is not None:
+                self._commit(writer, temp_path, key, written, complete)
+
+    def _open_writer(self, temp_path: str):
+        try:
+            return zstandard.ZstdCompressor(level=self.level).stream_writer(open(temp_path, "wb"))
+        except OSError as e:
+            logger.warning(f"Extracted-text cache write failed: {e}")
+            return None
+
+    def _write_page(self, writer, temp_path: str, page: str):
+        """Appends one page record; on failure stops caching (returns None) instead of failing extraction."""
+        data = page.encode("utf-8")
+        try:
+            writer.write(_LENGTH.pack(len(data)))
+            writer.write(data)
+            return writer
+        except OSError as e:
+            logger.warning(f"Extracted-text cache write failed: {e}")
+            writer.close()
+            os.remove(temp_path)
+            return None
+
+    def _commit(self, writer, temp_path: str, key: str, written: int, complete: bool) -> None:
+        try:
+            writer.close() # Finishes the zstd frame, so partial entries are readable too
+            if complete:
+                os.replace(temp_path, self._entry_path(key, complete=True))
+                if os.path.exists(self._entry_path(key, complete=False)):
+                    os.remove(self._entry_path(key, complete=False))
+            elif written:
+                os.replace(temp_path, self._entry_path(key, complete=False))
+            if written or complete:
+                logger.info(f"Cached {'all' if complete else 'the first'} {written} extracted page(s) of {key[:12]}")
+                self.evict()
+        except OSError as e:
+            logger.warning(f"Extracted-text cache write failed: {e}")
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+    def evict(self) -> int:
+        """Removes least recently used entries until the cache fits in `max_bytes`; returns how many."""
+        with self._evict_lock:
+            entries = []
+            with os.scandir(self.path) as it:
+                for dir_entry in it:
+                    if dir_entry.name.endswith(".zst"):
+                        stat = dir_entry.stat()
+                        entries.append((stat.st_mtime, stat.st_size, dir_entry.path))
+            total = sum(size for _, size, _ in entries)
+            removed = 0
+            for _, size, entry_path in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(entry_path)
+                except FileNotFoundError: # Evicted by another process
+                    pass
+                total -= size
+                removed += 1
+            return removed
+
+    def stats(self) -> Dict[str, int]:
+        """Returns this process's hit/miss counters and the entries and bytes on disk."""
+        sizes = [entry.stat().st_size for entry in os.scandir(self.path) if entry.name.endswith(".zst")]
+        return {"hits": self.hits, "misses": self.misses, "entries": len(sizes), "bytes": sum(sizes), "max_bytes": self.max_bytes}
+
+@lru_cache()
+def get_text_cache() -> Optional[ExtractedTextCache]:
+    """Returns the shared extracted-text cache, or None if disabled."""
+    if not settings.TEXT_CACHE_ENABLED:
+        return None
+    return ExtractedTextCache(settings.TEXT_CACHE_PATH, settings.TEXT_CACHE_MAX_MB * 1024 * 1024, settings.TEXT_CACHE_LEVEL)
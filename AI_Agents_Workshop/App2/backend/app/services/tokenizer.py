@@ -0,0 +1,64 @@
+"""Token counting for chunking.
+
+Chunk sizes are budgeted in tokens, the unit embedding models and context
+windows are limited by. `get_tokenizer` returns the configured counter: the
+embedding model's tiktoken encoding when it can be loaded, otherwise (or
+when configured) an offline characters-per-token estimate. tiktoken fetches
+its encoding files on first use, so air-gapped deployments fall back to the
+estimate instead of failing ingestion.
+"""
+
+import logging
+import math
+from functools import lru_cache
+from typing import Protocol
+
+from app.config import get_settings
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# Rough characters-per-token ratio for English text with OpenAI tokenizers.
+CHARS_PER_TOKEN = 4
+
+class Tokenizer(Protocol):
+    """Anything that can count the tokens in a text."""
+    name: str
+
+    def count(self, text: str) -> int: ...
+
+class CharRatioTokenizer:
+    """Offline estimate: a fixed number of characters per token."""
+
+    def __init__(self, chars_per_token: float = CHARS_PER_TOKEN):
+        self.chars_per_token = chars_per_token
+        self.name = f"chars/{chars_per_token:g}"
+
+    def count(self, text: str) -> int:
+        return math.ceil(len(text) / self.chars_per_token)
+
+class TiktokenTokenizer:
+    """Exact counts with a tiktoken encoding."""
+
+    def __init__(self, model: str):
+        import tiktoken
+        try:
+            self.encoding = tiktoken.encoding_for_model(model)
+        except KeyError: # Model unknown to tiktoken; OpenAI embedding models use cl100k_base
+            self.encoding = tiktoken.get_encoding("cl100k_base")
+        self.name = f"tiktoken/{self.encoding.name}"
+
+    def count(self, text: str) -> int:
+        return len(self.encoding.encode(text, disallowed_special=()))
+
+@lru_cache()
+def get_tokenizer() -> Tokenizer:
+    """Returns the configured tokenizer, falling back to the character estimate."""
+    if settings.CHUNK_TOKENIZER == "tiktoken":
+        try:
+            return TiktokenTokenizer(settings.OPENAI_EMBEDDING_MODEL)
+        except Exception as e:
+            logger.warning(f"tiktoken unavailable ({e.__class__.__name__}: {e}); estimating tokens as {CHARS_PER_TOKEN} chars each.")
+    elif settings.CHUNK_TOKENIZER != "chars":
+        logger.warning(f"Unknown CHUNK_TOKENIZER '{settings.CHUNK_TOKENIZER}'; estimating tokens from characters.")
+    return CharRatioTokenizer()
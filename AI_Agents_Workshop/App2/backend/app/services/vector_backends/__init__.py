@@ -0,0 +1,45 @@
+"""Vector store backends behind `app.services.vector_store`.
+
+`VECTOR_BACKEND` selects where chunk embeddings are stored and searched:
+
+    pgvector  the `vector_embeddings` table with an ANN index (default;
+              required for hybrid full-text retrieval)
+    numpy     exact search over a memory-mapped float32 matrix, in process
+    hnsw      the numpy store plus hnswlib HNSW graphs (optional dependency)
+
+The in-process backends persist under `VECTOR_STORE_PATH`, share one on-disk
+format (switching between them rebuilds only the HNSW graphs) and need no
+pgvector extension. `VECTOR_QUANTIZATION` switches pgvector and numpy to
+quantized candidate search with exact rescoring (see `quantization.py`).
+"""
+
+import logging
+from functools import lru_cache
+
+from app.config import get_settings
+from .base import VectorStore
+
+logger = logging.getLogger(__name__)
+
+@lru_cache()
+def get_vector_backend() -> VectorStore:
+    """Returns the configured vector store backend (created once, loaded lazily)."""
+    settings = get_settings()
+    backend = settings.VECTOR_BACKEND.lower()
+    if backend == "pgvector":
+        from .pgvector import PgVectorStore
+        return PgVectorStore(settings.VECTOR_QUANTIZATION, settings.QUANTIZATION_RESCORE_FACTOR)
+    if backend == "numpy":
+        from .numpy_store import NumpyVectorStore
+        return NumpyVectorStore(settings.VECTOR_STORE_PATH, settings.VECTOR_QUANTIZATION, settings.QUANTIZATION_RESCORE_FACTOR)
+    if backend == "hnsw":
+        from .hnsw_store import HnswVectorStore
+        if settings.VECTOR_QUANTIZATION != "none":
+            logger.warning("VECTOR_QUANTIZATION is ignored by the hnsw backend (hnswlib graphs hold float32 vectors).")
+        return HnswVectorStore(
+            settings.VECTOR_STORE_PATH, m=settings.HNSW_M, ef_construction=settings.HNSW_EF_CONSTRUCTION,
+            checkpoint_seconds=settings.HNSW_CHECKPOINT_SECONDS,
+        )
+    raise ValueError(f"Unsupported VECTOR_BACKEND '{settings.VECTOR_BACKEND}' (expected 'pgvector', 'numpy' or 'hnsw').")
+
+__all__ = ["VectorStore", "get_vector_backend"]
@@ -0,0 +1,104 @@
+"""Interface shared by the vector store backends."""
+
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional, Set
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.crud import file_filter_conditions
+from app.models import File, VectorEmbedding
+from app.schemas import RetrievalFilters, RetrievedChunk
+from app.services.chunking import TextChunk
+
+def file_scope_conditions(filters: Optional[RetrievalFilters]) -> list:
+    """SQL conditions restricting `vector_embeddings` rows to the files retrieval filters allow.
+
+    File IDs filter `file_id` directly; metadata filters become a semi-join on
+    `files`, so the planner can still walk an ANN index and check each row.
+    """
+    if filters is None or filters.is_empty():
+        return []
+    conditions = []
+    if filters.file_ids is not None:
+        conditions.append(VectorEmbedding.file_id.in_(filters.file_ids))
+    metadata_conditions = file_filter_conditions(filters)
+    if metadata_conditions:
+        conditions.append(VectorEmbedding.file_id.in_(select(File.id).where(*metadata_conditions)))
+    return conditions
+
+class VectorStore(ABC):
+    """Stores chunk embeddings (with chunk text and offsets) and searches them.
+
+    Rows are dicts with the keys file_id, chunk_index, chunk_text, chunk_hash,
+    char_start, char_end, embedding (float32 array) and embedding_model, the
+    embedding space name (model[@dimensions]); spaces never mix in a search.
+    Writes are transactional per DB session: `add_embeddings` stages rows and
+    `commit`/`rollback` publish or discard them, even for backends that keep
+    their data outside the database. Distances are cosine distances. Searches
+    take optional `RetrievalFilters` and apply them before the top-k cut, so a
+    filtered search still returns `limit` rows when enough match.
+    """
+
+    name: str = "base"
+    supports_lexical_search: bool = False # Chunks are in the SQL table (see services/retrieval.py)
+    builds_space_indexes: bool = False # `prepare_space` builds per-space indexes (see vector_store.prepare_space_index)
+
+    def load(self) -> None:
+        """Loads persisted state; called once, lazily or at startup. No-op by default."""
+
+    def flush(self) -> None:
+        """Persists state whose saving is deferred (called at shutdown). No-op by default."""
+
+    @abstractmethod
+    def add_embeddings(self, db: Session, rows: List[Dict]) -> List[int]:
+        """Stages rows for the session's current transaction and returns their IDs."""
+
+    @abstractmethod
+    def commit(self, db: Session) -> None:
+        """Publishes the rows staged by this session."""
+
+    @abstractmethod
+    def rollback(self, db: Session) -> None:
+        """Discards the rows staged by this session."""
+
+    @abstractmethod
+    def vectors_by_chunk_hash(self, db: Session, chunk_hashes: Set[str], embedding_model_name: str) -> Dict[str, np.ndarray]:
+        """Returns one stored vector per known chunk hash for the given model."""
+
+    @abstractmethod
+    def vectors_by_id(self, db: Session, ids: List[int]) -> Dict[int, np.ndarray]:
+        """Returns the stored vectors of the given rows (missing IDs are left out)."""
+
+    @abstractmethod
+    def file_chunks(self, db: Session, file_id: int, embedding_model_name: str) -> List[TextChunk]:
+        """Returns a file's stored chunks in one embedding space, in chunk order."""
+
+    def prepare_space(self, db: Session, embedding_model_name: str, dimensions: int) -> None:
+        """Readies search structures for a space before it takes writes (e.g. its ANN index). No-op by default."""
+
+    @abstractmethod
+    def delete_space(self, db: Session, embedding_model_name: str) -> int:
+        """Deletes every row of an embedding space and commits; returns the row count."""
+
+    @abstractmethod
+    def copy_file(self, db: Session, source_file_id: int, target_file_id: int) -> int:
+        """Copies all rows of one file to another and commits; returns the row count."""
+
+    @abstractmethod
+    def delete_file(self, db: Session, file_id: int) -> int:
+        """Deletes all rows of a file and commits; returns the row count."""
+
+    @abstractmethod
+    def search(
+        self,
+        db: Session,
+        query_embedding: np.ndarray,
+        embedding_model_name: str,
+        limit: int = 5,
+        ef_search: Optional[int] = None,
+        probes: Optional[int] = None,
+        filters: Optional[RetrievalFilters] = None,
+    ) -> List[RetrievedChunk]:
+        """Returns the rows nearest to the query vector (among those the filters allow), closest first."""
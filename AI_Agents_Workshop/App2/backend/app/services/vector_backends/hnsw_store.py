@@ -0,0 +1,196 @@
+"""Approximate in-process backend: hnswlib HNSW graphs over the NumPy store.
+
+Extends `NumpyVectorStore`, which stays the source of truth for vectors and
+chunk metadata; this class adds one HNSW graph per embedding space (labelled
+by chunk ID) for sub-linear search. Each graph is saved next to the matrix
+together with the store version it reflects, and is rebuilt from the matrix
+at load time if it is missing or stale (e.g. after a crash between commits).
+Commits only mark the graphs they change; those are saved by a checkpoint at
+most HNSW_CHECKPOINT_SECONDS later (and at shutdown), so ingestion doesn't
+rewrite every graph on each commit.
+
+Filtered searches pass hnswlib a label filter, so the graph walk only
+collects matching chunks. Filters matching at most FILTERED_EXACT_MAX_ROWS
+rows are scored exactly instead (a graph walk that must skip most nodes is
+slower than that), as are filtered walks that come back with fewer than the
+requested results (hnswlib raises then). Requires the optional `hnswlib`
+package (>= 0.7 for filters).
+"""
+
+import json
+import logging
+import os
+import re
+import threading
+from typing import Dict, List, Optional, Set, Tuple
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from app.config import get_settings
+from app.schemas import RetrievalFilters, RetrievedChunk
+from app.services.vector_backends.numpy_store import SEARCH_BLOCK_ROWS, NumpyVectorStore, normalize_rows
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+INITIAL_CAPACITY = 10000 # Graph capacity before the first resize (doubles as needed)
+FILTERED_EXACT_MAX_ROWS = 10000 # Filtered searches over at most this many rows skip the graph
+
+class HnswVectorStore(NumpyVectorStore):
+    """Approximate cosine search with one hnswlib graph per embedding model."""
+
+    name = "hnsw"
+
+    def __init__(self, directory: str, m: int = 16, ef_construction: int = 64, checkpoint_seconds: float = 30.0):
+        try:
+            import hnswlib
+        except ImportError as e:
+            raise ImportError("VECTOR_BACKEND=hnsw requires the 'hnswlib' package (pip install hnswlib).") from e
+        super().__init__(directory)
+        self._hnswlib = hnswlib
+        self.m = m
+        self.ef_construction = ef_construction
+        self._indexes: Dict[str, "hnswlib.Index"] = {}
+        self.checkpoint_seconds = checkpoint_seconds
+        self._dirty: Set[str] = set() # Graphs changed since their last save
+        self._checkpoint_timer: Optional[threading.Timer] = None
+
+    def _index_path(self, embedding_model_name: str) -> str:
+        slug = re.sub(r"[^A-Za-z0-9_.-]", "_", embedding_model_name or "default")
+        return os.path.join(self.directory, f"hnsw-{slug}.bin")
+
+    def _versions_path(self) -> str:
+        return os.path.join(self.directory, "hnsw-versions.json")
+
+    def _new_index(self, capacity: int):
+        index = self._hnswlib.Index(space="cosine", dim=self.dimensions)
+        index.init_index(max_elements=max(capacity, INITIAL_CAPACITY), ef_construction=self.ef_construction, M=self.m)
+        return index
+
+    def _save(self) -> None:
+        """Saves the changed graphs, then records the store version all graphs on disk now reflect."""
+        for model in self._dirty:
+            if model in self._indexes:
+                self._indexes[model].save_index(self._index_path(model))
+        self._dirty.clear()
+        with open(self._versions_path(), "w") as f:
+            json.dump({model: self.version for model in self._indexes}, f)
+
+    def _mark_dirty(self, models) -> None:
+        """Schedules a checkpoint of changed graphs, unless one is already pending."""
+        self._dirty.update(models)
+        if self._checkpoint_timer is None:
+            self._checkpoint_timer = threading.Timer(self.checkpoint_seconds, self.flush)
+            self._checkpoint_timer.daemon = True
+            self._checkpoint_timer.start()
+
+    def flush(self) -> None:
+        with self._lock:
+            if self._checkpoint_timer is not None:
+                self._checkpoint_timer.cancel()
+                self._checkpoint_timer = None
+            if self._dirty:
+                self._save()
+
+    def _on_loaded(self) -> None:
+        if not self.dimensions:
+            return
+        saved_versions = {}
+        if os.path.exists(self._versions_path()):
+            with open(self._versions_path()) as f:
+                saved_versions = json.load(f)
+        for model, code in self._model_codes.items():
+            live = self.live_count(model)
+            if not live:
+                continue
+            path = self._index_path(model)
+            if saved_versions.get(model) == self.version and os.path.exists(path):
+                index = self._hnswlib.Index(space="cosine", dim=self.dimensions)
+                index.load_index(path, max_elements=max(2 * live, INITIAL_CAPACITY))
+            else:
+                logger.info(f"[VectorStoreService] Rebuilding HNSW graph for {model} from {live} stored vectors")
+                index = self._new_index(2 * live)
+                slots = np.flatnonzero((self._slot_ids >= 0) & (self._slot_models == code))
+                for start in range(0, len(slots), SEARCH_BLOCK_ROWS):
+                    part = slots[start:start + SEARCH_BLOCK_ROWS]
+                    index.add_items(np.asarray(self._matrix[part]), self._slot_ids[part])
+                self._dirty.add(model)
+            self._indexes[model] = index
+        if self._dirty:
+            self._save()
+
+    def _on_added(self, ids: np.ndarray, vectors: np.ndarray, embedding_model_name: str) -> None:
+        index = self._indexes.get(embedding_model_name)
+        if index is None:
+            index = self._indexes[embedding_model_name] = self._new_index(2 * len(ids))
+        needed = index.get_current_count() + len(ids)
+        if needed > index.get_max_elements():
+            index.resize_index(max(needed, 2 * index.get_max_elements()))
+        index.add_items(vectors, ids)
+        self._mark_dirty([embedding_model_name])
+
+    def _on_deleted(self, ids_by_model: Dict[str, List[int]]) -> None:
+        for model, ids in ids_by_model.items():
+            index = self._indexes.get(model)
+            if index is None:
+                continue
+            if not self.live_count(model): # Whole space gone (e.g. retired after re-embedding)
+                del self._indexes[model]
+                if os.path.exists(self._index_path(model)):
+                    os.remove(self._index_path(model))
+                continue
+            for chunk_id in ids:
+                index.mark_deleted(chunk_id)
+        self._mark_dirty(ids_by_model)
+
+    def search(
+        self,
+        db: Session,
+        query_embedding: np.ndarray,
+        embedding_model_name: str,
+        limit: int = 5,
+        ef_search: Optional[int] = None,
+        probes: Optional[int] = None,
+        filters: Optional[RetrievalFilters] = None,
+    ) -> List[RetrievedChunk]:
+        self.load()
+        filtered_chunks, allowed_ids = None, None
+        if filters is not None and not filters.is_empty():
+            filtered_chunks = self._filtered_chunks(db, embedding_model_name, filters)
+            if len(filtered_chunks) <= FILTERED_EXACT_MAX_ROWS:
+                return self._exact_search(db, query_embedding, filtered_chunks, limit)
+            allowed_ids = {chunk_id for chunk_id, _ in filtered_chunks}
+        with self._lock: # hnswlib searches are thread-safe, but not concurrent with writes
+            index = self._indexes.get(embedding_model_name)
+            k = min(limit, self.live_count(embedding_model_name) if allowed_ids is None else len(allowed_ids))
+            if index is None or k == 0:
+                return []
+            # HNSW returns at most ef rows, so never go below the limit
+            index.set_ef(max(ef_search or settings.HNSW_EF_SEARCH or 40, k))
+            try:
+                labels, distances = index.knn_query(
+                    self._fit(np.asarray(query_embedding, dtype=np.float32)),
+                    k=k,
+                    filter=None if allowed_ids is None else allowed_ids.__contains__,
+                )
+            except RuntimeError: # Fewer than k labels found (filtered walk missed some, or listed IDs not in the graph)
+                if filtered_chunks is None:
+                    raise
+                labels = None
+        if labels is None:
+            return self._exact_search(db, query_embedding, filtered_chunks, limit)
+        return self._rows_for_ids(db, [int(label) for label in labels[0]], [float(distance) for distance in distances[0]])
+
+    def _exact_search(self, db: Session, query_embedding: np.ndarray, chunks: List[Tuple[int, int]], limit: int) -> List[RetrievedChunk]:
+        """Scores the given (chunk ID, slot) rows exactly against the query."""
+        with self._lock:
+            matrix, slot_ids = self._matrix, self._slot_ids
+        if matrix is None or not chunks:
+            return []
+        slots = np.array([slot for chunk_id, slot in chunks if slot < len(matrix) and slot_ids[slot] == chunk_id], dtype=np.int64)
+        if not len(slots):
+            return []
+        scores = np.asarray(matrix[slots]) @ self._fit(normalize_rows(query_embedding))
+        order = np.argsort(-scores, kind="stable")[:limit]
+        return self._rows_for_ids(db, [int(slot_ids[slots[i]]) for i in order], [float(1 - scores[i]) for i in order])
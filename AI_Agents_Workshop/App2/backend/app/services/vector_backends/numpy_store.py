@@ -0,0 +1,372 @@
+"""Exact in-process backend: a memory-mapped float32 matrix searched with NumPy.
+
+Vectors are L2-normalized and appended to a flat float32 file that is
+memory-mapped for search, so cosine similarity is a matrix-vector product
+computed block by block (bounded memory, OS page cache does the rest). Chunk
+text, offsets and each row's slot in the matrix live in a small SQLite file
+next to it. Deleting a file only forgets its rows; once most slots are dead
+the matrix is rewritten into a new generation file, switched atomically with
+the slot updates.
+
+With `quantization` set (see `quantization.py`), a compact copy of the
+matrix is built in memory at load time and kept in step with writes; searches
+scan it for candidates and rescore only those against the float32 file, so
+the full-precision vectors can stay on disk.
+
+The matrix has one width, set by the first vectors stored. Vectors of smaller
+embedding spaces (e.g. shortened text-embedding-3 output) are zero-padded to
+it, which leaves their cosine similarities unchanged; spaces never mix in a
+search, since every row keeps its space name. A wider space needs a new store.
+
+Retrieval filters are resolved to file IDs in Postgres and then to matrix
+slots here; the scan simply skips the other slots, so top-k is taken over the
+matching rows only.
+
+Everything is loaded lazily on first use (or by `load()` at startup) and is
+meant for a single process: dev boxes, tests and small edge deployments
+without pgvector.
+"""
+
+import logging
+import os
+import sqlite3
+import threading
+from typing import Dict, List, Optional, Set, Tuple
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.crud import get_filtered_file_ids
+from app.models import File
+from app.schemas import RetrievalFilters, RetrievedChunk
+from app.services.chunking import TextChunk
+from app.services.vector_backends.base import VectorStore
+from app.services.vector_backends.quantization import new_quantized_matrix, quantized_search
+
+logger = logging.getLogger(__name__)
+
+SQLITE_MAX_PARAMS = 500 # Stay under SQLite's variable limit
+SEARCH_BLOCK_ROWS = 65536 # Matrix rows per matrix-vector product
+COMPACT_MIN_DEAD_SLOTS = 1024 # Don't rewrite the matrix for a handful of deletions
+CHUNK_COLUMNS = ("file_id", "chunk_index", "chunk_text", "chunk_hash", "char_start", "char_end", "embedding_model")
+
+def normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    """Returns float32 copies of the vectors scaled to unit length."""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+class NumpyVectorStore(VectorStore):
+    """Exact cosine search over a memory-mapped matrix."""
+
+    name = "numpy"
+
+    def __init__(self, directory: str, quantization: str = "none", rescore_factor: int = 4):
+        self.directory = directory
+        self.quantization = quantization
+        self.rescore_factor = rescore_factor
+        new_quantized_matrix(quantization, 1) # Fail fast on an unknown mode
+        self._lock = threading.RLock()
+        self._pending: Dict[int, List[Dict]] = {} # Staged rows per DB session
+        self._loaded = False
+
+    # --- Persistence ---
+
+    def load(self) -> None:
+        with self._lock:
+            if self._loaded:
+                return
+            os.makedirs(self.directory, exist_ok=True)
+            self._conn = sqlite3.connect(os.path.join(self.directory, "chunks.sqlite3"), check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS chunks (id INTEGER PRIMARY KEY, slot INTEGER NOT NULL, file_id INTEGER NOT NULL, "
+                "chunk_index INTEGER, chunk_text TEXT, chunk_hash TEXT, char_start INTEGER, char_end INTEGER, embedding_model TEXT)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS ix_chunks_file_id ON chunks (file_id)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS ix_chunks_chunk_hash_embedding_model ON chunks (chunk_hash, embedding_model)")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+            self._conn.commit()
+            meta = dict(self._conn.execute("SELECT name, value FROM meta"))
+            self.dimensions: Optional[int] = meta.get("dimensions")
+            self.generation = meta.get("generation", 0)
+            self.version = meta.get("version", 0) # Bumped on every change; lets derived indexes detect staleness
+            self._next_id = max(meta.get("next_id", 1), (self._conn.execute("SELECT max(id) FROM chunks").fetchone()[0] or 0) + 1)
+
+            # Slots past the last committed row (e.g. after a crash mid-commit) are simply dead;
+            # a partially written vector is cut off so later appends stay aligned
+            slot_count = 0
+            if self.dimensions and os.path.exists(self._vectors_path()):
+                slot_count = os.path.getsize(self._vectors_path()) // (4 * self.dimensions)
+                os.truncate(self._vectors_path(), slot_count * 4 * self.dimensions)
+            self._slot_ids = np.full(slot_count, -1, dtype=np.int64)
+            self._slot_models = np.full(slot_count, -1, dtype=np.int32)
+            self._model_codes: Dict[str, int] = {}
+            for chunk_id, slot, model in self._conn.execute("SELECT id, slot, embedding_model FROM chunks"):
+                self._slot_ids[slot] = chunk_id
+                self._slot_models[slot] = self._model_code(model)
+            self._open_matrix()
+            self._build_compact()
+            self._loaded = True
+            self._maybe_compact()
+            self._on_loaded()
+            logger.info(f"[VectorStoreService] Loaded {self.name} vector store from {self.directory} ({self.live_count()} vectors)")
+
+    def _vectors_path(self, generation: Optional[int] = None) -> str:
+        return os.path.join(self.directory, f"vectors-{self.generation if generation is None else generation}.f32")
+
+    def _open_matrix(self) -> None:
+        rows = len(self._slot_ids)
+        self._matrix = np.memmap(self._vectors_path(), dtype=np.float32, mode="r", shape=(rows, self.dimensions)) if rows else None
+
+    def _build_compact(self) -> None:
+        """Builds the in-memory quantized copy of the matrix (if quantization is on)."""
+        self._compact = new_quantized_matrix(self.quantization, self.dimensions or 1)
+        if self._compact is None or self._matrix is None:
+            return
+        for start in range(0, len(self._matrix), SEARCH_BLOCK_ROWS):
+            self._compact.append(self._matrix[start:start + SEARCH_BLOCK_ROWS])
+
+    def _fit(self, vectors: np.ndarray) -> np.ndarray:
+        """Zero-pads vectors of a smaller embedding space to the matrix width."""
+        width = vectors.shape[-1]
+        if width > self.dimensions:
+            raise ValueError(
+                f"Vector store holds {self.dimensions}-dim vectors, got {width}-dim; "
+                f"use a new VECTOR_STORE_PATH (or pgvector) for a wider embedding space."
+            )
+        if width == self.dimensions:
+            return vectors
+        return np.pad(vectors, [(0, 0)] * (vectors.ndim - 1) + [(0, self.dimensions - width)])
+
+    def _model_code(self, model: Optional[str]) -> int:
+        return self._model_codes.setdefault(model or "", len(self._model_codes))
+
+    def _set_meta(self, **values: int) -> None:
+        self._conn.executemany("INSERT OR REPLACE INTO meta (name, value) VALUES (?, ?)", values.items())
+
+    def live_count(self, embedding_model_name: Optional[str] = None) -> int:
+        live = self._slot_ids >= 0
+        if embedding_model_name is not None:
+            live &= self._slot_models == self._model_codes.get(embedding_model_name, -2)
+        return int(live.sum())
+
+    def _maybe_compact(self) -> None:
+        """Rewrites the matrix without dead slots once they outnumber live ones."""
+        live_slots = np.flatnonzero(self._slot_ids >= 0)
+        dead = len(self._slot_ids) - len(live_slots)
+        if dead < COMPACT_MIN_DEAD_SLOTS or dead <= len(live_slots):
+            return
+        generation = self.generation + 1
+        with open(self._vectors_path(generation), "wb") as f:
+            for start in range(0, len(live_slots), SEARCH_BLOCK_ROWS):
+                f.write(np.ascontiguousarray(self._matrix[live_slots[start:start + SEARCH_BLOCK_ROWS]]).tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+        old_path = self._vectors_path()
+        # Slot remap and generation switch commit together, so a crash leaves a consistent pair
+        self._conn.executemany("UPDATE chunks SET slot = ? WHERE id = ?", ((new, int(self._slot_ids[old])) for new, old in enumerate(live_slots)))
+        self._set_meta(generation=generation)
+        self._conn.commit()
+        self.generation = generation
+        self._slot_ids, self._slot_models = self._slot_ids[live_slots], self._slot_models[live_slots]
+        self._open_matrix()
+        if self._compact is not None:
+            self._compact = self._compact.select(live_slots)
+        os.remove(old_path)
+        logger.info(f"[VectorStoreService] Compacted {self.name} vector store: dropped {dead} dead slots")
+
+    # --- Hooks for derived indexes (see hnsw_store) ---
+
+    def _on_loaded(self) -> None:
+        pass
+
+    def _on_added(self, ids: np.ndarray, vectors: np.ndarray, embedding_model_name: str) -> None:
+        pass
+
+    def _on_deleted(self, ids_by_model: Dict[str, List[int]]) -> None:
+        pass
+
+    # --- Writes ---
+
+    def add_embeddings(self, db: Session, rows: List[Dict]) -> List[int]:
+        self.load()
+        with self._lock:
+            ids = list(range(self._next_id, self._next_id + len(rows)))
+            self._next_id += len(rows)
+        self._pending.setdefault(id(db), []).extend({**row, "id": chunk_id} for row, chunk_id in zip(rows, ids))
+        return ids
+
+    def rollback(self, db: Session) -> None:
+        self._pending.pop(id(db), None)
+
+    def commit(self, db: Session) -> None:
+        rows = self._pending.pop(id(db), [])
+        if not rows:
+            return
+        self.load()
+        embeddings = [normalize_rows(row["embedding"]) for row in rows] # A session may write several spaces
+        with self._lock:
+            if self.dimensions is None:
+                self.dimensions = max(len(embedding) for embedding in embeddings)
+                self._set_meta(dimensions=self.dimensions)
+                self._compact = new_quantized_matrix(self.quantization, self.dimensions)
+            vectors = np.stack([self._fit(embedding) for embedding in embeddings])
+            ids = np.array([row["id"] for row in rows], dtype=np.int64)
+            codes = np.array([self._model_code(row["embedding_model"]) for row in rows], dtype=np.int32)
+            first_slot = len(self._slot_ids)
+            with open(self._vectors_path(), "ab") as f: # Vectors first; rows without a vector never exist
+                f.write(vectors.tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+            # The new slots stay dead unless the rows commit
+            self._slot_ids = np.concatenate([self._slot_ids, np.full(len(rows), -1, dtype=np.int64)])
+            self._slot_models = np.concatenate([self._slot_models, codes])
+            self._open_matrix()
+            if self._compact is not None:
+                self._compact.append(vectors)
+            self._conn.executemany(
+                f"INSERT INTO chunks (id, slot, {', '.join(CHUNK_COLUMNS)}) VALUES ({', '.join('?' * (len(CHUNK_COLUMNS) + 2))})",
+                [(row["id"], first_slot + i, *(row[column] for column in CHUNK_COLUMNS)) for i, row in enumerate(rows)],
+            )
+            self.version += 1
+            self._set_meta(next_id=self._next_id, version=self.version)
+            self._conn.commit()
+            self._slot_ids[first_slot:] = ids
+            for model in {row["embedding_model"] for row in rows}:
+                mask = codes == self._model_codes[model or ""]
+                self._on_added(ids[mask], vectors[mask], model)
+
+    def copy_file(self, db: Session, source_file_id: int, target_file_id: int) -> int:
+        self.load()
+        with self._lock:
+            rows = self._conn.execute(f"SELECT slot, {', '.join(CHUNK_COLUMNS)} FROM chunks WHERE file_id = ?", (source_file_id,)).fetchall()
+            copies = [
+                {**dict(zip(CHUNK_COLUMNS, values)), "file_id": target_file_id, "embedding": np.array(self._matrix[slot])}
+                for slot, *values in rows
+            ]
+        self.add_embeddings(db, copies)
+        self.commit(db)
+        return len(copies)
+
+    def _delete_where(self, condition: str, value) -> int:
+        self.load()
+        with self._lock:
+            rows = self._conn.execute(f"SELECT id, slot, embedding_model FROM chunks WHERE {condition} = ?", (value,)).fetchall()
+            if not rows:
+                return 0
+            self._conn.execute(f"DELETE FROM chunks WHERE {condition} = ?", (value,))
+            self.version += 1
+            self._set_meta(version=self.version)
+            self._conn.commit()
+            ids_by_model: Dict[str, List[int]] = {}
+            for chunk_id, slot, model in rows:
+                self._slot_ids[slot] = -1
+                ids_by_model.setdefault(model, []).append(chunk_id)
+            self._on_deleted(ids_by_model)
+            self._maybe_compact()
+        return len(rows)
+
+    def delete_file(self, db: Session, file_id: int) -> int:
+        return self._delete_where("file_id", file_id)
+
+    def delete_space(self, db: Session, embedding_model_name: str) -> int:
+        return self._delete_where("embedding_model", embedding_model_name)
+
+    # --- Reads ---
+
+    def vectors_by_chunk_hash(self, db: Session, chunk_hashes: Set[str], embedding_model_name: str) -> Dict[str, np.ndarray]:
+        if not chunk_hashes:
+            return {}
+        self.load()
+        hashes = list(chunk_hashes)
+        found: Dict[str, np.ndarray] = {}
+        with self._lock:
+            for start in range(0, len(hashes), SQLITE_MAX_PARAMS):
+                part = hashes[start:start + SQLITE_MAX_PARAMS]
+                query = f"SELECT chunk_hash, slot FROM chunks WHERE embedding_model = ? AND chunk_hash IN ({','.join('?' * len(part))})"
+                for chunk_hash, slot in self._conn.execute(query, [embedding_model_name, *part]):
+                    found.setdefault(chunk_hash, np.array(self._matrix[slot]))
+        return found
+
+    def vectors_by_id(self, db: Session, ids: List[int]) -> Dict[int, np.ndarray]:
+        if not ids:
+            return {}
+        self.load()
+        found: Dict[int, np.ndarray] = {}
+        with self._lock:
+            for start in range(0, len(ids), SQLITE_MAX_PARAMS):
+                part = ids[start:start + SQLITE_MAX_PARAMS]
+                query = f"SELECT id, slot FROM chunks WHERE id IN ({','.join('?' * len(part))})"
+                for chunk_id, slot in self._conn.execute(query, part):
+                    found[chunk_id] = np.array(self._matrix[slot])
+        return found
+
+    def file_chunks(self, db: Session, file_id: int, embedding_model_name: str) -> List[TextChunk]:
+        self.load()
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT chunk_index, chunk_text, char_start, char_end FROM chunks WHERE file_id = ? AND embedding_model = ? ORDER BY chunk_index, id",
+                (file_id, embedding_model_name),
+            ).fetchall()
+        return [TextChunk(*row) for row in rows]
+
+    def _filtered_chunks(self, db: Session, embedding_model_name: str, filters: RetrievalFilters) -> List[Tuple[int, int]]:
+        """Returns (chunk ID, slot) of the space's rows in files matching the filters."""
+        file_ids = get_filtered_file_ids(db, filters)
+        chunks = []
+        with self._lock:
+            for start in range(0, len(file_ids), SQLITE_MAX_PARAMS):
+                part = file_ids[start:start + SQLITE_MAX_PARAMS]
+                query = f"SELECT id, slot FROM chunks WHERE embedding_model = ? AND file_id IN ({','.join('?' * len(part))})"
+                chunks.extend(self._conn.execute(query, [embedding_model_name, *part]))
+        return chunks
+
+    def _rows_for_ids(self, db: Session, ids: List[int], distances: List[float]) -> List[RetrievedChunk]:
+        """Builds results for chunk IDs in the given order, with filenames from the database."""
+        if not ids:
+            return []
+        with self._lock:
+            query = f"SELECT id, file_id, chunk_index, chunk_text, char_start, char_end FROM chunks WHERE id IN ({','.join('?' * len(ids))})"
+            rows = {row[0]: row for row in self._conn.execute(query, ids)}
+        file_ids = {row[1] for row in rows.values()}
+        filenames = dict(db.execute(select(File.id, File.filename).where(File.id.in_(file_ids))).all())
+        results = []
+        for chunk_id, distance in zip(ids, distances):
+            if chunk_id not in rows: # Deleted since the scan
+                continue
+            _, file_id, chunk_index, chunk_text, char_start, char_end = rows[chunk_id]
+            results.append(RetrievedChunk(
+                id=chunk_id, file_id=file_id, filename=filenames.get(file_id), chunk_index=chunk_index,
+                chunk_text=chunk_text, char_start=char_start, char_end=char_end, distance=distance,
+            ))
+        return results
+
+    def search(
+        self,
+        db: Session,
+        query_embedding: np.ndarray,
+        embedding_model_name: str,
+        limit: int = 5,
+        ef_search: Optional[int] = None,
+        probes: Optional[int] = None,
+        filters: Optional[RetrievalFilters] = None,
+    ) -> List[RetrievedChunk]:
+        self.load()
+        filtered_slots = None
+        if filters is not None and not filters.is_empty():
+            filtered_slots = [slot for _, slot in self._filtered_chunks(db, embedding_model_name, filters)]
+        with self._lock: # Snapshot; the scan itself runs without the lock
+            matrix, compact, slot_ids, slot_models = self._matrix, self._compact, self._slot_ids, self._slot_models
+            code = self._model_codes.get(embedding_model_name)
+        if matrix is None or code is None:
+            return []
+
+        valid = (slot_ids[:len(matrix)] >= 0) & (slot_models[:len(matrix)] == code)
+        if filtered_slots is not None:
+            allowed = np.zeros(len(matrix), dtype=bool)
+            allowed[[slot for slot in filtered_slots if slot < len(matrix)]] = True
+            valid &= allowed
+        slots, scores = quantized_search(matrix, compact, self._fit(normalize_rows(query_embedding)), limit, self.rescore_factor, valid)
+        return self._rows_for_ids(db, [int(slot_ids[slot]) for slot in slots], [float(1 - score) for score in scores])
@@ -0,0 +1,297 @@
+"""pgvector backend: embeddings live in the `vector_embeddings` table.
+
+Vectors, chunk text and offsets share one row, so full-text search runs on
+the same table and copies/deletes are single SQL statements.
+
+The `embedding` column has no fixed size, so embedding spaces of different
+dimensions (see `app.llm_clients.embedding_space_name`) share the table. Each
+space gets its own partial expression index, e.g.
+
+    USING hnsw ((embedding::vector(512)) vector_cosine_ops) WHERE embedding_model = 'text-embedding-3-small@512'
+
+created by alembic revision a3f7c2d9e614 for existing data and by
+`prepare_space` for new spaces. That runs in the re-embedding job's setup
+step, before the new space is backfilled, and at startup for the spaces
+being written to (e.g. the first space of a fresh database), never on the
+ingestion path. Searches order by the same expression and filter on the
+space, so the planner picks that space's index. With
+VECTOR_QUANTIZATION set to "halfvec"/"binary" the indexed expression is
+`embedding::halfvec(n)` (cosine) or `binary_quantize(embedding)::bit(n)`
+(Hamming): candidates are ranked on it and rescored against the
+full-precision column, which is only read for those candidates.
+
+Retrieval filters are pushed into the same query (see
+`base.file_scope_conditions`). A plain HNSW/IVFFlat scan stops after
+ef_search rows, so a selective filter could leave fewer than `limit`
+survivors; filtered queries therefore enable pgvector's iterative index scans
+(VECTOR_ITERATIVE_SCAN, pgvector >= 0.8), which keep walking the index until
+enough rows pass, and re-sort the relaxed-order results. Very selective
+filters (a few files) are usually planned as exact scans via the `file_id`
+index instead, which is the faster plan there.
+"""
+
+import logging
+import re
+import threading
+from typing import Dict, List, Optional, Set
+
+import numpy as np
+from pgvector.sqlalchemy import BIT, HALFVEC, Vector
+from sqlalchemy import cast, delete, func, insert, literal, select, text
+from sqlalchemy.orm import Session
+
+from app.config import get_settings
+from app.models import File, VectorEmbedding
+from app.schemas import RetrievalFilters, RetrievedChunk
+from app.services.chunking import TextChunk
+from app.services.vector_backends.base import VectorStore, file_scope_conditions
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# Indexed expression and operator class per quantization mode
+ANN_EXPRESSIONS = {
+    "none": ("(embedding::vector({dimensions}))", "vector_cosine_ops"),
+    "halfvec": ("(embedding::halfvec({dimensions}))", "halfvec_cosine_ops"),
+    "binary": ("(binary_quantize(embedding)::bit({dimensions}))", "bit_hamming_ops"),
+}
+MAX_INDEX_NAME_LENGTH = 63 # Postgres identifier limit
+DELETE_BATCH_ROWS = 5000 # Rows per transaction when dropping a whole space
+
+def space_index_name(embedding_model_name: str, quantization: str = "none") -> str:
+    """Name of the ANN index for an embedding space, e.g. ix_vector_embeddings_ann_text_embedding_3_small_512."""
+    prefix = "ix_vector_embeddings_" + ("" if quantization == "none" else f"{quantization}_") + "ann_"
+    slug = re.sub(r"[^a-z0-9]+", "_", embedding_model_name.lower()).strip("_")
+    return (prefix + slug)[:MAX_INDEX_NAME_LENGTH]
+
+def space_index_ddl(embedding_model_name: str, dimensions: int, quantization: str = "none") -> str:
+    """CREATE INDEX CONCURRENTLY statement for a space, using the configured index type and parameters."""
+    expression, operator_class = ANN_EXPRESSIONS[quantization]
+    if settings.VECTOR_INDEX_TYPE == "hnsw":
+        options = f"m = {settings.HNSW_M}, ef_construction = {settings.HNSW_EF_CONSTRUCTION}"
+    elif settings.VECTOR_INDEX_TYPE == "ivfflat":
+        options = f"lists = {settings.IVFFLAT_LISTS}"
+    else:
+        raise ValueError(f"Unsupported VECTOR_INDEX_TYPE '{settings.VECTOR_INDEX_TYPE}' (expected 'hnsw' or 'ivfflat').")
+    space_literal = embedding_model_name.replace("'", "''")
+    return (
+        f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {space_index_name(embedding_model_name, quantization)} "
+        f"ON vector_embeddings USING {settings.VECTOR_INDEX_TYPE} "
+        f"({expression.format(dimensions=int(dimensions))} {operator_class}) WITH ({options}) "
+        f"WHERE embedding_model = '{space_literal}'"
+    )
+
+def apply_ann_search_settings(
+    db: Session,
+    limit: int,
+    ef_search: Optional[int] = None,
+    probes: Optional[int] = None,
+    filtered: bool = False,
+) -> None:
+    """Sets transaction-local ANN tuning for the next similarity query.
+
+    Higher `ef_search` (HNSW) or `probes` (IVFFlat) means better recall and
+    higher latency. Values fall back to the configured defaults; when neither
+    is set the server defaults apply. `filtered` turns on iterative index
+    scans (VECTOR_ITERATIVE_SCAN). The settings are `SET LOCAL`, so they only
+    affect the current transaction.
+    """
+    def set_local(name: str, value) -> None:
+        db.execute(text("SELECT set_config(:name, :value, true)"), {"name": name, "value": str(value)})
+
+    if settings.VECTOR_INDEX_TYPE == "hnsw":
+        ef_search = ef_search or settings.HNSW_EF_SEARCH
+        if ef_search:
+            # HNSW returns at most ef_search rows, so never go below the limit
+            ef_search = max(ef_search, limit)
+            set_local("hnsw.ef_search", ef_search)
+        if filtered and settings.VECTOR_ITERATIVE_SCAN != "off":
+            set_local("hnsw.iterative_scan", settings.VECTOR_ITERATIVE_SCAN)
+            if settings.HNSW_MAX_SCAN_TUPLES:
+                set_local("hnsw.max_scan_tuples", settings.HNSW_MAX_SCAN_TUPLES)
+    elif settings.VECTOR_INDEX_TYPE == "ivfflat":
+        probes = probes or settings.IVFFLAT_PROBES
+        if probes:
+            set_local("ivfflat.probes", probes)
+        if filtered and settings.VECTOR_ITERATIVE_SCAN != "off":
+            set_local("ivfflat.iterative_scan", "relaxed_order") # The only order IVFFlat supports
+
+class PgVectorStore(VectorStore):
+    """Vector store on Postgres with the pgvector extension."""
+
+    name = "pgvector"
+    supports_lexical_search = True
+    builds_space_indexes = True
+
+    def __init__(self, quantization: str = "none", rescore_factor: int = 4):
+        if quantization not in ("none", "halfvec", "binary"):
+            raise ValueError(f"VECTOR_QUANTIZATION '{quantization}' is not supported by the pgvector backend (use none, halfvec or binary).")
+        self.quantization = quantization
+        self.rescore_factor = rescore_factor
+        self._prepared_spaces: Set[str] = set()
+        self._prepare_lock = threading.Lock()
+
+    def _candidate_order(self, query_embedding: np.ndarray):
+        """ORDER BY expression matching the space's quantized index."""
+        dimensions = len(query_embedding)
+        query_vector = cast(literal(query_embedding, Vector(dimensions)), Vector(dimensions))
+        if self.quantization == "halfvec":
+            half = HALFVEC(dimensions)
+            return cast(VectorEmbedding.embedding, half).op("<=>")(cast(query_vector, half))
+        bits = BIT(dimensions)
+        return cast(func.binary_quantize(VectorEmbedding.embedding), bits).op("<~>")(cast(func.binary_quantize(query_vector), bits))
+
+    def _autocommit_connection(self, db: Session):
+        # CREATE/DROP INDEX CONCURRENTLY cannot run inside a transaction block
+        return db.get_bind().connect().execution_options(isolation_level="AUTOCOMMIT")
+
+    def prepare_space(self, db: Session, embedding_model_name: str, dimensions: int) -> None:
+        """Builds the space's ANN index if it is missing or invalid (checked once per process).
+
+        Call with no transaction open on `db`: a concurrent build waits for
+        every transaction that could still see the table.
+        """
+        with self._prepare_lock:
+            if embedding_model_name in self._prepared_spaces:
+                return
+            index_name = space_index_name(embedding_model_name, self.quantization)
+            try:
+                with self._autocommit_connection(db) as conn:
+                    valid = conn.execute(
+                        text("SELECT i.indisvalid FROM pg_class c JOIN pg_index i ON i.indexrelid = c.oid WHERE c.relname = :name"),
+                        {"name": index_name},
+                    ).scalar()
+                    if valid is False: # Left behind by an interrupted concurrent build
+                        conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {index_name}"))
+                    if not valid:
+                        logger.info(f"[VectorStoreService] Building ANN index {index_name} for {dimensions}-dim space {embedding_model_name}")
+                        conn.execute(text(space_index_ddl(embedding_model_name, dimensions, self.quantization)))
+            except Exception as e:
+                # Searches still work (exact scan) without the index; retried at the next startup or re-embedding run
+                logger.warning(f"[VectorStoreService] Could not build ANN index {index_name}: {e}")
+                return
+            self._prepared_spaces.add(embedding_model_name)
+
+    def add_embeddings(self, db: Session, rows: List[Dict]) -> List[int]:
+        # One multi-row INSERT per call
+        return list(db.execute(insert(VectorEmbedding).returning(VectorEmbedding.id), rows).scalars())
+
+    def commit(self, db: Session) -> None:
+        db.commit()
+
+    def rollback(self, db: Session) -> None:
+        db.rollback()
+
+    def vectors_by_chunk_hash(self, db: Session, chunk_hashes: Set[str], embedding_model_name: str) -> Dict[str, np.ndarray]:
+        if not chunk_hashes:
+            return {}
+        stmt = (
+            select(VectorEmbedding.chunk_hash, VectorEmbedding.embedding)
+            .where(
+                VectorEmbedding.chunk_hash.in_(chunk_hashes),
+                VectorEmbedding.embedding_model == embedding_model_name,
+            )
+            .distinct(VectorEmbedding.chunk_hash)
+        )
+        return {row.chunk_hash: row.embedding for row in db.execute(stmt)}
+
+    def vectors_by_id(self, db: Session, ids: List[int]) -> Dict[int, np.ndarray]:
+        if not ids:
+            return {}
+        stmt = select(VectorEmbedding.id, VectorEmbedding.embedding).where(VectorEmbedding.id.in_(ids))
+        return {row.id: np.asarray(row.embedding, dtype=np.float32) for row in db.execute(stmt)}
+
+    def file_chunks(self, db: Session, file_id: int, embedding_model_name: str) -> List[TextChunk]:
+        stmt = (
+            select(VectorEmbedding.chunk_index, VectorEmbedding.chunk_text, VectorEmbedding.char_start, VectorEmbedding.char_end)
+            .where(VectorEmbedding.file_id == file_id, VectorEmbedding.embedding_model == embedding_model_name)
+            .order_by(VectorEmbedding.chunk_index, VectorEmbedding.id)
+        )
+        return [TextChunk(*row) for row in db.execute(stmt)]
+
+    def delete_space(self, db: Session, embedding_model_name: str) -> int:
+        # Batched, so no single transaction holds locks on (or WAL for) the whole space
+        deleted_count = 0
+        while True:
+            batch = select(VectorEmbedding.id).where(VectorEmbedding.embedding_model == embedding_model_name).limit(DELETE_BATCH_ROWS)
+            result = db.execute(delete(VectorEmbedding).where(VectorEmbedding.id.in_(batch.scalar_subquery())))
+            db.commit()
+            deleted_count += result.rowcount
+            if result.rowcount < DELETE_BATCH_ROWS:
+                break
+        with self._autocommit_connection(db) as conn:
+            for quantization in ANN_EXPRESSIONS:
+                conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {space_index_name(embedding_model_name, quantization)}"))
+        with self._prepare_lock:
+            self._prepared_spaces.discard(embedding_model_name)
+        return deleted_count
+
+    def copy_file(self, db: Session, source_file_id: int, target_file_id: int) -> int:
+        # A single INSERT ... SELECT, so the vectors never leave the database
+        columns = [
+            VectorEmbedding.chunk_index, VectorEmbedding.chunk_text, VectorEmbedding.chunk_hash,
+            VectorEmbedding.char_start, VectorEmbedding.char_end,
+            VectorEmbedding.embedding, VectorEmbedding.embedding_model,
+        ]
+        source_rows = select(literal(target_file_id), *columns).where(VectorEmbedding.file_id == source_file_id)
+        stmt = insert(VectorEmbedding).from_select(
+            [VectorEmbedding.file_id, *columns], source_rows
+        )
+        result = db.execute(stmt)
+        db.commit()
+        return result.rowcount
+
+    def delete_file(self, db: Session, file_id: int) -> int:
+        stmt = delete(VectorEmbedding).where(VectorEmbedding.file_id == file_id)
+        result = db.execute(stmt)
+        db.commit()
+        return result.rowcount
+
+    def search(
+        self,
+        db: Session,
+        query_embedding: np.ndarray,
+        embedding_model_name: str,
+        limit: int = 5,
+        ef_search: Optional[int] = None,
+        probes: Optional[int] = None,
+        filters: Optional[RetrievalFilters] = None,
+    ) -> List[RetrievedChunk]:
+        # Only rows of the query's embedding space; the filter and the cast to its size select its index
+        columns = [
+            VectorEmbedding.id,
+            VectorEmbedding.file_id,
+            File.filename,
+            VectorEmbedding.chunk_index,
+            VectorEmbedding.chunk_text,
+            VectorEmbedding.char_start,
+            VectorEmbedding.char_end,
+        ]
+        distance = cast(VectorEmbedding.embedding, Vector(len(query_embedding))).cosine_distance(query_embedding)
+        scope = file_scope_conditions(filters)
+        if self.quantization == "none":
+            stmt = (
+                select(*columns, distance.label("distance"))
+                .join(File, File.id == VectorEmbedding.file_id)
+                .where(VectorEmbedding.embedding_model == embedding_model_name, *scope)
+                .order_by(distance)
+                .limit(limit)
+            )
+            if scope: # Iterative scans may return rows slightly out of order
+                ranked = stmt.subquery()
+                stmt = select(ranked).order_by(ranked.c.distance)
+            apply_ann_search_settings(db, limit=limit, ef_search=ef_search, probes=probes, filtered=bool(scope))
+        else:
+            # Candidates from the compact index, then exact cosine distance on just those rows
+            candidate_count = limit * max(1, self.rescore_factor)
+            candidates = (
+                select(*columns, distance.label("distance"))
+                .join(File, File.id == VectorEmbedding.file_id)
+                .where(VectorEmbedding.embedding_model == embedding_model_name, *scope)
+                .order_by(self._candidate_order(query_embedding))
+                .limit(candidate_count)
+                .subquery()
+            )
+            stmt = select(candidates).order_by(candidates.c.distance).limit(limit)
+            apply_ann_search_settings(db, limit=candidate_count, ef_search=ef_search, probes=probes, filtered=bool(scope))
+        return [RetrievedChunk.model_validate(row) for row in db.execute(stmt).all()]
@@ -0,0 +1,186 @@
+"""Compact vector representations for candidate search, with exact rescoring.
+
+A quantized matrix answers "which rows are probably closest" from a fraction
+of the memory of the float32 vectors:
+
+    halfvec  float16 components                    2 bytes/dim
+    int8     per-row scaled int8 components        1 byte/dim (+4 bytes/row)
+    binary   sign bits, compared by Hamming        1 bit/dim
+
+`quantized_search` scans the compact matrix for `limit * rescore_factor`
+candidates and reorders only those by exact cosine similarity against the
+full-precision rows, so ranking quality stays close to exact search while the
+full vectors can stay on disk. Vectors are expected to be unit length (the
+in-process store normalizes them on insert).
+
+In process, int8 is usually the best trade-off: NumPy converts float16 far
+more slowly than int8, so halfvec saves memory but costs scan time (on
+pgvector it is native). Binary is the smallest and fastest to scan but needs
+a larger rescore factor; see `benchmarks/bench_quantization.py`.
+"""
+
+from typing import Callable, Optional, Tuple
+
+import numpy as np
+
+QUANTIZATION_MODES = ("none", "halfvec", "int8", "binary")
+SCAN_BLOCK_ROWS = 2048 # Rows scored per block (converted blocks stay cache-resident)
+
+class QuantizedMatrix:
+    """Append-only compact copy of a row-aligned float32 matrix."""
+
+    mode = "none"
+
+    def __init__(self, dimensions: int):
+        self.dimensions = dimensions
+        self.rows = 0
+
+    def append(self, vectors: np.ndarray) -> None:
+        raise NotImplementedError
+
+    def select(self, slots: np.ndarray) -> "QuantizedMatrix":
+        """Returns a new matrix with only the given rows, in that order."""
+        raise NotImplementedError
+
+    def scores(self, query: np.ndarray, start: int, end: int) -> np.ndarray:
+        """Approximate similarity (higher is closer) of rows [start, end) to the query."""
+        raise NotImplementedError
+
+    @property
+    def nbytes(self) -> int:
+        raise NotImplementedError
+
+class HalfMatrix(QuantizedMatrix):
+    mode = "halfvec"
+
+    def __init__(self, dimensions: int):
+        super().__init__(dimensions)
+        self.data = np.empty((0, dimensions), dtype=np.float16)
+
+    def append(self, vectors: np.ndarray) -> None:
+        self.data = np.concatenate([self.data, np.asarray(vectors, dtype=np.float16)])
+        self.rows = len(self.data)
+
+    def select(self, slots: np.ndarray) -> "HalfMatrix":
+        selected = HalfMatrix(self.dimensions)
+        selected.append(self.data[slots])
+        return selected
+
+    def scores(self, query: np.ndarray, start: int, end: int) -> np.ndarray:
+        return self.data[start:end].astype(np.float32) @ query
+
+    @property
+    def nbytes(self) -> int:
+        return self.data.nbytes
+
+class Int8Matrix(QuantizedMatrix):
+    mode = "int8"
+
+    def __init__(self, dimensions: int):
+        super().__init__(dimensions)
+        self.codes = np.empty((0, dimensions), dtype=np.int8)
+        self.scales = np.empty(0, dtype=np.float32)
+
+    def append(self, vectors: np.ndarray) -> None:
+        vectors = np.asarray(vectors, dtype=np.float32)
+        scales = np.abs(vectors).max(axis=1) / 127
+        scales[scales == 0] = 1
+        self.codes = np.concatenate([self.codes, np.round(vectors / scales[:, None]).astype(np.int8)])
+        self.scales = np.concatenate([self.scales, scales.astype(np.float32)])
+        self.rows = len(self.codes)
+
+    def select(self, slots: np.ndarray) -> "Int8Matrix":
+        selected = Int8Matrix(self.dimensions)
+        selected.codes, selected.scales, selected.rows = self.codes[slots], self.scales[slots], len(slots)
+        return selected
+
+    def scores(self, query: np.ndarray, start: int, end: int) -> np.ndarray:
+        return (self.codes[start:end].astype(np.float32) @ query) * self.scales[start:end]
+
+    @property
+    def nbytes(self) -> int:
+        return self.codes.nbytes + self.scales.nbytes
+
+class BinaryMatrix(QuantizedMatrix):
+    mode = "binary"
+
+    def __init__(self, dimensions: int):
+        super().__init__(dimensions)
+        self.bits = np.empty((0, (dimensions + 7) // 8), dtype=np.uint8)
+
+    def append(self, vectors: np.ndarray) -> None:
+        self.bits = np.concatenate([self.bits, np.packbits(np.asarray(vectors) > 0, axis=1)])
+        self.rows = len(self.bits)
+
+    def select(self, slots: np.ndarray) -> "BinaryMatrix":
+        selected = BinaryMatrix(self.dimensions)
+        selected.bits, selected.rows = self.bits[slots], len(slots)
+        return selected
+
+    def scores(self, query: np.ndarray, start: int, end: int) -> np.ndarray:
+        query_bits = np.packbits(query > 0)
+        hamming = np.bitwise_count(self.bits[start:end] ^ query_bits).sum(axis=1, dtype=np.int32)
+        return -hamming.astype(np.float32)
+
+    @property
+    def nbytes(self) -> int:
+        return self.bits.nbytes
+
+def new_quantized_matrix(mode: str, dimensions: int) -> Optional[QuantizedMatrix]:
+    """Returns an empty compact matrix for the mode, or None for "none"."""
+    matrices = {"halfvec": HalfMatrix, "int8": Int8Matrix, "binary": BinaryMatrix}
+    if mode == "none":
+        return None
+    if mode not in matrices:
+        raise ValueError(f"Unsupported VECTOR_QUANTIZATION '{mode}' (expected one of {', '.join(QUANTIZATION_MODES)}).")
+    return matrices[mode](dimensions)
+
+def top_k_rows(
+    score_block: Callable[[int, int], np.ndarray],
+    rows: int,
+    k: int,
+    valid: Optional[np.ndarray] = None,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Scans rows block by block and returns (rows, scores) of the k best, best first.
+
+    `score_block(start, end)` scores a block; rows where `valid` is False are skipped.
+    """
+    best_rows, best_scores = [], []
+    for start in range(0, rows, SCAN_BLOCK_ROWS):
+        end = min(start + SCAN_BLOCK_ROWS, rows)
+        scores = np.asarray(score_block(start, end), dtype=np.float32)
+        if valid is not None:
+            scores[~valid[start:end]] = -np.inf
+        block_k = min(k, end - start)
+        top = np.argpartition(-scores, block_k - 1)[:block_k]
+        top = top[np.isfinite(scores[top])]
+        best_rows.append(top + start)
+        best_scores.append(scores[top])
+    if not best_rows:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+    rows_found, scores_found = np.concatenate(best_rows), np.concatenate(best_scores)
+    order = np.argsort(-scores_found)[:k]
+    return rows_found[order], scores_found[order]
+
+def quantized_search(
+    full: np.ndarray,
+    compact: Optional[QuantizedMatrix],
+    query: np.ndarray,
+    limit: int,
+    rescore_factor: int = 4,
+    valid: Optional[np.ndarray] = None,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Returns (rows, cosine similarities) of the `limit` closest rows, best first.
+
+    Without a compact matrix this is an exact scan of `full`; otherwise the
+    compact matrix picks `limit * rescore_factor` candidates and only those
+    rows of `full` are read and rescored exactly.
+    """
+    if compact is None:
+        return top_k_rows(lambda start, end: full[start:end] @ query, len(full), limit, valid)
+    # The compact matrix may already hold rows appended after `full` was mapped
+    candidates, _ = top_k_rows(lambda start, end: compact.scores(query, start, end), len(full), limit * max(1, rescore_factor), valid)
+    candidates = np.sort(candidates) # Sequential reads of the full-precision rows
+    exact = full[candidates] @ query
+    order = np.argsort(-exact)[:limit]
+    return candidates[order], exact[order]
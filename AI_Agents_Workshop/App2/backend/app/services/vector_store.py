@@ -1,115 +1,354 @@
-"""Service layer for interacting with the vector store (pgvector)."""
+"""Service layer for interacting with the vector store.
+
+Embedding generation happens here; storage and similarity search are
+delegated to the configured backend (pgvector, or an in-process NumPy/HNSW
+store; see `app.services.vector_backends`). Every vector belongs to an
+embedding space (model plus output dimensions): retrieval uses the active
+space, and writes also go to a space being built by the re-embedding job
+(see `app.services.reembedding`).
+"""
 
 import numpy as np
 from sqlalchemy.orm import Session
-from sqlalchemy import select, delete
-from typing import List, Optional
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+import hashlib
 import logging
+import sqlite3
+import sys
+import time
 
 # Use centralized clients
-from app.llm_clients import get_embedding_client
+from app.crud import crud_embedding_space
+from app.llm_clients import EmbeddingClientType, get_configured_embedding_space, get_embedding_client, parse_embedding_space
+from app.services.embedding_service import iter_batches, iter_embedded_batches
+from app.services.near_duplicates import SignatureIndex, get_signature_index, simhash
 
-from app.models import File, VectorEmbedding
+from app.schemas import RetrievalFilters, RetrievedChunk
+from app.services.chunking import TextChunk
+from app.services.vector_backends import get_vector_backend
 from app.config import get_settings
 
 settings = get_settings()
 logger = logging.getLogger(__name__)
 
+def get_active_space_name(db: Session) -> str:
+    """Returns the embedding space that serves retrieval (initially the configured one)."""
+    return crud_embedding_space.get_or_create_active_space(db, get_configured_embedding_space()).name
+
+def get_write_space_names(db: Session) -> List[str]:
+    """Returns the spaces new chunks are embedded into: the active one, plus any being built."""
+    active = get_active_space_name(db)
+    building = [space.name for space in crud_embedding_space.get_spaces(db, status=crud_embedding_space.BUILDING)]
+    return [active] + [name for name in building if name != active]
+
+def prepare_space_index(db: Session, embedding_model_name: str) -> None:
+    """Builds a space's ANN index if the backend needs one (re-embedding setup and startup, never the write path).
+
+    Call with no transaction open on `db` (see `VectorStore.prepare_space`).
+    Spaces named without dimensions use the model's default size, measured
+    by embedding a probe query (served from the embedding cache afterwards).
+    """
+    backend = get_vector_backend()
+    if not backend.builds_space_indexes:
+        return
+    _, dimensions = parse_embedding_space(embedding_model_name)
+    if not dimensions:
+        dimensions = len(embed_query_text("dimensions", embedding_model_name))
+    backend.prepare_space(db, embedding_model_name, dimensions)
+
+def prepare_write_space_indexes() -> None:
+    """Builds missing ANN indexes of the spaces being written to (startup; e.g. the first space of a fresh database)."""
+    from app.db.session import SessionLocal
+
+    db = SessionLocal()
+    try:
+        space_names = get_write_space_names(db)
+        db.commit() # A concurrent index build waits for open transactions
+        for space_name in space_names:
+            prepare_space_index(db, space_name)
+    except Exception as e:
+        logger.error(f"[VectorStoreService] Could not prepare ANN indexes at startup: {e}", exc_info=True)
+    finally:
+        db.close()
+
 def add_vector_embedding(
     db: Session,
     file_id: int,
     text_chunk: str,
     embedding_model_name: str
-) -> VectorEmbedding:
-    """Generates and stores a vector embedding for a text chunk associated with a file."""
+) -> int:
+    """Generates and stores a vector embedding for a text chunk associated with a file.
+
+    Returns the ID of the stored embedding.
+    """
     try:
-        # Get the client using the provided model name (logic inside get_embedding_client handles mode)
-        embedding_client = get_embedding_client() # Get client based on config
-        # Verify if the model name passed matches the client's expected model if needed, or rely on get_embedding_client logic
-        if embedding_client.model != embedding_model_name:
-             logger.warning(f"Provided model name '{embedding_model_name}' differs from client model '{embedding_client.model}'. Using client model.")
-             actual_model_name = embedding_client.model
-        else:
-            actual_model_name = embedding_model_name
-
-        embedding_result = embedding_client.create(input=[text_chunk])
-        if not embedding_result or not embedding_result.embeddings:
+        embedding_client = get_embedding_client(embedding_model_name) # The embedding space to use (model[@dimensions])
+        embedding_result = embedding_client.embed_documents([text_chunk])
+        if not embedding_result:
              raise ValueError("Embedding generation failed or returned empty result.")
-        embedding_vector = embedding_result.embeddings[0]
-        logger.info(f"Generated {len(embedding_vector)}-dim embedding using {actual_model_name}")
+        embedding_vector = embedding_result[0]
+        logger.info(f"Generated {len(embedding_vector)}-dim embedding using {embedding_model_name}")
 
     except Exception as e:
-        logger.error(f"Failed to generate embedding for file ID {file_id} using {actual_model_name}: {e}", exc_info=True)
+        logger.error(f"Failed to generate embedding for file ID {file_id} using {embedding_model_name}: {e}", exc_info=True)
+        raise
+
+    backend = get_vector_backend()
+    row = {
+        "file_id": file_id,
+        "chunk_index": None,
+        "chunk_text": text_chunk,
+        "chunk_hash": compute_chunk_hash(text_chunk),
+        "char_start": None,
+        "char_end": None,
+        "embedding": np.array(embedding_vector, dtype=np.float32),
+        "embedding_model": embedding_model_name,
+    }
+    try:
+        [embedding_id] = backend.add_embeddings(db, [row])
+        backend.commit(db)
+    except Exception:
+        backend.rollback(db)
+        raise
+    logger.info(f"[VectorStoreService] Added embedding ID {embedding_id} for file ID {file_id}")
+    return embedding_id
+
+def compute_chunk_hash(chunk_text: str) -> str:
+    """Returns the SHA-256 hex digest identifying a chunk's text."""
+    return hashlib.sha256(chunk_text.encode("utf-8")).hexdigest()
+
+def _near_duplicate_vectors(
+    db: Session,
+    texts_by_hash: Dict[str, str],
+    embedding_model_name: str,
+    index: SignatureIndex,
+) -> Tuple[Dict[str, np.ndarray], Dict[str, int]]:
+    """Finds stored vectors of near-duplicates of the given texts.
+
+    Returns {chunk hash: borrowed vector} and the SimHash signatures computed on the way.
+    """
+    signatures: Dict[str, int] = {}
+    matches: Dict[str, str] = {}
+    try:
+        for chunk_hash, text in texts_by_hash.items():
+            signature = simhash(text, settings.NEAR_DUP_MIN_WORDS)
+            if signature is None:
+                continue
+            signatures[chunk_hash] = signature
+            match = index.find(signature)
+            if match is not None and match != chunk_hash:
+                matches[chunk_hash] = match
+    except sqlite3.Error as e:
+        logger.warning(f"[VectorStoreService] Near-duplicate lookup failed, embedding instead: {e}")
+    if not matches:
+        return {}, signatures
+    stored = get_vector_backend().vectors_by_chunk_hash(db, set(matches.values()), embedding_model_name)
+    return {chunk_hash: stored[match] for chunk_hash, match in matches.items() if match in stored}, signatures
+
+def _vectors_for_group(
+    db: Session,
+    group: Sequence[TextChunk],
+    hashes: Sequence[str],
+    embedding_model_name: str,
+    embedding_client: EmbeddingClientType,
+) -> Tuple[Dict[str, np.ndarray], int, int]:
+    """Returns {chunk hash: vector} in one space for a group of chunks, and how many were reused.
+
+    Reuse counts are (same text, near-duplicate text; see `near_duplicates`).
+    """
+    vectors_by_hash = get_vector_backend().vectors_by_chunk_hash(db, set(hashes), embedding_model_name)
+    reused_count = sum(1 for chunk_hash in hashes if chunk_hash in vectors_by_hash)
+
+    # Embed each unknown text once, even if it repeats within the group
+    to_embed = {}
+    for chunk, chunk_hash in zip(group, hashes):
+        if chunk_hash not in vectors_by_hash:
+            to_embed.setdefault(chunk_hash, chunk.text)
+
+    near_duplicate_count = 0
+    index = get_signature_index()
+    if index is not None:
+        texts_by_hash = {chunk_hash: chunk.text for chunk, chunk_hash in zip(group, hashes)}
+        borrowed, signatures = _near_duplicate_vectors(db, {h: texts_by_hash[h] for h in to_embed}, embedding_model_name, index)
+        for chunk_hash, vector in borrowed.items():
+            vectors_by_hash[chunk_hash] = vector
+            del to_embed[chunk_hash]
+        near_duplicate_count = sum(1 for chunk_hash in hashes if chunk_hash in borrowed)
+
+    for batch, vectors in iter_embedded_batches(
+        list(to_embed.items()), get_text=lambda item: item[1], embedding_client=embedding_client
+    ):
+        for (chunk_hash, _), vector in zip(batch, vectors):
+            vectors_by_hash[chunk_hash] = np.array(vector, dtype=np.float32)
+
+    if index is not None:
+        # Index texts with their own vectors (embedded now or before), never the borrowers
+        items = []
+        for chunk_hash, text in texts_by_hash.items():
+            if chunk_hash in borrowed:
+                continue
+            signature = signatures[chunk_hash] if chunk_hash in signatures else simhash(text, settings.NEAR_DUP_MIN_WORDS)
+            if signature is not None:
+                items.append((chunk_hash, signature))
+        try:
+            index.add_many(items)
+        except sqlite3.Error as e:
+            logger.warning(f"[VectorStoreService] Could not index chunk signatures: {e}")
+    return vectors_by_hash, reused_count, near_duplicate_count
+
+def add_vector_embeddings_bulk(
+    db: Session,
+    file_id: int,
+    text_chunks: Iterable[TextChunk],
+    on_progress: Optional[Callable[[int], None]] = None,
+    spaces: Optional[List[str]] = None,
+    on_reuse: Optional[Callable[[int, int], None]] = None,
+) -> int:
+    """Embeds many text chunks in batches and stores them in a single transaction.
+
+    Chunks are embedded into every space that takes writes (see
+    `get_write_space_names`), or only into `spaces`. Chunks whose text hash
+    already has a vector in a space (e.g. the unchanged parts of a re-uploaded,
+    edited file) reuse that vector, as do near-duplicates of embedded chunks
+    (boilerplate; see `near_duplicates`); the rest are embedded with bounded batch
+    size and concurrency (see `embedding_service`). Each group is staged in the
+    backend together with the chunk text, offsets and hash (one multi-row
+    INSERT on pgvector), and the whole file is committed once at the end.
+    Nothing is persisted if any batch fails.
+    `on_progress` is called with the number of chunks written after each group;
+    an exception raised from it (e.g. job cancellation) aborts the transaction.
+    `on_reuse` is called with the numbers of vectors reused by hash and by
+    near-duplicate match in each group. Returns the number of chunks stored.
+    """
+    spaces = spaces or get_write_space_names(db)
+    embedding_clients = {space: get_embedding_client(space) for space in spaces}
+    backend = get_vector_backend()
+    # Look up known hashes for as many chunks as can be in flight at once
+    group_size = settings.EMBEDDING_BATCH_SIZE * max(1, settings.EMBEDDING_MAX_CONCURRENCY)
+    stored_count = 0
+    reused_count = 0
+    near_duplicate_count = 0
+    started = time.perf_counter()
+    try:
+        for group in iter_batches(text_chunks, get_text=lambda chunk: chunk.text, max_items=group_size, max_tokens=sys.maxsize):
+            hashes = [compute_chunk_hash(chunk.text) for chunk in group]
+            for space, embedding_client in embedding_clients.items():
+                vectors_by_hash, reused, near_duplicates = _vectors_for_group(db, group, hashes, space, embedding_client)
+                reused_count += reused
+                near_duplicate_count += near_duplicates
+                if on_reuse:
+                    on_reuse(reused, near_duplicates)
+                rows = [
+                    {
+                        "file_id": file_id,
+                        "chunk_index": chunk.index,
+                        "chunk_text": chunk.text,
+                        "chunk_hash": chunk_hash,
+                        "char_start": chunk.char_start,
+                        "char_end": chunk.char_end,
+                        "embedding": vectors_by_hash[chunk_hash],
+                        "embedding_model": space,
+                    }
+                    for chunk, chunk_hash in zip(group, hashes)
+                ]
+                backend.add_embeddings(db, rows)
+            stored_count += len(group)
+            if on_progress:
+                on_progress(len(group))
+        backend.commit(db)
+    except Exception:
+        backend.rollback(db)
+        logger.error(f"Bulk embedding failed for file ID {file_id}; rolled back {stored_count} pending chunks.", exc_info=True)
         raise
 
-    db_embedding = VectorEmbedding(
-        file_id=file_id,
-        embedding=np.array(embedding_vector, dtype=np.float32),
-        embedding_model=actual_model_name # Store the model actually used
+    elapsed = time.perf_counter() - started
+    rate = stored_count / elapsed if elapsed > 0 else float("inf")
+    logger.info(
+        f"[VectorStoreService] Stored {stored_count} chunks ({reused_count} vectors reused by chunk hash, "
+        f"{near_duplicate_count} from near-duplicates) "
+        f"for file ID {file_id} in {elapsed:.2f}s ({rate:.1f} chunks/s) using {', '.join(spaces)}"
     )
-    db.add(db_embedding)
-    db.commit()
-    db.refresh(db_embedding)
-    logger.info(f"[VectorStoreService] Added embedding ID {db_embedding.id} for file ID {file_id}")
-    return db_embedding
+    return stored_count
+
+def copy_vector_embeddings(db: Session, source_file_id: int, target_file_id: int) -> int:
+    """Copies all embeddings (vectors, chunk text, offsets) of one file to another.
+
+    Used when an upload's content hash matches an already vectorized file; on
+    pgvector it is a single INSERT ... SELECT, so the vectors never leave the
+    database.
+    """
+    copied_count = get_vector_backend().copy_file(db, source_file_id, target_file_id)
+    logger.info(f"[VectorStoreService] Copied {copied_count} embeddings from file ID {source_file_id} to file ID {target_file_id}")
+    return copied_count
 
 def delete_vector_embeddings_for_file(db: Session, file_id: int) -> int:
     """Deletes all vector embeddings associated with a specific file ID."""
-    stmt = delete(VectorEmbedding).where(VectorEmbedding.file_id == file_id)
-    result = db.execute(stmt)
-    db.commit()
-    deleted_count = result.rowcount
+    deleted_count = get_vector_backend().delete_file(db, file_id)
     logger.info(f"[VectorStoreService] Deleted {deleted_count} embeddings for file ID {file_id}")
     return deleted_count
 
-def find_similar_embeddings(
-    db: Session,
-    query_text: str,
-    # embedding_model_name: str, # No longer needed, use the configured client
-    limit: int = 5
-) -> List[VectorEmbedding]:
-    """Finds vector embeddings similar to the query text using the configured OpenAI model."""
-    # embedding_model_name = "unknown" # No longer needed as default
-    query_embedding_np = None
+def embed_query_text(query_text: str, embedding_model_name: Optional[str] = None) -> np.ndarray:
+    """Embeds a search query in the given embedding space (default: the configured one)."""
+    embedding_model_name = embedding_model_name or get_configured_embedding_space()
     try:
-        embedding_client = get_embedding_client() # Get configured OpenAI client
-        embedding_model_name = embedding_client.model # Get model name from client
+        embedding_client = get_embedding_client(embedding_model_name)
 
         # Langchain Embeddings use embed_query for single strings
         query_embedding = embedding_client.embed_query(query_text)
-        
+
         if not query_embedding:
              # Log error and re-raise or return empty? Re-raising is clearer.
              logger.error(f"Query embedding generation returned empty result for model {embedding_model_name}")
              raise ValueError("Query embedding generation failed or returned empty result.")
-             
-        query_embedding_np = np.array(query_embedding, dtype=np.float32)
+
         logger.info(f"Generated {len(query_embedding)}-dim query embedding using {embedding_model_name}")
+        return np.array(query_embedding, dtype=np.float32)
 
     except Exception as e:
-        # Log the error using the model name if available
-        logger.error(f"Failed to generate query embedding using {embedding_model_name if 'embedding_model_name' in locals() else 'configured OpenAI model'}: {e}", exc_info=True)
-        # return [] # Don't just return empty, raise the error
+        logger.error(f"Failed to generate query embedding using {embedding_model_name}: {e}", exc_info=True)
         raise # Re-raise the exception to signal failure
 
-    # This part only runs if embedding succeeded
-    # Ensure the search uses the same model embeddings that the client is configured for
-    # This where clause might be redundant now if only one model is ever used, but harmless
-    stmt = (
-        select(VectorEmbedding)
-        .where(VectorEmbedding.embedding_model == embedding_model_name)
-        .order_by(VectorEmbedding.embedding.cosine_distance(query_embedding_np))
-        .limit(limit)
+def search_by_vector(
+    db: Session,
+    query_embedding: np.ndarray,
+    embedding_model_name: str,
+    limit: int = 5,
+    ef_search: Optional[int] = None,
+    probes: Optional[int] = None,
+    filters: Optional[RetrievalFilters] = None,
+) -> List[RetrievedChunk]:
+    """Returns the chunks nearest to a query vector (among those the filters allow), ordered by cosine distance."""
+    return get_vector_backend().search(
+        db, query_embedding, embedding_model_name, limit=limit, ef_search=ef_search, probes=probes, filters=filters
     )
 
-    results = db.execute(stmt).scalars().all()
+def find_similar_embeddings(
+    db: Session,
+    query_text: str,
+    # embedding_model_name: str, # No longer needed, use the configured client
+    limit: int = 5,
+    ef_search: Optional[int] = None,
+    probes: Optional[int] = None,
+    filters: Optional[RetrievalFilters] = None,
+) -> List[RetrievedChunk]:
+    """Finds chunks similar to the query text in the active embedding space.
+
+    Returns a projection (id, file, chunk text, offsets, distance) rather than
+    ORM objects, so the stored vectors are never sent back or deserialized.
+    `ef_search` (HNSW) and `probes` (IVFFlat, pgvector only) tune the
+    recall/latency trade-off of the ANN index for this query only. `filters`
+    (file IDs, media types, upload date range, tags) are applied inside the
+    search, before the top `limit` rows are picked.
+    """
+    embedding_model_name = get_active_space_name(db)
+    query_embedding_np = embed_query_text(query_text, embedding_model_name)
+    results = search_by_vector(
+        db, query_embedding_np, embedding_model_name, limit=limit, ef_search=ef_search, probes=probes, filters=filters
+    )
     logger.info(f"[VectorStoreService] Found {len(results)} similar embeddings for query.")
     return results
 
 # TODO:
-# - Handle chunking properly: Associate embeddings with specific chunks/metadata.
-# - Consider indexing strategies (e.g., HNSW index on the embedding column).
 # - Refine error handling for embedding generation.
 # - Implement actual embedding generation using Pydantic AI / configured models.
-# - Consider indexing strategies for performance (e.g., HNSW index on the embedding column).
 # - Decide on distance metric (Cosine, L2, Inner Product) and ensure consistency. 
\ No newline at end of file
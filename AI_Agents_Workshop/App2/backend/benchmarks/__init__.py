@@ -0,0 +1,4 @@
+"""Offline benchmarks for the knowledge-base ingestion and retrieval pipeline.
+
+Run from the `backend` directory, e.g. `python -m benchmarks.bench_ingestion`.
+"""
@@ -0,0 +1,105 @@
+"""Benchmark: fixed character windows vs. token-aware recursive chunking.
+
+Extracts real documents with the ingestion extractors and chunks each one
+twice: with the previous fixed 1000-character / 100-overlap windows
+(`chunking.iter_fixed_chunks`) and with the token-budgeted, boundary-aware
+splitter used for ingestion (`chunking.iter_chunks`, budgets from settings
+or the flags below). For both it reports the chunk count, the embedding
+requests the bulk embedder would send (`embedding_service.iter_batches`
+with the configured batch limits), the tokens sent for embedding (overlap
+counted every time it is repeated), and the share of chunks that end on a
+sentence, line or paragraph boundary rather than mid-sentence.
+
+Token counts use the configured tokenizer (tiktoken when available, else
+the characters-per-token estimate); the tokenizer used is part of the output.
+
+Usage (from the `backend` directory):
+    python -m benchmarks.bench_chunking knowledgebase/*.pdf "../../../Live_TTX_O&G/network.md"
+"""
+
+import argparse
+import glob
+import json
+import os
+import time
+from typing import Dict, List
+
+from app.config import get_settings
+from app.services.chunking import TextChunk, get_chunk_params, iter_chunks, iter_fixed_chunks
+from app.services.embedding_service import iter_batches
+from app.services.file_processor import detect_file_kind, extract_text
+from app.services.tokenizer import get_tokenizer
+
+settings = get_settings()
+
+SENTENCE_ENDINGS = (".", "!", "?", ":", ";", '"', ")")
+
+def chunk_stats(chunks: List[TextChunk], text: str, seconds: float) -> Dict:
+    tokenizer = get_tokenizer()
+    token_counts = [tokenizer.count(chunk.text) for chunk in chunks]
+    at_boundary = sum(
+        1 for chunk in chunks
+        if chunk.text.rstrip().endswith(SENTENCE_ENDINGS) or text[chunk.char_end:chunk.char_end + 1] in ("", "\n")
+    )
+    return {
+        "chunks": len(chunks),
+        "embedding_requests": sum(1 for _ in iter_batches(chunks, get_text=lambda chunk: chunk.text)),
+        "tokens_embedded": sum(token_counts),
+        "mean_tokens_per_chunk": round(sum(token_counts) / max(1, len(chunks)), 1),
+        "max_tokens_per_chunk": max(token_counts, default=0),
+        "ends_at_boundary_pct": round(100 * at_boundary / max(1, len(chunks)), 1),
+        "chunking_seconds": round(seconds, 3),
+    }
+
+def bench_file(path: str, chunk_tokens: int, overlap_tokens: int) -> Dict:
+    media_type = "text/plain" if path.lower().endswith((".md", ".txt")) else None
+    text = extract_text(path, media_type)
+    default_tokens, default_overlap = get_chunk_params(media_type, detect_file_kind(path, media_type))
+    chunk_tokens = chunk_tokens or default_tokens
+    overlap_tokens = default_overlap if overlap_tokens is None else overlap_tokens
+
+    started = time.perf_counter()
+    fixed = [chunk for chunk in iter_fixed_chunks([text]) if chunk.text.strip()]
+    fixed_s = time.perf_counter() - started
+    started = time.perf_counter()
+    recursive = list(iter_chunks([text], chunk_tokens, overlap_tokens))
+    recursive_s = time.perf_counter() - started
+
+    baseline, result = chunk_stats(fixed, text, fixed_s), chunk_stats(recursive, text, recursive_s)
+    return {
+        "file": os.path.basename(path),
+        "characters": len(text),
+        "chunk_tokens": chunk_tokens,
+        "overlap_tokens": overlap_tokens,
+        "fixed_1000_chars": baseline,
+        "recursive": result,
+        "chunk_reduction_pct": round(100 * (1 - result["chunks"] / max(1, baseline["chunks"])), 1),
+        "embedding_request_reduction_pct": round(100 * (1 - result["embedding_requests"] / max(1, baseline["embedding_requests"])), 1),
+        "embedded_token_reduction_pct": round(100 * (1 - result["tokens_embedded"] / max(1, baseline["tokens_embedded"])), 1),
+    }
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("paths", nargs="*", help="Documents to chunk (default: the knowledge base).")
+    parser.add_argument("--chunk-tokens", type=int, default=None, help="Token budget per chunk (default: settings).")
+    parser.add_argument("--overlap-tokens", type=int, default=None, help="Overlap tokens (default: settings).")
+    args = parser.parse_args()
+
+    paths = args.paths or sorted(glob.glob(os.path.join(settings.KNOWLEDGE_BASE_PATH, "*")))
+    results = [bench_file(path, args.chunk_tokens, args.overlap_tokens) for path in paths]
+    keys = ("chunks", "embedding_requests", "tokens_embedded")
+    fixed_totals = {key: sum(result["fixed_1000_chars"][key] for result in results) for key in keys}
+    recursive_totals = {key: sum(result["recursive"][key] for result in results) for key in keys}
+    print(json.dumps({
+        "tokenizer": get_tokenizer().name,
+        "files": results,
+        "total": {
+            "fixed_1000_chars": fixed_totals,
+            "recursive": recursive_totals,
+            "chunk_reduction_pct": round(100 * (1 - recursive_totals["chunks"] / max(1, fixed_totals["chunks"])), 1),
+            "embedding_request_reduction_pct": round(100 * (1 - recursive_totals["embedding_requests"] / max(1, fixed_totals["embedding_requests"])), 1),
+        },
+    }, indent=2))
+
+if __name__ == "__main__":
+    main()
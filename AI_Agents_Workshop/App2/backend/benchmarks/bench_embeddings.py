@@ -0,0 +1,107 @@
+"""Benchmark: local CPU embedders vs. the remote embedding path.
+
+Measures, for each embedding client, bulk document throughput through the
+ingestion path (`iter_embedded_batches`: size/token-bounded batches with
+EMBEDDING_MAX_CONCURRENCY requests in flight) and the latency of single
+query embeddings. Clients are used without the embedding cache, so every
+call is computed.
+
+Clients compared:
+
+    hashing  the deterministic hashing embedder (always run)
+    onnx     the local ONNX model in --onnx-model (or LOCAL_EMBEDDING_MODEL_PATH);
+             skipped if neither is set
+    remote   a simulated endpoint with a fixed round trip and per-input cost
+             (as in bench_ingestion), or the configured OpenAI client with
+             --live (requires OPENAI_API_KEY)
+
+Usage (from the `backend` directory):
+    python -m benchmarks.bench_embeddings --chunks 2000 --onnx-model ./models/bge-small-en-v1.5 --threads 4
+"""
+
+import argparse
+import json
+import random
+import statistics
+import time
+from typing import Dict, List
+
+from app.config import get_settings
+from app.services.embedding_service import iter_embedded_batches
+from app.services.local_embeddings import HashingEmbeddings, OnnxEmbeddings
+from benchmarks.bench_ingestion import SimulatedEmbeddings
+
+VOCABULARY = (
+    "plc hmi scada historian firmware modbus dnp3 profinet ethernet switch vlan firewall segment "
+    "engineering workstation patch vulnerability advisory incident response operator setpoint alarm "
+    "pump valve turbine breaker relay substation safety instrumented system procedure backup restore"
+).split()
+
+def synthetic_texts(count: int, words: int, seed: int = 0) -> List[str]:
+    """Chunk-like texts of roughly `words` words drawn from an OT vocabulary."""
+    rng = random.Random(seed)
+    return [" ".join(rng.choices(VOCABULARY, k=max(1, int(words * rng.uniform(0.5, 1.5))))) for _ in range(count)]
+
+def run_client(client, texts: List[str], queries: List[str]) -> Dict:
+    """Document throughput through the ingestion batching, then sequential query latencies."""
+    started = time.perf_counter()
+    for _ in iter_embedded_batches(texts, embedding_client=client):
+        pass
+    documents_s = time.perf_counter() - started
+
+    latencies = []
+    for query in queries:
+        query_started = time.perf_counter()
+        client.embed_query(query)
+        latencies.append((time.perf_counter() - query_started) * 1000)
+    latencies.sort()
+    return {
+        "model": client.model,
+        "documents_seconds": round(documents_s, 3),
+        "documents_per_second": round(len(texts) / documents_s, 1) if documents_s else None,
+        "query_p50_ms": round(statistics.median(latencies), 2),
+        "query_p95_ms": round(latencies[min(len(latencies) - 1, int(0.95 * len(latencies)))], 2),
+    }
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", type=int, default=1000, help="Number of document chunks to embed.")
+    parser.add_argument("--chunk-words", type=int, default=150, help="Average words per chunk.")
+    parser.add_argument("--queries", type=int, default=50, help="Number of single query embeddings timed.")
+    parser.add_argument("--hashing-dimensions", type=int, default=256, help="Hashing embedder vector size.")
+    parser.add_argument("--onnx-model", default=None, help="ONNX model directory (default: LOCAL_EMBEDDING_MODEL_PATH).")
+    parser.add_argument("--threads", type=int, default=None, help="ONNX Runtime threads per request (default: all cores).")
+    parser.add_argument("--batch-size", type=int, default=32, help="ONNX texts per forward pass.")
+    parser.add_argument("--rtt-ms", type=float, default=80.0, help="Simulated remote request round trip.")
+    parser.add_argument("--per-item-ms", type=float, default=0.5, help="Simulated remote per-input cost.")
+    parser.add_argument("--live", action="store_true", help="Use the configured OpenAI client as the remote path.")
+    args = parser.parse_args()
+
+    settings = get_settings()
+    texts = synthetic_texts(args.chunks, args.chunk_words)
+    queries = synthetic_texts(args.queries, 12, seed=1)
+
+    clients = {"hashing": HashingEmbeddings(args.hashing_dimensions)}
+    onnx_model = args.onnx_model or settings.LOCAL_EMBEDDING_MODEL_PATH
+    if onnx_model:
+        clients["onnx"] = OnnxEmbeddings(onnx_model, threads=args.threads, batch_size=args.batch_size)
+    if args.live:
+        from app.llm_clients import create_base_embedding_client, embedding_space_name
+        clients["remote"] = create_base_embedding_client(
+            embedding_space_name(settings.OPENAI_EMBEDDING_MODEL, settings.EMBEDDING_DIMENSIONS)
+        )
+    else:
+        clients["remote"] = SimulatedEmbeddings(args.rtt_ms, args.per_item_ms)
+
+    results = {name: run_client(client, texts, queries) for name, client in clients.items()}
+    print(json.dumps({
+        "chunks": args.chunks,
+        "chunk_words": args.chunk_words,
+        "queries": args.queries,
+        "embedding_max_concurrency": settings.EMBEDDING_MAX_CONCURRENCY,
+        "remote": "live" if args.live else f"simulated ({args.rtt_ms} ms round trip, {args.per_item_ms} ms per input)",
+        "results": results,
+    }, indent=2))
+
+if __name__ == "__main__":
+    main()
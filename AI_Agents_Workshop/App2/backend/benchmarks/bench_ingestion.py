@@ -0,0 +1,93 @@
+"""Benchmark: per-chunk vs. bulk embedding ingestion throughput.
+
+Compares the old ingestion loop (one single-item embedding request plus one
+commit per chunk) with the bulk path used by
+`vector_store.add_vector_embeddings_bulk` (size/token-bounded batches sent with
+bounded concurrency, one commit per file).
+
+By default it runs offline against a simulated embedding endpoint whose cost is
+a fixed round-trip latency plus a small per-input cost, and a simulated commit
+latency, so the numbers reflect request/commit overhead rather than any one
+network. Pass `--live` to use the configured OpenAI client instead (requires
+OPENAI_API_KEY; the commit cost is still simulated).
+
+Usage (from the `backend` directory):
+    python -m benchmarks.bench_ingestion --chunks 1200 --rtt-ms 80 --commit-ms 3
+"""
+
+import argparse
+import json
+import time
+from typing import List
+
+from app.services.embedding_service import iter_embedded_batches
+
+class SimulatedEmbeddings:
+    """Stand-in embedding client with a fixed per-request and per-input cost."""
+
+    model = "simulated-embedding"
+
+    def __init__(self, rtt_ms: float, per_item_ms: float, dimensions: int = 1536):
+        self.rtt = rtt_ms / 1000
+        self.per_item = per_item_ms / 1000
+        self.dimensions = dimensions
+        self.requests = 0
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        self.requests += 1
+        time.sleep(self.rtt + self.per_item * len(texts))
+        return [[0.0] * self.dimensions for _ in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+def run_per_chunk(client, chunks: List[str], commit_s: float) -> float:
+    """The old loop: one request and one commit per chunk."""
+    started = time.perf_counter()
+    for chunk in chunks:
+        client.embed_documents([chunk])
+        time.sleep(commit_s)
+    return time.perf_counter() - started
+
+def run_bulk(client, chunks: List[str], commit_s: float) -> float:
+    """The bulk path: batched concurrent requests, one commit per file."""
+    started = time.perf_counter()
+    for _ in iter_embedded_batches(chunks, embedding_client=client):
+        pass
+    time.sleep(commit_s)
+    return time.perf_counter() - started
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", type=int, default=600, help="Number of chunks in the simulated file.")
+    parser.add_argument("--chunk-chars", type=int, default=1000, help="Characters per chunk.")
+    parser.add_argument("--rtt-ms", type=float, default=80.0, help="Simulated embedding request round trip.")
+    parser.add_argument("--per-item-ms", type=float, default=0.5, help="Simulated per-input embedding cost.")
+    parser.add_argument("--commit-ms", type=float, default=3.0, help="Simulated cost of one DB commit+refresh.")
+    parser.add_argument("--live", action="store_true", help="Use the configured embedding client instead.")
+    args = parser.parse_args()
+
+    if args.live:
+        from app.llm_clients import get_embedding_client
+        client = get_embedding_client()
+    else:
+        client = SimulatedEmbeddings(args.rtt_ms, args.per_item_ms)
+
+    chunks = [f"chunk {i} " + "x" * args.chunk_chars for i in range(args.chunks)]
+    commit_s = args.commit_ms / 1000
+
+    per_chunk_s = run_per_chunk(client, chunks, commit_s)
+    bulk_s = run_bulk(client, chunks, commit_s)
+
+    print(json.dumps({
+        "chunks": args.chunks,
+        "client": client.model,
+        "per_chunk_seconds": round(per_chunk_s, 3),
+        "per_chunk_chunks_per_s": round(args.chunks / per_chunk_s, 1),
+        "bulk_seconds": round(bulk_s, 3),
+        "bulk_chunks_per_s": round(args.chunks / bulk_s, 1),
+        "speedup": round(per_chunk_s / bulk_s, 1),
+    }, indent=2))
+
+if __name__ == "__main__":
+    main()
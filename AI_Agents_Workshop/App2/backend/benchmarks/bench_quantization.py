@@ -0,0 +1,93 @@
+"""Benchmark: storage, latency and recall@k of quantized vector search.
+
+Runs the in-process search path (`vector_backends.quantization`) over the
+same vectors in each storage mode - exact float32, halfvec, int8 and binary,
+each rescoring `limit * rescore_factor` candidates at full precision - and
+reports bytes per vector, total compact size, query latency and recall@k
+against exact search. halfvec and binary use the same representations as the
+pgvector expression indexes (alembic revision 8e3a6c1f9d52), so their recall
+carries over; their latency there also depends on the HNSW index.
+
+By default the vectors are synthetic, clustered unit vectors shaped like
+text embeddings. Pass `--vectors file.npy` to use real embeddings (an
+(N, dim) array); queries are then perturbed copies of random rows.
+
+Usage (from the `backend` directory):
+    python -m benchmarks.bench_quantization --rows 50000 --queries 200 --k 5
+"""
+
+import argparse
+import json
+import time
+
+import numpy as np
+
+from app.services.vector_backends.numpy_store import normalize_rows
+from app.services.vector_backends.quantization import new_quantized_matrix, quantized_search
+
+def synthetic_vectors(rows: int, dimensions: int, clusters: int, seed: int) -> np.ndarray:
+    """Unit vectors scattered around random topic centroids."""
+    rng = np.random.default_rng(seed)
+    centroids = rng.standard_normal((clusters, dimensions)).astype(np.float32)
+    assignments = rng.integers(0, clusters, rows)
+    vectors = centroids[assignments] + 1.5 * rng.standard_normal((rows, dimensions)).astype(np.float32)
+    return normalize_rows(vectors)
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=20000, help="Synthetic vectors to index.")
+    parser.add_argument("--dimensions", type=int, default=1536)
+    parser.add_argument("--clusters", type=int, default=200, help="Synthetic topic clusters.")
+    parser.add_argument("--vectors", help="Optional .npy file of real embeddings to use instead.")
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--k", type=int, default=5, help="Results per query (recall@k).")
+    parser.add_argument("--rescore-factors", default="1,4,10", help="Comma-separated candidate multipliers to try.")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    if args.vectors:
+        full = normalize_rows(np.load(args.vectors))
+    else:
+        full = synthetic_vectors(args.rows, args.dimensions, args.clusters, args.seed)
+    picks = rng.integers(0, len(full), args.queries)
+    queries = normalize_rows(full[picks] + 0.05 * rng.standard_normal((args.queries, full.shape[1])).astype(np.float32))
+
+    def run(compact, rescore_factor):
+        latencies, results = [], []
+        for query in queries:
+            started = time.perf_counter()
+            rows, _ = quantized_search(full, compact, query, args.k, rescore_factor)
+            latencies.append((time.perf_counter() - started) * 1000)
+            results.append(set(rows.tolist()))
+        return latencies, results
+
+    exact_latencies, exact_results = run(None, 1)
+    report = [{
+        "mode": "none (float32)",
+        "bytes_per_vector": full.shape[1] * 4,
+        "total_mb": round(full.nbytes / 2**20, 1),
+        "mean_ms": round(float(np.mean(exact_latencies)), 2),
+        "p95_ms": round(float(np.percentile(exact_latencies, 95)), 2),
+        f"recall@{args.k}": 1.0,
+    }]
+    for mode in ("halfvec", "int8", "binary"):
+        compact = new_quantized_matrix(mode, full.shape[1])
+        compact.append(full)
+        for rescore_factor in (int(value) for value in args.rescore_factors.split(",")):
+            latencies, results = run(compact, rescore_factor)
+            recall = np.mean([len(found & exact) / max(1, len(exact)) for found, exact in zip(results, exact_results)])
+            report.append({
+                "mode": mode,
+                "rescore_factor": rescore_factor,
+                "bytes_per_vector": round(compact.nbytes / len(full), 1),
+                "total_mb": round(compact.nbytes / 2**20, 1),
+                "mean_ms": round(float(np.mean(latencies)), 2),
+                "p95_ms": round(float(np.percentile(latencies, 95)), 2),
+                f"recall@{args.k}": round(float(recall), 3),
+            })
+
+    print(json.dumps({"rows": len(full), "dimensions": full.shape[1], "queries": args.queries, "results": report}, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,224 @@
+"""Benchmark: retrieval quality and latency per chunking and index configuration.
+
+Builds a corpus - synthetic OT documents plus the tabletop-exercise markdown
+and transcripts in the repository (`Live_TTX_*`) - and, for every chunk size
+in --chunk-tokens, chunks it with `chunking.chunk_text_with_offsets`, embeds
+the chunks once and loads them into a fresh in-process vector store per
+configuration:
+
+    numpy/none, numpy/halfvec, numpy/int8, numpy/binary
+                     exact or quantized search with exact rescoring
+    hnsw/ef=<n>      hnswlib graphs, one run per --ef-search value
+                     (needs the optional `hnswlib` package; skipped otherwise)
+
+Queries are word windows cut from random documents (with --query-drop of the
+words removed, so they are not verbatim). Each configuration reports:
+
+    build_seconds        adding and committing all chunk vectors (graphs included)
+    recall_at_k          overlap with the exact top-k by cosine similarity over
+                         the same vectors (index/quantization quality)
+    mrr, hit_rate_at_k   rank of the first chunk containing the query's source
+                         span (chunking + embedding + index quality)
+    latency_ms           p50/p95/p99 of `VectorStore.search` (query embedding excluded)
+
+Embeddings come from `llm_clients.create_base_embedding_client(--space)`;
+the default hashing space runs offline, an ONNX or OpenAI space measures a
+real model. Postgres-backed configurations (pgvector, hybrid fusion) need a
+live database and are not built here. Results are printed and, with
+--output, written to a JSON file.
+
+Usage (from the `backend` directory):
+    python -m benchmarks.bench_retrieval --chunk-tokens 256 512 --queries 300 --k 5 --output retrieval.json
+"""
+
+import argparse
+import glob
+import json
+import os
+import random
+import re
+import tempfile
+import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import Session
+
+from app.llm_clients import create_base_embedding_client
+from app.services.chunking import chunk_text_with_offsets
+from app.services.embedding_service import iter_embedded_batches
+from app.services.vector_backends.hnsw_store import HnswVectorStore
+from app.services.vector_backends.numpy_store import NumpyVectorStore, normalize_rows
+from app.services.vector_store import compute_chunk_hash
+from benchmarks.bench_embeddings import VOCABULARY
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "..", ".."))
+QUANTIZATIONS = ("none", "halfvec", "int8", "binary")
+
+def synthetic_documents(count: int, words: int, seed: int = 0) -> List[str]:
+    """Documents of short sentences, each drawing mostly from its own topic words."""
+    rng = random.Random(seed)
+    documents = []
+    for _ in range(count):
+        topic = rng.sample(VOCABULARY, 12)
+        sentences, total = [], 0
+        while total < words:
+            length = rng.randint(8, 20)
+            sentence = [rng.choice(topic) if rng.random() < 0.7 else rng.choice(VOCABULARY) for _ in range(length)]
+            sentence.append(f"{rng.choice(['plc', 'rtu', 'hmi', 'fw'])}-{rng.randint(100, 999)}") # Asset-like identifiers
+            sentences.append(" ".join(sentence).capitalize() + ".")
+            total += length + 1
+        documents.append(" ".join(sentences))
+    return documents
+
+def ttx_documents(root: str) -> List[Tuple[str, str]]:
+    """(relative path, text) of the Live_TTX_* markdown and transcripts under `root`."""
+    paths = sorted(
+        path for pattern in ("Live_TTX_*/**/*.md", "Live_TTX_*/**/*.txt")
+        for path in glob.glob(os.path.join(root, pattern), recursive=True)
+    )
+    documents = []
+    for path in paths:
+        with open(path, encoding="utf-8", errors="replace") as f:
+            documents.append((os.path.relpath(path, root), f.read()))
+    return documents
+
+def make_queries(documents: List[str], count: int, words: int, drop: float, seed: int) -> List[Tuple[str, int, int, int]]:
+    """(query text, document index, span start, span end) cut from random documents, longer ones more often."""
+    rng = random.Random(seed)
+    spans = []
+    for doc_id, document in enumerate(documents):
+        spans.append([(match.start(), match.end()) for match in re.finditer(r"\S+", document)])
+    weights = [len(doc_spans) for doc_spans in spans]
+    queries = []
+    while len(queries) < count:
+        doc_id = rng.choices(range(len(documents)), weights=weights)[0]
+        if len(spans[doc_id]) < words:
+            continue
+        first = rng.randrange(len(spans[doc_id]) - words + 1)
+        window = spans[doc_id][first:first + words]
+        kept = [documents[doc_id][start:end] for start, end in window if rng.random() >= drop] or [documents[doc_id][window[0][0]:window[0][1]]]
+        queries.append((" ".join(kept), doc_id, window[0][0], window[-1][1]))
+    return queries
+
+def relevant_rows(chunks: List[Dict], doc_id: int, start: int, end: int) -> set:
+    """Rows of the chunks holding a query's source span; overlapping ones if none holds all of it."""
+    holding = {i for i, chunk in enumerate(chunks) if chunk["file_id"] == doc_id and chunk["char_start"] <= start and chunk["char_end"] >= end}
+    return holding or {i for i, chunk in enumerate(chunks) if chunk["file_id"] == doc_id and chunk["char_start"] < end and chunk["char_end"] > start}
+
+def percentile(values: List[float], q: float) -> float:
+    return round(float(np.percentile(values, q)), 3)
+
+def run_configuration(
+    store: NumpyVectorStore, db: Session, chunks: List[Dict], space: str,
+    query_vectors: np.ndarray, exact: np.ndarray, relevant: List[set], k: int, ef_search: Optional[int],
+) -> Dict:
+    """Builds `store` from the chunks (one commit per document, as ingestion does) and runs every query."""
+    row_by_id = {}
+    started = time.perf_counter()
+    for doc_id in sorted({chunk["file_id"] for chunk in chunks}):
+        rows = [row for row, chunk in enumerate(chunks) if chunk["file_id"] == doc_id]
+        row_by_id.update(zip(store.add_embeddings(db, [chunks[row] for row in rows]), rows))
+        store.commit(db)
+    store.flush() # hnsw: the deferred graph checkpoint
+    build_seconds = time.perf_counter() - started
+
+    latencies, recalls, reciprocal_ranks = [], [], []
+    for query_vector, exact_rows, relevant_set in zip(query_vectors, exact, relevant):
+        query_started = time.perf_counter()
+        hits = store.search(db, query_vector, space, limit=k, ef_search=ef_search)
+        latencies.append((time.perf_counter() - query_started) * 1000)
+        rows = [row_by_id[hit.id] for hit in hits]
+        recalls.append(len(set(rows) & set(exact_rows)) / len(exact_rows))
+        rank = next((position for position, row in enumerate(rows, start=1) if row in relevant_set), None)
+        reciprocal_ranks.append(1.0 / rank if rank else 0.0)
+    return {
+        "build_seconds": round(build_seconds, 3),
+        "recall_at_k": round(float(np.mean(recalls)), 4),
+        "mrr": round(float(np.mean(reciprocal_ranks)), 4),
+        "hit_rate_at_k": round(float(np.mean([rr > 0 for rr in reciprocal_ranks])), 4),
+        "latency_ms": {"p50": percentile(latencies, 50), "p95": percentile(latencies, 95), "p99": percentile(latencies, 99)},
+    }
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--space", default="hashing@256", help="Embedding space, e.g. hashing@256, onnx:<model dir>, text-embedding-3-small.")
+    parser.add_argument("--synthetic-docs", type=int, default=200, help="Synthetic documents added to the corpus.")
+    parser.add_argument("--doc-words", type=int, default=800, help="Words per synthetic document.")
+    parser.add_argument("--ttx-root", default=REPO_ROOT, help="Directory holding the Live_TTX_* folders ('' to skip them).")
+    parser.add_argument("--chunk-tokens", type=int, nargs="+", default=[512], help="Chunk sizes to compare (CHUNK_SIZE_TOKENS).")
+    parser.add_argument("--overlap-tokens", type=int, default=None, help="Chunk overlap (default: CHUNK_OVERLAP_TOKENS).")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--query-words", type=int, default=12, help="Words per query window.")
+    parser.add_argument("--query-drop", type=float, default=0.25, help="Fraction of query window words removed.")
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--rescore-factor", type=int, default=4, help="Candidates rescored per result in quantized modes.")
+    parser.add_argument("--ef-search", type=int, nargs="+", default=[16, 40, 100], help="HNSW ef_search values.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=None, help="Also write the results to this JSON file.")
+    args = parser.parse_args()
+
+    named = [(f"synthetic/{i}", document) for i, document in enumerate(synthetic_documents(args.synthetic_docs, args.doc_words, args.seed))]
+    if args.ttx_root:
+        named += ttx_documents(args.ttx_root)
+    documents = [document for _, document in named]
+    queries = make_queries(documents, args.queries, args.query_words, args.query_drop, args.seed + 1)
+    client = create_base_embedding_client(args.space)
+    embed_started = time.perf_counter()
+    query_vectors = normalize_rows(np.array([client.embed_query(query) for query, *_ in queries], dtype=np.float32))
+    query_embedding_ms = (time.perf_counter() - embed_started) * 1000 / len(queries)
+
+    # Only the files table is read by the in-process stores (for filenames); an in-memory database suffices
+    engine = create_engine("sqlite://")
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE files (id INTEGER PRIMARY KEY, filename TEXT)"))
+        conn.execute(text("INSERT INTO files VALUES (:id, :filename)"), [{"id": i, "filename": name} for i, (name, _) in enumerate(named)])
+
+    configurations = [(f"numpy/{mode}", lambda directory, mode=mode: NumpyVectorStore(directory, mode, args.rescore_factor), None) for mode in QUANTIZATIONS]
+    configurations += [(f"hnsw/ef={ef}", HnswVectorStore, ef) for ef in args.ef_search]
+
+    runs = []
+    for chunk_tokens in args.chunk_tokens:
+        chunks = [
+            {"file_id": doc_id, "chunk_index": chunk.index, "chunk_text": chunk.text, "chunk_hash": compute_chunk_hash(chunk.text),
+             "char_start": chunk.char_start, "char_end": chunk.char_end, "embedding_model": args.space}
+            for doc_id, document in enumerate(documents) for chunk in chunk_text_with_offsets(document, chunk_tokens, args.overlap_tokens)
+        ]
+        embed_started = time.perf_counter()
+        for batch, vectors in iter_embedded_batches(chunks, get_text=lambda chunk: chunk["chunk_text"], embedding_client=client):
+            for chunk, vector in zip(batch, vectors):
+                chunk["embedding"] = np.asarray(vector, dtype=np.float32)
+        embed_seconds = time.perf_counter() - embed_started
+
+        matrix = normalize_rows(np.stack([chunk["embedding"] for chunk in chunks])).astype(np.float64)
+        k = min(args.k, len(chunks))
+        exact = np.argsort(-(query_vectors.astype(np.float64) @ matrix.T), axis=1, kind="stable")[:, :k] # Ground truth
+        relevant = [relevant_rows(chunks, doc_id, start, end) for _, doc_id, start, end in queries]
+
+        for name, factory, ef_search in configurations:
+            with tempfile.TemporaryDirectory() as directory, Session(engine) as db:
+                try:
+                    store = factory(directory)
+                except ImportError as e: # hnswlib is optional
+                    runs.append({"chunk_tokens": chunk_tokens, "configuration": name, "skipped": str(e)})
+                    continue
+                result = run_configuration(store, db, chunks, args.space, query_vectors, exact, relevant, k, ef_search)
+            runs.append({"chunk_tokens": chunk_tokens, "configuration": name, "chunks": len(chunks), "embed_seconds": round(embed_seconds, 3), **result})
+
+    report = {
+        "space": args.space,
+        "documents": len(documents),
+        "ttx_documents": len(named) - args.synthetic_docs,
+        "queries": len(queries),
+        "k": args.k,
+        "query_embedding_ms": round(query_embedding_ms, 3),
+        "runs": runs,
+    }
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+"""Regression tests for RAG context packing over the in-process vector store.
+
+Run from the `backend` directory: python -m pytest -q tests
+"""
+
+import numpy as np
+
+from app.schemas import RetrievedChunk
+from app.services import context_packing
+from app.services.vector_backends.numpy_store import NumpyVectorStore
+
+def _row(file_id: int, index: int, text: str, vector: np.ndarray, space: str) -> dict:
+    return {
+        "file_id": file_id, "chunk_index": index, "chunk_text": text, "chunk_hash": f"{space}-{file_id}-{index}",
+        "char_start": index * 1000, "char_end": index * 1000 + len(text), "embedding_model": space, "embedding": vector,
+    }
+
+def test_pack_context_in_narrower_space_of_mixed_width_store(tmp_path, monkeypatch):
+    """After re-embedding 1536 -> 512 dims, stored vectors are zero-padded; packing must still work."""
+    rng = np.random.default_rng(0)
+    store = NumpyVectorStore(str(tmp_path))
+    session = object() # The store only keys staged rows by session
+    store.add_embeddings(session, [_row(1, 0, "old space chunk", rng.standard_normal(1536).astype(np.float32), "wide@1536")])
+    store.commit(session)
+    narrow = rng.standard_normal((3, 512)).astype(np.float32)
+    indexes = [0, 2, 4] # Not consecutive, so packing keeps them as separate passages
+    ids = store.add_embeddings(session, [_row(2, index, f"chunk number {index}", narrow[i], "narrow@512") for i, index in enumerate(indexes)])
+    store.commit(session)
+    monkeypatch.setattr(context_packing, "get_vector_backend", lambda: store)
+
+    candidates = [
+        RetrievedChunk(id=chunk_id, file_id=2, filename="b.txt", chunk_index=index, chunk_text=f"chunk number {index}",
+                       char_start=index * 1000, char_end=index * 1000 + 14)
+        for index, chunk_id in zip(indexes, ids)
+    ]
+    passages = context_packing.pack_context(None, narrow[1].tolist(), candidates, token_budget=1000, mmr_lambda=0.7)
+
+    assert passages
+    assert passages[0].chunk_indexes == [2] # Most similar to the query
+    assert sorted(index for passage in passages for index in passage.chunk_indexes) == indexes
@@ -0,0 +1,28 @@
+"""Tests for the persistent embedding cache.
+
+Run from the `backend` directory: python -m pytest -q tests
+"""
+
+from typing import List
+
+from app.services.embedding_cache import CachedEmbeddings, EmbeddingCache
+
+class _PrefixedEmbeddings:
+    """Embeds queries and documents of the same text differently, as task-prefixed models do."""
+
+    model = "prefixed"
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [[1.0, float(len(text))] for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return [0.0, float(len(text))]
+
+def test_query_and_document_vectors_of_the_same_text_are_cached_apart(tmp_path):
+    cache = EmbeddingCache(str(tmp_path / "cache.sqlite3"), max_entries=100)
+    client = CachedEmbeddings(_PrefixedEmbeddings(), cache, namespace="m|doc: ", query_namespace="m|query: ")
+
+    assert client.embed_documents(["pump alarm"]) == [[1.0, 10.0]]
+    assert client.embed_query("pump alarm") == [0.0, 10.0]
+    assert client.embed_documents(["pump alarm"]) == [[1.0, 10.0]] # Served from the cache
+    assert cache.stats()["entries"] == 2
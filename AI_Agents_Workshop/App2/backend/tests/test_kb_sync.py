@@ -0,0 +1,57 @@
+"""Tests for the knowledge-base directory sync.
+
+Run from the `backend` directory: python -m pytest -q tests
+"""
+
+import os
+
+from app import schemas
+from app.models import File
+from app.services import kb_sync
+from app.services.file_processor import hash_file
+
+class _Session:
+    """Just enough of a Session for `crud.update_file` on a detached row."""
+
+    def add(self, instance):
+        pass
+
+    def commit(self):
+        pass
+
+    def refresh(self, instance):
+        pass
+
+    def rollback(self):
+        pass
+
+def _sync(db, relative_path: str, db_file: File) -> schemas.KnowledgeBaseSyncRead:
+    result = schemas.KnowledgeBaseSyncRead()
+    stat = os.stat(os.path.join(kb_sync.settings.KNOWLEDGE_BASE_PATH, relative_path))
+    kb_sync._sync_file(db, relative_path, stat, db_file, result)
+    return result
+
+def test_edited_file_is_changed_only_once(tmp_path, monkeypatch):
+    monkeypatch.setattr(kb_sync.settings, "KNOWLEDGE_BASE_PATH", str(tmp_path))
+    monkeypatch.setattr(kb_sync.settings, "KB_SYNC_SETTLE_SECONDS", 0)
+    deleted, queued = [], []
+    monkeypatch.setattr(kb_sync.vector_store, "delete_vector_embeddings_for_file", lambda db, file_id: deleted.append(file_id))
+    monkeypatch.setattr(kb_sync, "_queue_ingestion", lambda db_file, result: queued.append(db_file.id))
+
+    path = tmp_path / "notes.txt"
+    path.write_text("first version")
+    stat = os.stat(path)
+    db_file = File(
+        id=1, filename="notes.txt", relative_path="notes.txt", file_size_bytes=stat.st_size,
+        mtime_ns=stat.st_mtime_ns, content_hash=hash_file(str(path)), is_processing=False, is_vectorized=True,
+    )
+    path.write_text("second, longer version")
+    db = _Session()
+
+    first = _sync(db, "notes.txt", db_file)
+    second = _sync(db, "notes.txt", db_file)
+
+    assert (first.changed, second.changed, second.unchanged) == (1, 0, 1)
+    assert deleted == queued == [1]
+    assert db_file.content_hash == hash_file(str(path))
+    assert db_file.file_size_bytes == path.stat().st_size